@@ -1,8 +1,89 @@
+import dataclasses
 import sys
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Tuple, Optional
 import plotly.express as px
-from tcn.benchmark.string_trf import extract_numerics
+from tcn.benchmark.cache import get_cache
+from tcn.benchmark.profile_tree import (
+    MAPL_DEFAULT_COLUMNS,
+    ProfileTree,
+    parse_header_columns,
+)
+from tcn.benchmark.string_trf import LineConsumer, extract_numerics, grep_stream
+
+_TIMINGS_FIELDS = [
+    "fv_gridcomp_detailed_profiling",
+    "agcm_timings",
+    "ogcm_timings",
+    "run_timings",
+    "timings",
+]
+
+# Bump when the parsing of the summary changes to invalidate the cache
+SUMMARY_CACHE_KEY = "summary.v2"
+
+
+class MAPLSummaryGrep(LineConsumer):
+    """Streaming parse of the global MAPL profiler report, see `grep_stream`"""
+
+    def __init__(self) -> None:
+        self.done = False
+        self.timings: List[Tuple[str, float, str]] = []
+        self._parents: List[Tuple[str, int]] = []
+        self._names: List[str] = []
+        self._depths: List[int] = []
+        self._values: List[List[float]] = []
+        self._columns = MAPL_DEFAULT_COLUMNS
+        self._start_patterns = ["All"]
+        self._start_pattern: Optional[str] = "Model Throughput"
+        self._end_pattern = "GEOSgcm Run Status: 0"
+
+    def feed(self, line: str) -> None:
+        if self.done:
+            return
+        # Skip until parsing
+        if self._start_pattern and self._start_pattern in line:
+            if self._start_patterns != []:
+                self._start_pattern = self._start_patterns.pop(0)
+            else:
+                self._start_pattern = None
+        # Parsing is done
+        if self._end_pattern in line:
+            self.done = True
+            return
+        # Header of the report
+        if self._start_pattern:
+            header_columns = parse_header_columns(line)
+            if header_columns:
+                self._columns = header_columns
+            return
+        # Parse result line
+        name_and_hierarchy = line.split(" ")[0]
+        measures = extract_numerics([" ".join(line.split(" ")[1:])])
+        if len(measures) < 2:
+            # Blank or decoration line
+            return
+        hierarchy_level = len(name_and_hierarchy) - len(name_and_hierarchy.lstrip("-"))
+        name = name_and_hierarchy.lstrip("-")
+        time = measures[1]
+        parents = self._parents
+        parent = ""
+        if len(parents) > 0 and parents[-1][1] < hierarchy_level:
+            parent = parents[-1][0]
+        else:
+            while len(parents) > 0 and parents[-1][1] >= hierarchy_level:
+                parents.pop()
+            parent = parents[-1][0] if len(parents) else ""
+        parents.append((name, hierarchy_level))
+        self.timings.append((name, time, parent))
+        self._names.append(name)
+        self._depths.append(hierarchy_level)
+        self._values.append(measures)
+
+    def profile(self) -> ProfileTree:
+        return ProfileTree.from_depths(
+            self._names, self._depths, self._values, self._columns
+        )
 
 
 @dataclass
@@ -10,6 +91,7 @@ class Benchmark:
     backend: str = ""
     grid_resolution: Tuple[int, int, int] = (0, 0, 0)  # nx / ny / nz
     node_setup: Tuple[int, int, int] = (0, 0, 0)  # NX / NY / Total ranks used
+    timestep_s: float = 0  # simulated seconds per model timestep (HEARTBEAT_DT)
     global_init_time: float = 0  # seconds fort the global INITIALIZE
     global_run_time: float = 0  # seconds fort the global RUN
     global_finalize_time: float = 0  # seconds fort the global FINALIZE
@@ -26,6 +108,8 @@ class Benchmark:
     run_timings: List[Tuple[str, float, str]] = field(default_factory=list)
     timings: List[Tuple[str, float, str]] = field(default_factory=list)
     hws_data: Dict[str, Any] = field(default_factory=dict)
+    # Full MAPL profile of the run, see `parse_geos_log_summary`
+    profile: Optional[ProfileTree] = None
 
     @property
     def backend_sanitized(self):
@@ -39,6 +123,25 @@ class Benchmark:
             .replace(")", "-")
         )
 
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-able dictionary of the parsed data (hws_data excluded)"""
+        data = dataclasses.asdict(self)
+        data.pop("hws_data")
+        data["profile"] = self.profile.to_dict() if self.profile else None
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Benchmark":
+        """Inverse of `to_dict`, restoring the tuples lost in JSON"""
+        data = data.copy()
+        data["grid_resolution"] = tuple(data["grid_resolution"])
+        data["node_setup"] = tuple(data["node_setup"])
+        for timings in _TIMINGS_FIELDS:
+            data[timings] = [tuple(timing) for timing in data[timings]]
+        if data.get("profile"):
+            data["profile"] = ProfileTree.from_dict(data["profile"])
+        return cls(**data)
+
     def _sunburst_plot(self, data, path: str):
         fig = px.sunburst(data, names="comps", parents="parents", values="values")
         fig = px.sunburst(
@@ -52,39 +155,33 @@ class Benchmark:
         fig.write_html(path[:-3] + "html")
 
     def parse_geos_log_summary(self, filename: str):
-        parents: List[Tuple[str, int]] = []
-        start_patterns = ["Model Throughput", "All"]
-        start_pattern: Optional[str] = start_patterns.pop(0)
-        end_pattern = "GEOSgcm Run Status: 0"
-        with open(filename, "r") as f:
-            for line in f.readlines():
-                # Skip until parsing
-                if start_pattern and start_pattern and start_pattern in line:
-                    if start_patterns != []:
-                        start_pattern = start_patterns.pop(0)
-                    else:
-                        start_pattern = None
-                # Parsing is done
-                if end_pattern and end_pattern in line:
-                    break
-                # Parse result line
-                if not start_pattern:
-                    name_and_hierarchy = line.split(" ")[0]
-                    timings = " ".join(line.split(" ")[1:])
-                    hierarchy_level = len(name_and_hierarchy) - len(
-                        name_and_hierarchy.lstrip("-")
-                    )
-                    name = name_and_hierarchy.lstrip("-")
-                    time = extract_numerics([timings])[1]
-                    parent = ""
-                    if len(parents) > 0 and parents[-1][1] < hierarchy_level:
-                        parent = parents[-1][0]
-                    else:
-                        while len(parents) > 0 and parents[-1][1] >= hierarchy_level:
-                            parents.pop()
-                        parent = parents[-1][0] if len(parents) else ""
-                    parents.append((name, hierarchy_level))
-                    self.timings.append((name, time, parent))
+        """Parse the global MAPL profiler report into `timings` & `profile`"""
+        cache = get_cache()
+        if cache:
+            cached = cache.load(filename, SUMMARY_CACHE_KEY)
+            if cached is not None:
+                self.timings.extend([tuple(timing) for timing in cached["timings"]])
+                self.profile = ProfileTree.from_dict(cached["profile"])
+                return
+        timings: List[Tuple[str, float, str]] = []
+        self.profile = self._parse_geos_log_summary(filename, timings)
+        self.timings.extend(timings)
+        if cache:
+            cache.store(
+                filename,
+                SUMMARY_CACHE_KEY,
+                {"timings": timings, "profile": self.profile.to_dict()},
+            )
+
+    def _parse_geos_log_summary(
+        self,
+        filename: str,
+        timings: List[Tuple[str, float, str]],
+    ) -> ProfileTree:
+        summary = MAPLSummaryGrep()
+        grep_stream(filename, [summary])
+        timings.extend(summary.timings)
+        return summary.profile()
 
     def plot_agcm(self, path: str):
         comps = []
@@ -0,0 +1,142 @@
+"""On-disk cache of parsed GEOS logs.
+
+Parsed results are stored as JSON, keyed by the content hash of the log.
+The (path, size, mtime) of a log is recorded next to its hash, so that an
+unchanged log is not re-hashed. The cache is bounded in size and evicts the
+least recently used entries.
+
+Environment variables:
+    TCN_BENCHMARK_CACHE: set to 0 to deactivate the cache
+    TCN_BENCHMARK_CACHE_DIR: cache location (default: ~/.cache/tcn/benchmark)
+    TCN_BENCHMARK_CACHE_SIZE_MB: cache size bound (default: 512)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache/tcn/benchmark")
+DEFAULT_CACHE_SIZE_MB = 512
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _sha256(filename: str) -> str:
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BenchmarkCache:
+    def __init__(self, directory: str, max_size_bytes: int) -> None:
+        self.directory = directory
+        self.max_size_bytes = max_size_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    def _read(self, path: str) -> Optional[Any]:
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            # Mark as recently used
+            os.utime(path)
+        except OSError:
+            # Evicted meanwhile by another process: the data read is still valid
+            pass
+        return data
+
+    def _write(self, path: str, data: Any) -> None:
+        # Atomic write: logs can be parsed concurrently by several processes
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def content_hash(self, filename: str) -> str:
+        """Hash of the content of filename, re-hashed only if size or mtime changed"""
+        stat = os.stat(filename)
+        abspath = os.path.abspath(filename)
+        stat_path = self._path(
+            "stat." + hashlib.sha256(abspath.encode("utf8")).hexdigest()
+        )
+        recorded = self._read(stat_path)
+        if (
+            recorded
+            and recorded["path"] == abspath
+            and recorded["size"] == stat.st_size
+            and recorded["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return recorded["sha256"]
+        sha256 = _sha256(filename)
+        self._write(
+            stat_path,
+            {
+                "path": abspath,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": sha256,
+            },
+        )
+        return sha256
+
+    def load(self, filename: str, key: str) -> Optional[Any]:
+        """Cached data for `key` of the log, None if missing"""
+        return self._read(self._path(f"{self.content_hash(filename)}.{key}"))
+
+    def store(self, filename: str, key: str, data: Any) -> None:
+        self._write(self._path(f"{self.content_hash(filename)}.{key}"), data)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits its bound"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def clear(self) -> None:
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                os.remove(entry.path)
+
+
+def get_cache() -> Optional[BenchmarkCache]:
+    """Cache as configured by the environment, None if deactivated"""
+    if os.getenv("TCN_BENCHMARK_CACHE", "1") == "0":
+        return None
+    return BenchmarkCache(
+        directory=os.getenv("TCN_BENCHMARK_CACHE_DIR", DEFAULT_CACHE_DIR),
+        max_size_bytes=int(
+            float(os.getenv("TCN_BENCHMARK_CACHE_SIZE_MB", DEFAULT_CACHE_SIZE_MB))
+            * 1024
+            * 1024
+        ),
+    )
@@ -1,12 +1,10 @@
-from tcn.benchmark.geos_log_parser import parse_geos_log
+from tcn.benchmark.geos_log_parser import parse_geos_logs
 from tcn.benchmark.report import report
 
 if __name__ == "__main__":
     import sys
 
-    raw_data = []
-    for log in sys.argv[1:]:
-        raw_data.append(parse_geos_log(log))
+    raw_data = parse_geos_logs(sys.argv[1:])
 
     benchmark_report = report(raw_data)
     print(benchmark_report)
@@ -1,276 +1,419 @@
+import re
 import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from tcn.benchmark.benchmark import Benchmark
-from tcn.benchmark.string_trf import extract_numerics, grep
+from tcn.benchmark.cache import get_cache
+from tcn.benchmark.string_trf import (
+    LineConsumer,
+    LineGrep,
+    extract_numerics,
+    grep_stream,
+)
+from tcn.benchmark.utils import parallel_parse
 
+# Bump when the parsing changes to invalidate the cache
+PARSER_CACHE_KEY = "geos_log.v2"
 
-def parse_geos_log(filename: str) -> Benchmark:
-    benchmark = Benchmark()
+#
+# WARNING - THIS IS A BESPOKE PARSE. THIS HAS BEEN REPLACED
+#           BY A GENERIC PARSER IN BENCHMARKDATA
+#
+
+GLOBAL_PROFILER_ENTRY = "Model Throughput"
+GLOBAL_PROFILER_ENTRY_THEN_RUN = [GLOBAL_PROFILER_ENTRY, "--Run"]
+END_OF_LOG_ENTRY = "GEOSgcm Run Status"
+
+# (pattern, shortname, parent)
+ProfilerPatterns = List[Tuple[str, str, str]]
+
+# Details FV Grid Comp timings
+DYN_PROFILER_ENTRY = "Times for component <DYN>"
+SUPERDYN_PROFILER_ENTRY = "Times for component <SUPERDYNAMICS>"
+DYN_PROFILER_PATTERNS: ProfilerPatterns = [
+    ("--------DYN_ANA", "DYN_ANA", "DYN"),
+    ("--------DYN_PROLOGUE", "DYN_PROLOGUE", "DYN"),
+    ("--------DYN_CORE", "DYN_CORE", "DYN"),
+    ("----------PROLOGUE", "PROLOGUE", "DYN_CORE"),
+    ("----------PULL_TRACERS", "PULL_TRACERS", "DYN_CORE"),
+    ("----------STATE_TO_FV", "STATE_TO_FV", "DYN_CORE"),
+    ("----------MAKE_NH", "MAKE_NH", "DYN_CORE"),
+    ("----------MASS_FIX", "MASS_FIX", "DYN_CORE"),
+    ("----------FV_DYNAMICS", "FV_DYNAMICS", "DYN_CORE"),
+    ("----------PUSH_TRACERS", "PUSH_TRACERS", "DYN_CORE"),
+    ("----------FV_TO_STATE", "FV_TO_STATE", "DYN_CORE"),
+    ("--------DYN_EPILOGUE", "DYN_EPILOGUE", "DYN"),
+]
+
+# Details for MOIST physics
+MOIST_PROFILER_ENTRY = "Times for component <MOIST>"
+TURBULENCE_PROFILER_ENTRY = "Times for component <TURBULENCE>"
+MOIST_PROFILER_PATTERNS: ProfilerPatterns = [
+    ("------CONV_TRACERS", "CONV_TRACERS", "MOIST"),
+    ("------AERO_ACTIVATE", "AERO_ACTIVATE", "MOIST"),
+    ("------GF", "GF", "MOIST"),
+    ("------UW", "UW", "MOIST"),
+    ("------BACM_1M", "BACM_1M", "MOIST"),
+]
+
+# Details for Turbulence physics
+CHEMENV_PROFILER_ENTRY = "Times for component <CHEMENV>"
+TURBULENCE_PROFILER_PATTERNS: ProfilerPatterns = [
+    ("--------REFRESHKS", "REFRESHKS", "TURBULENCE"),
+    ("----------PRELIMS", "PRELIMS", "REFRESHKS"),
+    ("----------MASSFLUX", "MASSFLUX", "REFRESHKS"),
+    ("----------LOUIS", "LOUIS", "REFRESHKS"),
+    ("----------LOCK", "LOCK", "REFRESHKS"),
+    ("----------POSTLOCK", "POSTLOCK", "REFRESHKS"),
+    ("----------BELJAARS", "BELJAARS", "REFRESHKS"),
+    ("----------DECOMP", "DECOMP", "REFRESHKS"),
+    ("--------DIFFUSE", "DIFFUSE", "TURBULENCE"),
+]
+
+# AGCM (for GEOS-FP)
+AGCM_PROFILER_PATTERNS: ProfilerPatterns = [
+    ("------AGCM", "AGCM", ""),
+    ("--------SUPERDYNAMICS", "SUPERDYNAMICS", "AGCM"),
+    ("----------DYN", "DYN", "SUPERDYNAMICS"),
+    ("--------PHYSICS", "PHYSICS", "AGCM"),
+    ("----------GWD", "GWD", "PHYSICS"),
+    ("----------MOIST", "MOIST", "PHYSICS"),
+    ("----------TURBULENCE", "TURBULENCE", "PHYSICS"),
+    ("----------CHEMISTRY", "CHEMISTRY", "PHYSICS"),
+    ("------------CHEMENV", "CHEMENV", "CHEMISTRY"),
+    ("------------HEMCO", "HEMCO", "CHEMISTRY"),
+    ("------------PCHEM", "PCHEM", "CHEMISTRY"),
+    ("------------ACHEM", "ACHEM", "CHEMISTRY"),
+    ("------------GOCART", "GOCART", "CHEMISTRY"),
+    ("------------GOCART2G", "GOCART2G", "CHEMISTRY"),
+    ("------------TR", "TR", "CHEMISTRY"),
+    ("----------SURFACE", "SURFACE", "PHYSICS"),
+    ("------------SALTWATER", "SALTWATER", "SURFACE"),
+    ("--------------SEAICETHERMO", "SEAICETHERMO", "SALTWATER"),
+    ("--------------OPENWATER", "OPENWATER", "SALTWATER"),
+    ("------------LAKE", "LAKE", "SURFACE"),
+    ("------------LANDICE", "LANDICE", "SURFACE"),
+    ("------------LAND", "LAND", "SURFACE"),
+    ("--------------VEGDYN", "VEGDYN", "LAND"),
+    ("--------------CATCH", "CATCH", "LAND"),
+    ("----------RADIATION", "RADIATION", "PHYSICS"),
+    ("------------SOLAR", "SOLAR", "RADIATION"),
+    ("------------IRRAD", "IRRAD", "RADIATION"),
+    ("------------SATSIM", "SATSIM", "RADIATION"),
+    ("--------ORBIT", "ORBIT", "AGCM"),
+]
+
+# OGCM minus the AGCM tag (for GEOS-FP)
+OGCM_PROFILER_PATTERNS: ProfilerPatterns = [
+    ("------OGCM", "OGCM", ""),
+    ("--------ORAD", "ORAD", "OGCM"),
+    ("--------SEAICE", "SEAICE", "OGCM"),
+    ("----------DATASEAICE", "DATASEAICE", "SEAICE"),
+    ("--------OCEAN", "OCEAN", "OGCM"),
+    ("----------DATASEA", "DATASEA", "OCEAN"),
+]
+
+# Full run
+RUN_PROFILER_PATTERNS: ProfilerPatterns = [
+    ("--Run", "RUN", ""),
+    ("----EXTDATA", "EXTDATA", "RUN"),
+    ("----GCM", "GCM", "RUN"),
+    ("------AIAU", "AIAU", "GCM"),
+    ("------ADFI", "ADFI", "GCM"),
+    ("----HIST", "HIST", "RUN"),
+]
 
-    # Get backend
-    is_gtfv3 = grep(filename, "RUN_GTFV3:1", exclude_pattern=True, expected=False) != []
-    if not is_gtfv3:
-        benchmark.backend = "fortran"
-    else:
-        backend_pattern = "backend : "
-        grepped = grep(filename, backend_pattern, exclude_pattern=True, expected=False)
-        if grepped == []:
+
+class _SectionHandler:
+    """Collect the lines of a section of the log during the single read,
+    then fill the benchmark once the read is done."""
+
+    def __init__(self) -> None:
+        self.greps: List[LineConsumer] = []
+
+    def _grep(self, pattern: str, **kwargs) -> LineGrep:
+        g = LineGrep(pattern, **kwargs)
+        self.greps.append(g)
+        return g
+
+    def fill(self, benchmark: Benchmark) -> None:
+        raise NotImplementedError
+
+
+class _BackendHandler(_SectionHandler):
+    def __init__(self) -> None:
+        super().__init__()
+        self._gtfv3 = self._grep("RUN_GTFV3:1", exclude_pattern=True, expected=False)
+        self._backend = self._grep("backend : ", exclude_pattern=True, expected=False)
+
+    def fill(self, benchmark: Benchmark) -> None:
+        if self._gtfv3.check() == []:
+            benchmark.backend = "fortran"
+        elif self._backend.check() == []:
             benchmark.backend = "gtfv3 (details failed to parse)"
         else:
-            backend = grepped[0].strip().replace("\n", "").replace(":", "")
+            backend = self._backend.results[0].strip().replace("\n", "")
+            backend = backend.replace(":", "")
             benchmark.backend = f"gtfv3_{backend}"
 
-    # Get timings of FV
-    if is_gtfv3:
-        interface_timings = grep(filename, " 0 , geos_gtfv3", exclude_pattern=True)
-        benchmark.fv_dyncore_timings = extract_numerics(interface_timings)
-
-        if "dace" in benchmark.backend:
-            dycore_timings = grep(
-                filename, "] Run...", exclude_pattern=True, expected=False
-            )
-            benchmark.inner_dycore_timings = extract_numerics(dycore_timings)
-    else:
-        dycore_timings = grep(
-            filename, " 0: fv_dynamics", exclude_pattern=True, expected=False
+
+class _DycoreTimingsHandler(_SectionHandler):
+    """Requires the backend to be filled"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        # All candidates are collected, the backend decides which are used
+        self._gtfv3 = self._grep(" 0 , geos_gtfv3", exclude_pattern=True)
+        self._dace = self._grep("] Run...", exclude_pattern=True, expected=False)
+        self._fortran = self._grep(
+            " 0: fv_dynamics", exclude_pattern=True, expected=False
         )
-        benchmark.fv_dyncore_timings = extract_numerics(dycore_timings)
-
-    # Get setup (grid, nodes)
-    grid_stats_str = grep(filename, "Resolution of dynamics restart")
-    grid_stats = extract_numerics(grid_stats_str)
-    assert len(grid_stats) == 3
-    benchmark.grid_resolution = (
-        int(grid_stats[0]),
-        int(grid_stats[1]),
-        int(grid_stats[2]),
-    )
-    NX_str = extract_numerics(
-        grep(filename, "Resource Parameter: NX:", exclude_pattern=True)
-    )
-    assert len(NX_str) == 1
-    NX = int(NX_str[0])
-    NY_str = extract_numerics(
-        grep(filename, "Resource Parameter: NY:", exclude_pattern=True)
-    )
-    assert len(NY_str) == 1
-    NY = int(NY_str[0])
-    benchmark.node_setup = (NX, int(NY / 6), int(NX * (NY / 6) * 6))
-
-    # Model throughput
-    global_profiler_entry = "Model Throughput"
-    global_init_time = grep(
-        filename, "--Initialize", start_patterns=[global_profiler_entry]
-    )
-    benchmark.global_init_time = extract_numerics(global_init_time)[1]
-    global_run_time = grep(filename, "--Run", start_patterns=[global_profiler_entry])
-    benchmark.global_run_time = extract_numerics(global_run_time)[1]
-    global_finalize_time = grep(
-        filename, "--Finalize", start_patterns=[global_profiler_entry]
-    )
-    benchmark.global_finalize_time = extract_numerics(global_finalize_time)[1]
-
-    #
-    # WARNING - THIS IS A BESPOKE PARSE. THIS HAS BEEN REPLACED
-    #           BY A GENERIC PARSER IN BENCHMARKDATA
-    #
-
-    # Get details FV Grid Comp timings
-    dyn_profiler_entry = "Times for component <DYN>"
-    superdyn_profiler_entry = "Times for component <SUPERDYNAMICS>"
-    dyn_profiler_patterns = [
-        ("--------DYN_ANA", "DYN_ANA", "DYN"),
-        ("--------DYN_PROLOGUE", "DYN_PROLOGUE", "DYN"),
-        ("--------DYN_CORE", "DYN_CORE", "DYN"),
-        ("----------PROLOGUE", "PROLOGUE", "DYN_CORE"),
-        ("----------PULL_TRACERS", "PULL_TRACERS", "DYN_CORE"),
-        ("----------STATE_TO_FV", "STATE_TO_FV", "DYN_CORE"),
-        ("----------MAKE_NH", "MAKE_NH", "DYN_CORE"),
-        ("----------MASS_FIX", "MASS_FIX", "DYN_CORE"),
-        ("----------FV_DYNAMICS", "FV_DYNAMICS", "DYN_CORE"),
-        ("----------PUSH_TRACERS", "PUSH_TRACERS", "DYN_CORE"),
-        ("----------FV_TO_STATE", "FV_TO_STATE", "DYN_CORE"),
-        ("--------DYN_EPILOGUE", "DYN_EPILOGUE", "DYN"),
-    ]
-    for pattern, shortname, parent in dyn_profiler_patterns:
-        measures = extract_numerics(
-            grep(
-                filename,
-                pattern,
-                start_patterns=[dyn_profiler_entry],
-                end_pattern=superdyn_profiler_entry,
-                expected=False,
-            )
+
+    def fill(self, benchmark: Benchmark) -> None:
+        if benchmark.backend != "fortran":
+            benchmark.fv_dyncore_timings = extract_numerics(self._gtfv3.check())
+            if "dace" in benchmark.backend:
+                benchmark.inner_dycore_timings = extract_numerics(self._dace.check())
+        else:
+            benchmark.fv_dyncore_timings = extract_numerics(self._fortran.check())
+
+
+class _SetupHandler(_SectionHandler):
+    def __init__(self) -> None:
+        super().__init__()
+        self._resolution = self._grep("Resolution of dynamics restart")
+        self._NX = self._grep("Resource Parameter: NX:", exclude_pattern=True)
+        self._NY = self._grep("Resource Parameter: NY:", exclude_pattern=True)
+        self._heartbeat = self._grep(
+            "Resource Parameter: HEARTBEAT_DT:", exclude_pattern=True, expected=False
         )
-        if measures != []:
-            benchmark.agcm_timings.append((shortname, measures[4], parent))
-
-    # Get details for MOIST physics
-    moist_profiler_entry = "Times for component <MOIST>"
-    turbulence_profiler_entry = "Times for component <TURBULENCE>"
-    moist_profiler_patterns = [
-        ("------CONV_TRACERS", "CONV_TRACERS", "MOIST"),
-        ("------AERO_ACTIVATE", "AERO_ACTIVATE", "MOIST"),
-        ("------GF", "GF", "MOIST"),
-        ("------UW", "UW", "MOIST"),
-        ("------BACM_1M", "BACM_1M", "MOIST"),
-    ]
-    for pattern, shortname, parent in moist_profiler_patterns:
-        measures = extract_numerics(
-            grep(
-                filename,
-                pattern,
-                start_patterns=[moist_profiler_entry],
-                end_pattern=turbulence_profiler_entry,
-                expected=False,
-            )
+
+    def fill(self, benchmark: Benchmark) -> None:
+        grid_stats = extract_numerics(self._resolution.check())
+        assert len(grid_stats) == 3
+        benchmark.grid_resolution = (
+            int(grid_stats[0]),
+            int(grid_stats[1]),
+            int(grid_stats[2]),
         )
-        if measures != []:
-            benchmark.agcm_timings.append((shortname, measures[4], parent))
-
-    # Get details for Turbulence physics
-    chemenv_profiler_entry = "Times for component <CHEMENV>"
-    turbulence_profiler_patterns = [
-        ("--------REFRESHKS", "REFRESHKS", "TURBULENCE"),
-        ("----------PRELIMS", "PRELIMS", "REFRESHKS"),
-        ("----------MASSFLUX", "MASSFLUX", "REFRESHKS"),
-        ("----------LOUIS", "LOUIS", "REFRESHKS"),
-        ("----------LOCK", "LOCK", "REFRESHKS"),
-        ("----------POSTLOCK", "POSTLOCK", "REFRESHKS"),
-        ("----------BELJAARS", "BELJAARS", "REFRESHKS"),
-        ("----------DECOMP", "DECOMP", "REFRESHKS"),
-        ("--------DIFFUSE", "DIFFUSE", "TURBULENCE"),
-    ]
-    for pattern, shortname, parent in turbulence_profiler_patterns:
-        measures = extract_numerics(
-            grep(
-                filename,
-                pattern,
-                start_patterns=[turbulence_profiler_entry],
-                end_pattern=chemenv_profiler_entry,
-                expected=False,
-            )
+        NX_str = extract_numerics(self._NX.check())
+        assert len(NX_str) == 1
+        NX = int(NX_str[0])
+        NY_str = extract_numerics(self._NY.check())
+        assert len(NY_str) == 1
+        NY = int(NY_str[0])
+        benchmark.node_setup = (NX, int(NY / 6), int(NX * (NY / 6) * 6))
+        heartbeat = extract_numerics(self._heartbeat.check())
+        if heartbeat != []:
+            benchmark.timestep_s = heartbeat[0]
+
+
+class _ModelThroughputHandler(_SectionHandler):
+    def __init__(self) -> None:
+        super().__init__()
+        self._init = self._grep("--Initialize", start_patterns=[GLOBAL_PROFILER_ENTRY])
+        self._run = self._grep("--Run", start_patterns=[GLOBAL_PROFILER_ENTRY])
+        self._finalize = self._grep(
+            "--Finalize", start_patterns=[GLOBAL_PROFILER_ENTRY]
         )
-        if measures != []:
-            benchmark.agcm_timings.append((shortname, measures[4], parent))
-
-    # AGCM (for GEOS-FP)
-    global_profiler_entry_then_run = [global_profiler_entry, "--Run"]
-    end_of_log_entry = "GEOSgcm Run Status"
-    agcm_profiler_patterns = [
-        ("------AGCM", "AGCM", ""),
-        ("--------SUPERDYNAMICS", "SUPERDYNAMICS", "AGCM"),
-        ("----------DYN", "DYN", "SUPERDYNAMICS"),
-        ("--------PHYSICS", "PHYSICS", "AGCM"),
-        ("----------GWD", "GWD", "PHYSICS"),
-        ("----------MOIST", "MOIST", "PHYSICS"),
-        ("----------TURBULENCE", "TURBULENCE", "PHYSICS"),
-        ("----------CHEMISTRY", "CHEMISTRY", "PHYSICS"),
-        ("------------CHEMENV", "CHEMENV", "CHEMISTRY"),
-        ("------------HEMCO", "HEMCO", "CHEMISTRY"),
-        ("------------PCHEM", "PCHEM", "CHEMISTRY"),
-        ("------------ACHEM", "ACHEM", "CHEMISTRY"),
-        ("------------GOCART", "GOCART", "CHEMISTRY"),
-        ("------------GOCART2G", "GOCART2G", "CHEMISTRY"),
-        ("------------TR", "TR", "CHEMISTRY"),
-        ("----------SURFACE", "SURFACE", "PHYSICS"),
-        ("------------SALTWATER", "SALTWATER", "SURFACE"),
-        ("--------------SEAICETHERMO", "SEAICETHERMO", "SALTWATER"),
-        ("--------------OPENWATER", "OPENWATER", "SALTWATER"),
-        ("------------LAKE", "LAKE", "SURFACE"),
-        ("------------LANDICE", "LANDICE", "SURFACE"),
-        ("------------LAND", "LAND", "SURFACE"),
-        ("--------------VEGDYN", "VEGDYN", "LAND"),
-        ("--------------CATCH", "CATCH", "LAND"),
-        ("----------RADIATION", "RADIATION", "PHYSICS"),
-        ("------------SOLAR", "SOLAR", "RADIATION"),
-        ("------------IRRAD", "IRRAD", "RADIATION"),
-        ("------------SATSIM", "SATSIM", "RADIATION"),
-        ("--------ORBIT", "ORBIT", "AGCM"),
-    ]
-    for pattern, shortname, parent in agcm_profiler_patterns:
-        measures = extract_numerics(
-            grep(
-                filename,
-                pattern,
-                start_patterns=global_profiler_entry_then_run,
-                end_pattern=end_of_log_entry,
-                expected=False,
-                starts_with=True,
-            )
+
+    def fill(self, benchmark: Benchmark) -> None:
+        benchmark.global_init_time = extract_numerics(self._init.check())[1]
+        benchmark.global_run_time = extract_numerics(self._run.check())[1]
+        benchmark.global_finalize_time = extract_numerics(self._finalize.check())[1]
+
+
+@dataclass
+class ProfilerTable:
+    """Timers of a profiler table, recorded as (shortname, time, parent)
+    in the `target` list of the benchmark"""
+
+    patterns: ProfilerPatterns
+    target: str
+    measure_index: int  # index of the measure, counted after the timer name
+    start_patterns: List[str]
+    end_pattern: str
+
+
+# Timer name (with its hierarchy dashes) as the first token of the line
+_RE_TIMER_LINE = re.compile(r"^\s*(?P<name>-*[A-Za-z0-9_]+)(?P<measures>\s.*)?$")
+
+
+class ProfilerTablesMatcher(LineConsumer):
+    """Classify each line against all the profiler tables at once.
+
+    Section markers are compiled in a single regex and timer names are
+    matched as exact tokens using a lookup table: each line is looked at once,
+    whatever the number of timers searched.
+    """
+
+    def __init__(self, tables: List[ProfilerTable]) -> None:
+        self._tables = tables
+        markers = set()
+        for table in tables:
+            markers.update(table.start_patterns)
+            markers.add(table.end_pattern)
+        self._re_markers = re.compile(
+            "|".join(re.escape(m) for m in sorted(markers, key=len, reverse=True))
         )
-        if measures != []:
-            if shortname == "GOCART2G":
-                # Bug reading the "2" as a measure
-                benchmark.agcm_timings.append((shortname, measures[2], parent))
-            elif shortname == "LAND":
-                # Bug reading LANDICE in LAND
-                benchmark.agcm_timings.append((shortname, measures[6], parent))
-            else:
-                benchmark.agcm_timings.append((shortname, measures[1], parent))
-
-    # OGCM minus the AGCM tag (for GEOS-FP)
-    global_profiler_entry = "Model Throughput"
-    global_profiler_entry_then_run = [global_profiler_entry, "--Run"]
-    end_of_log_entry = "GEOSgcm Run Status"
-    ogcm_profiler_patterns = [
-        ("------OGCM", "OGCM", ""),
-        ("--------ORAD", "ORAD", "OGCM"),
-        ("--------SEAICE", "SEAICE", "OGCM"),
-        ("----------DATASEAICE", "DATASEAICE", "SEAICE"),
-        ("--------OCEAN", "OCEAN", "OGCM"),
-        ("----------DATASEA", "DATASEA", "OCEAN"),
-    ]
-    for pattern, shortname, parent in ogcm_profiler_patterns:
-        measures = extract_numerics(
-            grep(
-                filename,
-                pattern,
-                start_patterns=global_profiler_entry_then_run,
-                end_pattern=end_of_log_entry,
-                expected=False,
-                starts_with=True,
-            )
+        # Timer name -> [(table index, shortname)]
+        self._lookup: Dict[str, List[Tuple[int, str]]] = {}
+        for i, table in enumerate(tables):
+            for pattern, shortname, _parent in table.patterns:
+                self._lookup.setdefault(pattern, []).append((i, shortname))
+        # Per table state
+        self._start_step = [0 for _ in tables]
+        self._ended = [False for _ in tables]
+        self._measures: List[Dict[str, List[float]]] = [{} for _ in tables]
+
+    def _is_active(self, i: int) -> bool:
+        return not self._ended[i] and self._start_step[i] == len(
+            self._tables[i].start_patterns
         )
-        if measures != []:
-            if shortname == "DATASEA":
-                # Bug reading DATASEA in DATASEAICE
-                benchmark.ogcm_timings.append((shortname, measures[6], parent))
-            elif shortname == "SEAICE":
-                # Bug reading SEAICE in SEAICETHERMO
-                benchmark.ogcm_timings.append((shortname, measures[6], parent))
-            else:
-                benchmark.ogcm_timings.append((shortname, measures[1], parent))
-
-    # Full run
-    global_profiler_entry = "Model Throughput"
-    global_profiler_entry_then_run = [global_profiler_entry, "--Run"]
-    end_of_log_entry = "GEOSgcm Run Status"
-    run_profiler_patterns = [
-        ("--Run", "RUN", ""),
-        ("----EXTDATA", "EXTDATA", "RUN"),
-        ("----GCM", "GCM", "RUN"),
-        ("------AIAU", "AIAU", "GCM"),
-        ("------ADFI", "ADFI", "GCM"),
-        ("----HIST", "HIST", "RUN"),
+
+    def feed(self, line: str) -> None:
+        if self.done:
+            return
+
+        marker = self._re_markers.search(line)
+        if marker:
+            for i, table in enumerate(self._tables):
+                if self._ended[i]:
+                    continue
+                if self._is_active(i) and marker.group() == table.end_pattern:
+                    self._ended[i] = True
+                elif (
+                    not self._is_active(i)
+                    and marker.group() == table.start_patterns[self._start_step[i]]
+                ):
+                    self._start_step[i] += 1
+            self.done = all(self._ended)
+
+        timer = _RE_TIMER_LINE.match(line)
+        if not timer or timer.group("name") not in self._lookup:
+            return
+        for i, shortname in self._lookup[timer.group("name")]:
+            # First record wins
+            if self._is_active(i) and shortname not in self._measures[i]:
+                self._measures[i][shortname] = extract_numerics(
+                    [timer.group("measures") or ""]
+                )
+
+    def fill(self, benchmark: Benchmark) -> None:
+        for i, table in enumerate(self._tables):
+            timings: List[Tuple[str, float, str]] = getattr(benchmark, table.target)
+            for _pattern, shortname, parent in table.patterns:
+                measures = self._measures[i].get(shortname, [])
+                if len(measures) > table.measure_index:
+                    timings.append((shortname, measures[table.measure_index], parent))
+
+
+class _ProfilerHandler(_SectionHandler):
+    def __init__(self, tables: List[ProfilerTable]) -> None:
+        super().__init__()
+        self._matcher = ProfilerTablesMatcher(tables)
+        self.greps.append(self._matcher)
+
+    def fill(self, benchmark: Benchmark) -> None:
+        self._matcher.fill(benchmark)
+
+
+def _global_run_table(patterns: ProfilerPatterns, target: str) -> ProfilerTable:
+    """Timers under `--Run` of the global profiler"""
+    return ProfilerTable(
+        patterns,
+        target,
+        measure_index=1,
+        start_patterns=GLOBAL_PROFILER_ENTRY_THEN_RUN,
+        end_pattern=END_OF_LOG_ENTRY,
+    )
+
+
+def _make_handlers() -> List[_SectionHandler]:
+    """Handlers in the order they fill the benchmark"""
+    return [
+        _BackendHandler(),
+        _DycoreTimingsHandler(),
+        _SetupHandler(),
+        _ModelThroughputHandler(),
+        _ProfilerHandler(
+            [
+                ProfilerTable(
+                    DYN_PROFILER_PATTERNS,
+                    "agcm_timings",
+                    measure_index=4,
+                    start_patterns=[DYN_PROFILER_ENTRY],
+                    end_pattern=SUPERDYN_PROFILER_ENTRY,
+                ),
+                ProfilerTable(
+                    MOIST_PROFILER_PATTERNS,
+                    "agcm_timings",
+                    measure_index=4,
+                    start_patterns=[MOIST_PROFILER_ENTRY],
+                    end_pattern=TURBULENCE_PROFILER_ENTRY,
+                ),
+                ProfilerTable(
+                    TURBULENCE_PROFILER_PATTERNS,
+                    "agcm_timings",
+                    measure_index=4,
+                    start_patterns=[TURBULENCE_PROFILER_ENTRY],
+                    end_pattern=CHEMENV_PROFILER_ENTRY,
+                ),
+                _global_run_table(AGCM_PROFILER_PATTERNS, "agcm_timings"),
+                _global_run_table(OGCM_PROFILER_PATTERNS, "ogcm_timings"),
+                _global_run_table(RUN_PROFILER_PATTERNS, "run_timings"),
+            ]
+        ),
     ]
-    for pattern, shortname, parent in run_profiler_patterns:
-        measures = extract_numerics(
-            grep(
-                filename,
-                pattern,
-                start_patterns=global_profiler_entry_then_run,
-                end_pattern=end_of_log_entry,
-                expected=False,
-                starts_with=True,
-            )
-        )
-        if measures != []:
-            benchmark.run_timings.append((shortname, measures[1], parent))
+
+
+def _parse_geos_log(filename: str) -> Benchmark:
+    benchmark = Benchmark()
+
+    handlers = _make_handlers()
+    grep_stream(filename, [g for handler in handlers for g in handler.greps])
+    for handler in handlers:
+        handler.fill(benchmark)
 
     return benchmark
 
 
+def parse_geos_log(filename: str) -> Benchmark:
+    """Parse a GEOS rank log in a single streaming read.
+
+    Results are cached on disk, see `tcn.benchmark.cache`."""
+    cache = get_cache()
+    if cache:
+        cached = cache.load(filename, PARSER_CACHE_KEY)
+        if cached is not None:
+            return Benchmark.from_dict(cached)
+
+    benchmark = _parse_geos_log(filename)
+    if cache:
+        cache.store(filename, PARSER_CACHE_KEY, benchmark.to_dict())
+
+    return benchmark
+
+
+def parse_geos_logs(
+    filenames: Iterable[str],
+    max_workers: Optional[int] = None,
+) -> List[Benchmark]:
+    """Parse many GEOS logs concurrently with a process pool.
+
+    Results are returned in the order of `filenames`. If any log fails to parse,
+    a RuntimeError listing all failing logs is raised.
+
+    Args:
+        filenames: logs to parse
+        max_workers: size of the pool, see `parallel_parse`
+    """
+    return parallel_parse(
+        parse_geos_log, filenames, max_workers, description="GEOS logs"
+    )
+
+
 if __name__ == "__main__":
     benchmark_data = parse_geos_log(sys.argv[1])
     # print(benchmark_data)
@@ -0,0 +1,182 @@
+import datetime
+import glob
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from tcn.benchmark.benchmark import Benchmark
+
+# Timer groups, one row per run per timer
+GROUP_GLOBAL = "global"
+GROUP_DYCORE = "dycore"
+GROUP_FV_GRIDCOMP = "fv_gridcomp"
+GROUP_AGCM = "agcm"
+GROUP_OGCM = "ogcm"
+GROUP_RUN = "run"
+GROUP_SUMMARY = "summary"
+
+TIMER_FV_DYCORE_MEDIAN = "fv_dyncore_median"
+TIMER_INNER_DYCORE_MEDIAN = "inner_dycore_median"
+
+
+def resolution_label(benchmark: Benchmark) -> str:
+    """C<nx>-L<nz> label of the benchmark grid"""
+    return f"C{benchmark.grid_resolution[0]}-L{benchmark.grid_resolution[2]}"
+
+
+def benchmark_to_rows(benchmark: Benchmark) -> List[Dict[str, Any]]:
+    """Timers of the benchmark as (group, timer, parent, value) rows"""
+    rows = [
+        dict(group=GROUP_GLOBAL, timer=timer, parent="", value=value)
+        for timer, value in [
+            ("init", benchmark.global_init_time),
+            ("run", benchmark.global_run_time),
+            ("finalize", benchmark.global_finalize_time),
+        ]
+    ]
+    if benchmark.fv_dyncore_timings != []:
+        rows.append(
+            dict(
+                group=GROUP_DYCORE,
+                timer=TIMER_FV_DYCORE_MEDIAN,
+                parent="",
+                value=float(np.median(benchmark.fv_dyncore_timings)),
+            )
+        )
+    if benchmark.inner_dycore_timings != []:
+        rows.append(
+            dict(
+                group=GROUP_DYCORE,
+                timer=TIMER_INNER_DYCORE_MEDIAN,
+                parent="",
+                value=float(np.median(benchmark.inner_dycore_timings)),
+            )
+        )
+    for group, timings in [
+        (GROUP_FV_GRIDCOMP, benchmark.fv_gridcomp_detailed_profiling),
+        (GROUP_AGCM, benchmark.agcm_timings),
+        (GROUP_OGCM, benchmark.ogcm_timings),
+        (GROUP_RUN, benchmark.run_timings),
+        (GROUP_SUMMARY, benchmark.timings),
+    ]:
+        for name, value, parent in timings:
+            rows.append(dict(group=group, timer=name, parent=parent, value=value))
+    return rows
+
+
+class BenchmarkHistory:
+    """Columnar (Parquet) store of benchmark results.
+
+    Each appended run is written as its own Parquet file in `directory`,
+    with one row per timer. Queries read only the needed columns and rows
+    of the whole store.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def append(
+        self,
+        benchmark: Benchmark,
+        experiment: str,
+        git_hashes: str = "",
+        timestamp: Optional[datetime.datetime] = None,
+    ) -> str:
+        """Record the benchmark as a new run, returns the run id.
+
+        `git_hashes` describes the code that ran, e.g. as `name@hexsha`
+        comma separated.
+        """
+        run_id = uuid.uuid4().hex
+        if timestamp is None:
+            # Stored as naive UTC
+            timestamp = datetime.datetime.now(datetime.timezone.utc).replace(
+                tzinfo=None
+            )
+        run = dict(
+            run_id=run_id,
+            timestamp=pd.Timestamp(timestamp),
+            experiment=experiment,
+            backend=benchmark.backend,
+            resolution=resolution_label(benchmark),
+            grid_nx=benchmark.grid_resolution[0],
+            grid_ny=benchmark.grid_resolution[1],
+            grid_nz=benchmark.grid_resolution[2],
+            layout_nx=benchmark.node_setup[0],
+            layout_ny=benchmark.node_setup[1],
+            ranks=benchmark.node_setup[2],
+            git_hashes=git_hashes,
+        )
+        df = pd.DataFrame([{**run, **row} for row in benchmark_to_rows(benchmark)])
+        stamp = run["timestamp"].strftime("%Y%m%dT%H%M%S")
+        df.to_parquet(
+            f"{self.directory}/{stamp}_{run_id}.parquet",
+            index=False,
+        )
+        return run_id
+
+    def load(
+        self,
+        columns: Optional[List[str]] = None,
+        **equals: Any,
+    ) -> pd.DataFrame:
+        """Rows of the store where every given column equals its value"""
+        if glob.glob(f"{self.directory}/*.parquet") == []:
+            return pd.DataFrame(columns=columns)
+        filters = [(column, "==", value) for column, value in equals.items()]
+        return pd.read_parquet(
+            self.directory,
+            columns=columns,
+            filters=filters if filters != [] else None,
+        )
+
+    def timer_series(
+        self,
+        group: str,
+        timer: str,
+        backend: str,
+        resolution: str,
+        last_n: Optional[int] = None,
+        **equals: Any,
+    ) -> pd.Series:
+        """Value of a timer of `group` per run (oldest first), for the `last_n`
+        runs.
+
+        A timer repeated within the group of a run (e.g. under several
+        parents) is taken at its first occurrence: filter on `parent` to
+        select another one.
+        """
+        df = self.load(
+            columns=["run_id", "timestamp", "value"],
+            group=group,
+            timer=timer,
+            backend=backend,
+            resolution=resolution,
+            **equals,
+        )
+        # Rows of a run are stored, and read, in the order of the log
+        df = df.drop_duplicates("run_id", keep="first")
+        df = df.sort_values("timestamp", kind="stable")
+        if last_n is not None:
+            df = df.tail(last_n)
+        return df.set_index("run_id")["value"]
+
+    def timer_median(
+        self,
+        group: str,
+        timer: str,
+        backend: str,
+        resolution: str,
+        last_n: Optional[int] = None,
+        **equals: Any,
+    ) -> float:
+        """Median of a timer of `group` over the `last_n` runs, NaN if never
+        recorded"""
+        series = self.timer_series(group, timer, backend, resolution, last_n, **equals)
+        if len(series) == 0:
+            return float("nan")
+        return float(np.median(series.to_numpy()))
@@ -0,0 +1,226 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Columns of the MAPL profiler report, used when the header can't be read
+MAPL_DEFAULT_COLUMNS = [
+    "#-cycles",
+    "Inclusive",
+    "% Incl",
+    "Exclusive",
+    "% Excl",
+]
+INCLUSIVE = "Inclusive"
+EXCLUSIVE = "Exclusive"
+PATH_SEPARATOR = "/"
+
+
+class ProfileTree:
+    """Array-backed tree of hierarchical timers (e.g. a MAPL profile).
+
+    Nodes are stored in the report order (depth-first). Each node has its
+    parent index (-1 for roots) and a row of `values`, one column per
+    profiler column (NaN if missing). Parent and path lookup are O(1).
+    """
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        parents: Sequence[int],
+        values: np.ndarray,
+        columns: Sequence[str],
+    ) -> None:
+        self.names = list(names)
+        self.parents = np.asarray(parents, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64).reshape(
+            len(self.names), len(columns)
+        )
+        self.columns = list(columns)
+        self._column_index = {column: i for i, column in enumerate(self.columns)}
+        self.paths: List[str] = []
+        for i, name in enumerate(self.names):
+            parent = self.parents[i]
+            self.paths.append(
+                name if parent < 0 else self.paths[parent] + PATH_SEPARATOR + name
+            )
+        self._path_index = {path: i for i, path in enumerate(self.paths)}
+        roots = [i for i in range(len(self.names)) if self.parents[i] < 0]
+        self._single_root = self.names[roots[0]] if len(roots) == 1 else None
+
+    @classmethod
+    def from_depths(
+        cls,
+        names: Sequence[str],
+        depths: Sequence[int],
+        values: Sequence[Sequence[float]],
+        columns: Sequence[str] = MAPL_DEFAULT_COLUMNS,
+    ) -> "ProfileTree":
+        """Build from depth-first rows with their depth (e.g. count of `-`)"""
+        parents = []
+        stack: List[Tuple[int, int]] = []  # (index, depth)
+        for i, depth in enumerate(depths):
+            while stack != [] and stack[-1][1] >= depth:
+                stack.pop()
+            parents.append(stack[-1][0] if stack != [] else -1)
+            stack.append((i, depth))
+        array = np.full((len(names), len(columns)), np.nan)
+        for i, row in enumerate(values):
+            row = list(row)[: len(columns)]
+            array[i, : len(row)] = row
+        return cls(names, parents, array, columns)
+
+    @classmethod
+    def from_timings(
+        cls,
+        timings: Sequence[Tuple[str, float, str]],
+        column: str = INCLUSIVE,
+    ) -> "ProfileTree":
+        """Build from flat (name, time, parent name) tuples"""
+        index: Dict[str, int] = {}
+        for i, (name, _, _) in enumerate(timings):
+            index.setdefault(name, i)
+        parents = [index.get(parent, -1) for _, _, parent in timings]
+        return cls(
+            [name for name, _, _ in timings],
+            parents,
+            np.array([[time] for _, time, _ in timings], dtype=np.float64),
+            [column],
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def index(self, path: str) -> int:
+        """Node index of `path`, the root can be omitted if unique.
+        Raise KeyError if not found."""
+        if path in self._path_index:
+            return self._path_index[path]
+        if self._single_root is not None:
+            rooted = self._single_root + PATH_SEPARATOR + path
+            if rooted in self._path_index:
+                return self._path_index[rooted]
+        raise KeyError(f"No timer {path} in profile")
+
+    def __contains__(self, path: str) -> bool:
+        try:
+            self.index(path)
+        except KeyError:
+            return False
+        return True
+
+    def parent(self, i: int) -> int:
+        return int(self.parents[i])
+
+    def children(self, i: int) -> List[int]:
+        return [int(c) for c in np.flatnonzero(self.parents == i)]
+
+    def get(self, path: str, column: str = INCLUSIVE) -> float:
+        return float(self.values[self.index(path), self._column_index[column]])
+
+    def column(self, column: str) -> np.ndarray:
+        return self.values[:, self._column_index[column]]
+
+    def _combine(
+        self,
+        other: "ProfileTree",
+        op: Callable[[np.ndarray, np.ndarray], np.ndarray],
+        union: bool,
+    ) -> "ProfileTree":
+        columns = [c for c in self.columns if c in other._column_index]
+        own = [self._column_index[c] for c in columns]
+        theirs = [other._column_index[c] for c in columns]
+
+        names = list(self.names)
+        parents = list(self.parents)
+        values = np.full((len(self), len(columns)), np.nan)
+        matched = np.array(
+            [path in other._path_index for path in self.paths], dtype=bool
+        )
+        other_rows = [other._path_index[p] for p in self.paths if p in other._path_index]
+        values[matched] = op(
+            self.values[matched][:, own], other.values[other_rows][:, theirs]
+        )
+        if union:
+            values[~matched] = self.values[~matched][:, own]
+            new_paths: Dict[str, int] = {}
+            new_rows = []
+            for j, path in enumerate(other.paths):
+                if path in self._path_index:
+                    continue
+                parent_path = path.rpartition(PATH_SEPARATOR)[0]
+                if parent_path == "":
+                    parent = -1
+                elif parent_path in self._path_index:
+                    parent = self._path_index[parent_path]
+                else:
+                    parent = new_paths[parent_path]
+                new_paths[path] = len(names)
+                names.append(other.names[j])
+                parents.append(parent)
+                new_rows.append(other.values[j, theirs])
+            if new_rows != []:
+                values = np.vstack([values] + new_rows)
+        return ProfileTree(names, parents, values, columns)
+
+    def diff(self, other: "ProfileTree") -> "ProfileTree":
+        """self - other on the timers of self (NaN when missing in other)"""
+        return self._combine(other, np.subtract, union=False)
+
+    def merge(
+        self,
+        other: "ProfileTree",
+        op: Callable[[np.ndarray, np.ndarray], np.ndarray] = np.add,
+    ) -> "ProfileTree":
+        """Union of both trees, values of common timers reduced with `op`"""
+        return self._combine(other, op, union=True)
+
+    def to_timings(self, column: str = INCLUSIVE) -> List[Tuple[str, float, str]]:
+        """Flat (name, value, parent name) tuples"""
+        values = self.column(column)
+        return [
+            (
+                name,
+                float(values[i]),
+                self.names[self.parents[i]] if self.parents[i] >= 0 else "",
+            )
+            for i, name in enumerate(self.names)
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "names": self.names,
+            "parents": self.parents.tolist(),
+            "values": [
+                [None if np.isnan(v) else v for v in row] for row in self.values.tolist()
+            ],
+            "columns": self.columns,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProfileTree":
+        values = np.array(
+            [[np.nan if v is None else v for v in row] for row in data["values"]],
+            dtype=np.float64,
+        )
+        return cls(data["names"], data["parents"], values, data["columns"])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ProfileTree):
+            return False
+        return (
+            self.names == other.names
+            and self.columns == other.columns
+            and np.array_equal(self.parents, other.parents)
+            and np.array_equal(self.values, other.values, equal_nan=True)
+        )
+
+    def __repr__(self) -> str:
+        return f"ProfileTree({len(self)} timers, columns={self.columns})"
+
+
+def parse_header_columns(line: str) -> Optional[List[str]]:
+    """Profiler columns from a MAPL report header line, None if not a header"""
+    tokens = [t.strip() for t in line.strip().split("  ") if t.strip() != ""]
+    if tokens == [] or tokens[0] != "Name":
+        return None
+    return tokens[1:]
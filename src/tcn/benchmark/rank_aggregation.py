@@ -0,0 +1,249 @@
+import dataclasses
+import glob
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tcn.benchmark.benchmark import MAPLSummaryGrep
+from tcn.benchmark.cache import get_cache
+from tcn.benchmark.history import TIMER_FV_DYCORE_MEDIAN, TIMER_INNER_DYCORE_MEDIAN
+from tcn.benchmark.profile_tree import INCLUSIVE
+from tcn.benchmark.string_trf import RE_NUMERIC, LineConsumer, grep_stream
+from tcn.benchmark.utils import parallel_parse, robust_spread
+
+# Bump when the parsing changes to invalidate the cache
+RANK_CACHE_KEY = "rank_timers.v1"
+
+TIMER_FV_DYCORE_TOTAL = "fv_dyncore_total"
+TIMER_INNER_DYCORE_TOTAL = "inner_dycore_total"
+
+# SLURM `--output=<prefix>.%t.out` per-rank logs
+_RE_RANK_LOG = re.compile(r"^(?P<prefix>.*)\.(?P<rank>\d+)\.out$")
+
+
+def rank_logs(log: str) -> Dict[int, str]:
+    """All per-rank logs of the run `log` (any rank's log) belongs to, by rank"""
+    match = _RE_RANK_LOG.match(log)
+    if not match:
+        raise ValueError(f"{log} is not a per-rank log (<prefix>.<rank>.out)")
+    logs = {}
+    for candidate in glob.glob(f"{glob.escape(match['prefix'])}.*.out"):
+        candidate_match = _RE_RANK_LOG.match(candidate)
+        if candidate_match and candidate_match["prefix"] == match["prefix"]:
+            logs[int(candidate_match["rank"])] = candidate
+    return dict(sorted(logs.items()))
+
+
+class _DycoreRankGrep(LineConsumer):
+    """Per-timestep dycore timings printed by any rank"""
+
+    # `<rank> , geos_gtfv3 <t>`, `<rank>: fv_dynamics <t>`, `[DaCe] Run... <t>`
+    _RE_FV_DYCORE = re.compile(
+        r"^\s*\d+\s*(?:,\s*geos_gtfv3|:\s*fv_dynamics)\s+(?P<time>\S+)"
+    )
+    _INNER_DYCORE = "] Run..."
+
+    def __init__(self) -> None:
+        self.fv_dyncore: List[float] = []
+        self.inner_dycore: List[float] = []
+
+    def feed(self, line: str) -> None:
+        match = self._RE_FV_DYCORE.match(line)
+        if match and RE_NUMERIC.fullmatch(match["time"]):
+            self.fv_dyncore.append(float(match["time"]))
+        elif self._INNER_DYCORE in line:
+            numerics = RE_NUMERIC.findall(line.split(self._INNER_DYCORE)[1])
+            if numerics != []:
+                self.inner_dycore.append(float(numerics[0]))
+
+
+def parse_rank_log(filename: str) -> Dict[str, float]:
+    """Timers of a single rank log, in one read.
+
+    Dycore timers are summarized as total and median over the timesteps. If the
+    rank wrote a MAPL profiler report, each of its timers is keyed by its path
+    (e.g. `All/Run/GCM/AGCM`) with its inclusive time.
+    """
+    cache = get_cache()
+    if cache:
+        cached = cache.load(filename, RANK_CACHE_KEY)
+        if cached is not None:
+            return cached
+
+    dycore = _DycoreRankGrep()
+    summary = MAPLSummaryGrep()
+    grep_stream(filename, [dycore, summary])
+
+    timers: Dict[str, float] = {}
+    for total, median, timings in [
+        (TIMER_FV_DYCORE_TOTAL, TIMER_FV_DYCORE_MEDIAN, dycore.fv_dyncore),
+        (TIMER_INNER_DYCORE_TOTAL, TIMER_INNER_DYCORE_MEDIAN, dycore.inner_dycore),
+    ]:
+        if timings != []:
+            timers[total] = float(np.sum(timings))
+            timers[median] = float(np.median(timings))
+    profile = summary.profile()
+    values = profile.column(INCLUSIVE) if INCLUSIVE in profile.columns else []
+    for path, value in zip(profile.paths, values):
+        # Duplicated paths: first one is kept, as for the profile lookups
+        if not np.isnan(value) and path not in timers:
+            timers[path] = float(value)
+
+    if cache:
+        cache.store(filename, RANK_CACHE_KEY, timers)
+    return timers
+
+
+@dataclasses.dataclass
+class RankTimerStats:
+    """Distribution of a timer across ranks"""
+
+    timer: str
+    ranks: List[int]
+    values: np.ndarray
+    stragglers: List[int] = dataclasses.field(default_factory=list)
+
+    @property
+    def min(self) -> float:
+        return float(np.min(self.values))
+
+    @property
+    def max(self) -> float:
+        return float(np.max(self.values))
+
+    @property
+    def mean(self) -> float:
+        return float(np.mean(self.values))
+
+    @property
+    def imbalance(self) -> float:
+        """(max - mean) / mean: fraction of time the slowest rank makes
+        the others wait, 0 when perfectly balanced"""
+        mean = self.mean
+        return (self.max - mean) / mean if mean > 0 else 0.0
+
+    @property
+    def slowest_rank(self) -> int:
+        return self.ranks[int(np.argmax(self.values))]
+
+    def __str__(self) -> str:
+        s = (
+            f"{self.timer}: min {self.min:.3f}s max {self.max:.3f}s "
+            f"mean {self.mean:.3f}s imbalance {self.imbalance:.1%} "
+            f"over {len(self.ranks)} ranks (slowest: {self.slowest_rank})"
+        )
+        if self.stragglers != []:
+            s += f" stragglers: {self.stragglers}"
+        return s
+
+
+def _find_stragglers(
+    ranks: List[int],
+    values: np.ndarray,
+    z_threshold: float,
+    min_relative_excess: float,
+) -> List[int]:
+    """Ranks significantly slower than the median rank (robust z-score)"""
+    median = float(np.median(values))
+    spread = robust_spread(values, median)
+    if spread <= 0:
+        return []
+    slow = ((values - median) / spread > z_threshold) & (
+        values > median * (1.0 + min_relative_excess)
+    )
+    return [ranks[i] for i in np.flatnonzero(slow)]
+
+
+@dataclasses.dataclass
+class RankAggregate:
+    """Per-timer statistics across all ranks of a run"""
+
+    logs: Dict[int, str]
+    timers: Dict[str, RankTimerStats]
+
+    @property
+    def ranks(self) -> List[int]:
+        return list(self.logs.keys())
+
+    def stragglers(self) -> Dict[int, List[str]]:
+        """Timers on which each straggler rank is flagged"""
+        ranks: Dict[int, List[str]] = {}
+        for stats in self.timers.values():
+            for rank in stats.stragglers:
+                ranks.setdefault(rank, []).append(stats.timer)
+        return dict(sorted(ranks.items()))
+
+    def most_imbalanced(self, n: int = 10) -> List[RankTimerStats]:
+        return sorted(self.timers.values(), key=lambda s: s.imbalance, reverse=True)[:n]
+
+    def __str__(self) -> str:
+        s = f"Load imbalance over {len(self.logs)} ranks:\n"
+        for stats in self.most_imbalanced():
+            s += f"  {stats}\n"
+        stragglers = self.stragglers()
+        if stragglers != {}:
+            s += "Straggler ranks:\n"
+            for rank, timers in stragglers.items():
+                s += f"  {rank}: {', '.join(timers)}\n"
+        return s
+
+
+def aggregate_ranks(
+    logs: Dict[int, str],
+    max_workers: Optional[int] = None,
+    z_threshold: float = 3.0,
+    min_relative_excess: float = 0.05,
+) -> RankAggregate:
+    """Stream all per-rank logs of a run in parallel and aggregate their timers.
+
+    A timer is aggregated over the ranks that reported it. A rank is flagged as
+    straggler on a timer if it is more than `z_threshold` robust standard
+    deviations (MAD) and `min_relative_excess` slower than the median rank.
+
+    Args:
+        logs: per-rank logs, by rank (see `rank_logs`)
+        max_workers: size of the process pool, see `parallel_parse`
+    """
+    ranks = list(logs.keys())
+    results = parallel_parse(
+        parse_rank_log,
+        logs.values(),
+        max_workers,
+        chunksize=4,
+        description="rank logs",
+    )
+
+    per_timer: Dict[str, Tuple[List[int], List[float]]] = {}
+    for rank, timers in zip(ranks, results):
+        for timer, value in timers.items():
+            timer_ranks, values = per_timer.setdefault(timer, ([], []))
+            timer_ranks.append(rank)
+            values.append(value)
+
+    aggregated = {}
+    for timer, (timer_ranks, values) in per_timer.items():
+        array = np.asarray(values, dtype=np.float64)
+        aggregated[timer] = RankTimerStats(
+            timer,
+            timer_ranks,
+            array,
+            _find_stragglers(timer_ranks, array, z_threshold, min_relative_excess),
+        )
+    return RankAggregate(logs, aggregated)
+
+
+def imbalance_report(log: str) -> str:
+    """Load imbalance of the run of the per-rank `log`, or why it is missing.
+
+    Meant for reports: a rank log failing to parse doesn't fail the caller."""
+    try:
+        return str(aggregate_ranks(rank_logs(log)))
+    except (RuntimeError, ValueError) as e:
+        return f"Load imbalance not available: {e}\n"
+
+
+if __name__ == "__main__":
+    import sys
+
+    print(aggregate_ranks(rank_logs(sys.argv[1])))
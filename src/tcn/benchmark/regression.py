@@ -0,0 +1,159 @@
+import dataclasses
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tcn.benchmark.benchmark import Benchmark
+from tcn.benchmark.history import (
+    GROUP_DYCORE,
+    GROUP_GLOBAL,
+    TIMER_FV_DYCORE_MEDIAN,
+    TIMER_INNER_DYCORE_MEDIAN,
+    BenchmarkHistory,
+    benchmark_to_rows,
+    resolution_label,
+)
+from tcn.benchmark.utils import MAD_TO_STD
+
+# (group, timer) checked by default
+DEFAULT_REGRESSION_TIMERS: List[Tuple[str, str]] = [
+    (GROUP_GLOBAL, "run"),
+    (GROUP_DYCORE, TIMER_FV_DYCORE_MEDIAN),
+    (GROUP_DYCORE, TIMER_INNER_DYCORE_MEDIAN),
+]
+
+
+@dataclasses.dataclass
+class RegressionResult:
+    group: str
+    timer: str
+    candidate: float
+    baseline_runs: int
+    baseline_median: float = float("nan")
+    baseline_mad: float = float("nan")
+    ci_low: float = float("nan")  # bootstrap CI of the baseline median
+    ci_high: float = float("nan")
+    robust_z: float = float("nan")
+    is_regression: bool = False
+
+    @property
+    def relative_change(self) -> float:
+        if self.baseline_median == 0:
+            # Timer absent (zero) in the history
+            return np.inf if self.candidate > 0 else 0.0
+        return self.candidate / self.baseline_median - 1.0
+
+    def __str__(self) -> str:
+        if np.isnan(self.baseline_median):
+            return (
+                f"{self.group}/{self.timer}: {self.candidate:.3f}s "
+                f"(not enough history: {self.baseline_runs} runs)"
+            )
+        return (
+            f"{self.group}/{self.timer}: {self.candidate:.3f}s vs "
+            f"{self.baseline_median:.3f}s [{self.ci_low:.3f}, {self.ci_high:.3f}] "
+            f"over {self.baseline_runs} runs, {self.relative_change:+.1%}, "
+            f"z={self.robust_z:.1f}{' REGRESSION' if self.is_regression else ''}"
+        )
+
+
+def compare_to_baseline(
+    baseline: np.ndarray,
+    candidate: float,
+    group: str = "",
+    timer: str = "",
+    min_runs: int = 5,
+    z_threshold: float = 3.0,
+    min_relative_change: float = 0.03,
+    confidence: float = 0.95,
+    bootstrap_samples: int = 2000,
+    seed: Optional[int] = 0,
+) -> RegressionResult:
+    """Robust comparison of a candidate value against baseline runs.
+
+    A regression is a slowdown where the candidate is:
+        - above the upper bound of the bootstrap confidence interval of the
+          baseline median,
+        - more than `z_threshold` robust standard deviations (MAD) away from
+          the median,
+        - slower by more than `min_relative_change`.
+    """
+    baseline = np.asarray(baseline, dtype=np.float64)
+    baseline = baseline[np.isfinite(baseline)]
+    result = RegressionResult(group, timer, candidate, baseline_runs=len(baseline))
+    if len(baseline) < min_runs:
+        return result
+
+    result.baseline_median = float(np.median(baseline))
+    result.baseline_mad = float(np.median(np.abs(baseline - result.baseline_median)))
+
+    # Bootstrap the median: all resamples drawn at once
+    rng = np.random.default_rng(seed)
+    resamples = rng.choice(baseline, size=(bootstrap_samples, len(baseline)))
+    medians = np.median(resamples, axis=1)
+    alpha = (1.0 - confidence) / 2
+    result.ci_low, result.ci_high = (
+        float(q) for q in np.quantile(medians, [alpha, 1.0 - alpha])
+    )
+
+    spread = MAD_TO_STD * result.baseline_mad
+    if spread > 0:
+        result.robust_z = (candidate - result.baseline_median) / spread
+    else:
+        result.robust_z = np.inf if candidate > result.baseline_median else 0.0
+
+    result.is_regression = bool(
+        candidate > result.ci_high
+        and result.robust_z > z_threshold
+        and result.relative_change > min_relative_change
+    )
+    return result
+
+
+def detect_regressions(
+    benchmark: Benchmark,
+    history: BenchmarkHistory,
+    last_n: int = 20,
+    timers: List[Tuple[str, str]] = DEFAULT_REGRESSION_TIMERS,
+    **kwargs,
+) -> List[RegressionResult]:
+    """Compare a new run against its rolling baseline in the history.
+
+    The baseline is the `last_n` runs recorded with the same backend,
+    resolution and layout. The benchmark should be appended to the history
+    after this check. Extra arguments are forwarded to `compare_to_baseline`.
+    """
+    # First occurrence of a timer in its group, as in the history queries
+    candidates: Dict[Tuple[str, str], float] = {}
+    for row in benchmark_to_rows(benchmark):
+        candidates.setdefault((row["group"], row["timer"]), row["value"])
+    results = []
+    for group, timer in timers:
+        if (group, timer) not in candidates:
+            continue
+        baseline = history.timer_series(
+            group,
+            timer,
+            benchmark.backend,
+            resolution_label(benchmark),
+            last_n=last_n,
+            layout_nx=benchmark.node_setup[0],
+            layout_ny=benchmark.node_setup[1],
+        )
+        results.append(
+            compare_to_baseline(
+                baseline.to_numpy(),
+                candidates[(group, timer)],
+                group=group,
+                timer=timer,
+                **kwargs,
+            )
+        )
+    return results
+
+
+def regression_report(benchmark: Benchmark, results: List[RegressionResult]) -> str:
+    s = f"Regression check for {benchmark.backend}:\n"
+    for result in results:
+        s += f"  {result}\n"
+    return s
@@ -1,52 +1,149 @@
-import itertools
+import dataclasses
+import html
+import json
+import math
 from dataclasses import dataclass, field
-from typing import Any, Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional
 
 import click
 import numpy as np
 import plotly.graph_objects as go
 
-from tcn.benchmark.geos_log_parser import parse_geos_log
+from tcn.benchmark.geos_log_parser import parse_geos_logs
 from tcn.benchmark.benchmark import Benchmark
-from tcn.hws.graph import energy_envelop_calculation
+from tcn.benchmark.history import BenchmarkHistory
+from tcn.benchmark.profile_tree import ProfileTree
+from tcn.benchmark.timing_series import (
+    TimingSeriesStats,
+    analyze_timings,
+    detect_warmup,
+)
+from tcn.hws.analysis import (
+    energy_envelop_calculation,
+    energy_per_tick,
+    load_data,
+    sample_timestamps,
+)
+from tcn.hws.constants import HWS_TICK_TIMESTEP
 
 
 @dataclass
 class BenchmarkReport:
+    """Metrics of N benchmarks compared to a baseline.
+
+    Values are computed once by `report`, the `to_*` methods only render."""
+
     setup: str = ""
-    per_backend_per_metric_comparison: List[Any] = field(default_factory=list)
+    backends: List[str] = field(default_factory=list)
+    baseline: int = 0  # index in backends
+    # metric label -> value per backend (None: not available)
+    metrics: Dict[str, List[Optional[float]]] = field(default_factory=dict)
+    # Dycore timestep statistics per backend (None: no timings)
+    dycore_stats: List[Optional[TimingSeriesStats]] = field(default_factory=list)
     per_backend_gridcomp_breakdown_fig: str = ""  # html figures
 
+    def speedups(self, metric: str) -> List[Optional[float]]:
+        """Speed up of each backend over the baseline (lower metric is better,
+        but for throughputs)"""
+        values = self.metrics[metric]
+        reference = values[self.baseline]
+        if metric in _HIGHER_IS_BETTER:
+            return [
+                value / reference if reference and value else None for value in values
+            ]
+        return [reference / value if reference and value else None for value in values]
+
+    def _cells(self, metric: str) -> List[str]:
+        cells = []
+        for value, speed_up in zip(self.metrics[metric], self.speedups(metric)):
+            if value is None:
+                cells.append("-")
+            elif speed_up is None:
+                cells.append(f"{value:.2f}")
+            else:
+                cells.append(f"{value:.2f} ({speed_up:.2f}x)")
+        return cells
+
+    def to_markdown(self) -> str:
+        headers = ["Metric"] + [
+            f"{backend} (baseline)" if i == self.baseline else backend
+            for i, backend in enumerate(self.backends)
+        ]
+        s = "| " + " | ".join(headers) + " |\n"
+        s += "|" + "---|" * len(headers) + "\n"
+        for metric in self.metrics.keys():
+            s += "| " + " | ".join([metric] + self._cells(metric)) + " |\n"
+        if any(self.dycore_stats):
+            s += "\nDycore timesteps:\n"
+            for backend, stats in zip(self.backends, self.dycore_stats):
+                if stats is not None:
+                    s += f"- {backend} dycore: {stats}\n"
+        return s
+
+    def to_html(self) -> str:
+        s = f"<pre>{html.escape(self.setup)}</pre>\n<table>\n<tr><th>Metric</th>"
+        for i, backend in enumerate(self.backends):
+            baseline = " (baseline)" if i == self.baseline else ""
+            s += f"<th>{html.escape(backend)}{baseline}</th>"
+        s += "</tr>\n"
+        for metric in self.metrics.keys():
+            s += f"<tr><td>{html.escape(metric)}</td>"
+            s += "".join(f"<td>{cell}</td>" for cell in self._cells(metric))
+            s += "</tr>\n"
+        s += "</table>\n"
+        if any(self.dycore_stats):
+            s += "<p>Dycore timesteps:</p>\n<ul>\n"
+            for backend, stats in zip(self.backends, self.dycore_stats):
+                if stats is not None:
+                    s += f"<li>{html.escape(backend)} dycore: {html.escape(str(stats))}</li>\n"
+            s += "</ul>\n"
+        return s
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "setup": self.setup,
+                "backends": self.backends,
+                "baseline": self.backends[self.baseline],
+                "metrics": {
+                    metric: {"values": values, "speedups": self.speedups(metric)}
+                    for metric, values in self.metrics.items()
+                },
+                "dycore_stats": {
+                    backend: _json_stats(stats)
+                    for backend, stats in zip(self.backends, self.dycore_stats)
+                    if stats is not None
+                },
+            },
+            indent=2,
+        )
+
     def __repr__(self) -> str:
         return self.__str__()
 
     def __str__(self) -> str:
-        s = self.setup + "\n"
-        for bmc in self.per_backend_per_metric_comparison:
-            for key, value in bmc.items():
-                s += f"{key}:\n  {value}\n"
-        return s
+        return self.setup + "\n" + self.to_markdown()
 
 
-def _index_in_profiling(parent, profilings) -> int:
-    for i, (shortname, _, _) in enumerate(profilings):
-        if parent == shortname:
-            return i
-    return -1
+def _json_stats(stats: TimingSeriesStats) -> Dict:
+    """Statistics as JSON-able values, NaN (not available) as None"""
+    return {
+        key: None if isinstance(value, float) and math.isnan(value) else value
+        for key, value in dataclasses.asdict(stats).items()
+    }
 
 
 def sankey_plot_of_gridcomp(raw_data: Benchmark, filename: str, title: str):
+    profile = ProfileTree.from_timings(raw_data.fv_gridcomp_detailed_profiling)
     sources = []
     targets = []
     values = []
-    for i, (_shortname, value, parent) in enumerate(
+    for i, (_shortname, value, _parent) in enumerate(
         raw_data.fv_gridcomp_detailed_profiling
     ):
-        if parent == "":
+        if profile.parent(i) < 0:
             continue
-        sources.append(
-            _index_in_profiling(parent, raw_data.fv_gridcomp_detailed_profiling)
-        )
+        sources.append(profile.parent(i))
         targets.append(i)
         values.append(value)
 
@@ -72,29 +169,113 @@ def sankey_plot_of_gridcomp(raw_data: Benchmark, filename: str, title: str):
     fig.write_image(f"{filename}.png")
 
 
-REPORT_TIME_KEY = "Time (in seconds)"
-REPORT_COST_KEY = "Cost (in kW)"
-REPORT_ENERGY_KEY = "Energy (in seconds.k$)"
+REPORT_GLOBAL_RUN = "Global RUN (s)"
+REPORT_FV_GRIDCOMP = "FV Grid Comp, warmup removed (s)"
+REPORT_DYCORE = "Dycore median (s)"
+REPORT_GT_DYCORE = "GT dycore median (s)"
+REPORT_THROUGHPUT = "Dycore throughput, warmup removed (SDPD)"
+REPORT_ENERGY = "Overall energy envelop (kWh)"
+REPORT_ENERGY_PER_DAY = "Energy per simulated day (kWh)"
 
+_HIGHER_IS_BETTER = [REPORT_THROUGHPUT]
 
-def _comparison_in_X(value_A, value_B, label: str, unit: str = "s") -> str:
-    if value_A > value_B:
-        speed_up = value_A / value_B
-        return (
-            f"{label}: 1.00x ({value_A:.2f}{unit}) - "
-            f"{speed_up:.2f}x ({value_B:.2f}{unit})\n"
+
+def _fv_gridcomp_run(bench: Benchmark, warmup_time: float) -> Optional[float]:
+    if bench.fv_gridcomp_detailed_profiling == []:
+        return None
+    fvcomp_run = 0.0
+    for key, value, _ in bench.fv_gridcomp_detailed_profiling:
+        if key == "RUN":
+            fvcomp_run += value - warmup_time
+        elif key == "RUN2":
+            fvcomp_run += value
+    return fvcomp_run
+
+
+def _energy_envelop(bench: Benchmark) -> Optional[float]:
+    if bench.hws_data == {}:
+        return None
+    eReport = energy_envelop_calculation(
+        bench.hws_data["cpu_psu"],
+        bench.hws_data["gpu_psu"],
+        verbose=False,
+        timestamps=sample_timestamps(bench.hws_data, len(bench.hws_data["cpu_psu"])),
+    )
+    if bench.backend == "fortran":
+        return eReport.CPU_kWh
+    return eReport.overall_kWh
+
+
+def _energy_per_simulated_day(bench: Benchmark) -> Optional[float]:
+    """From the energy of the model timesteps marked by hws ticks"""
+    if bench.hws_data == {} or bench.timestep_s <= 0:
+        return None
+    timesteps = energy_per_tick(bench.hws_data).get(HWS_TICK_TIMESTEP, [])
+    if timesteps == []:
+        return None
+    # Median timestep: robust to the warmup & outliers steps
+    step_kWh = float(
+        np.median(
+            [
+                step.CPU_kWh if bench.backend == "fortran" else step.overall_kWh
+                for step in timesteps
+            ]
         )
-    else:
-        speed_up = value_B / value_A
-        return (
-            f"{label}: {speed_up:.2f}x ({value_A:.2f}{unit}) -  "
-            f"1.00x ({value_B:.2f}{unit})\n"
+    )
+    return step_kWh * 24 * 3600 / bench.timestep_s
+
+
+def _dycore_stats(bench: Benchmark) -> TimingSeriesStats:
+    return analyze_timings(
+        bench.fv_dyncore_timings,
+        timestep_s=bench.timestep_s if bench.timestep_s > 0 else None,
+    )
+
+
+def _metrics(
+    bench: Benchmark, fv_stats: TimingSeriesStats
+) -> Dict[str, Optional[float]]:
+    return {
+        REPORT_GLOBAL_RUN: bench.global_run_time,
+        REPORT_FV_GRIDCOMP: _fv_gridcomp_run(bench, fv_stats.warmup_time),
+        REPORT_DYCORE: fv_stats.p50 if fv_stats.count > 0 else None,
+        REPORT_GT_DYCORE: (
+            analyze_timings(bench.inner_dycore_timings).p50
+            if bench.inner_dycore_timings != []
+            else None
+        ),
+        REPORT_THROUGHPUT: (
+            None if np.isnan(fv_stats.throughput_sdpd) else fv_stats.throughput_sdpd
+        ),
+        REPORT_ENERGY: _energy_envelop(bench),
+        REPORT_ENERGY_PER_DAY: _energy_per_simulated_day(bench),
+    }
+
+
+def _unique_labels(raw_data: List[Benchmark]) -> List[str]:
+    """Backend names, numbered when the same backend is given more than once"""
+    backends = [bench.backend for bench in raw_data]
+    return [
+        (
+            f"{backend} #{backends[:i].count(backend) + 1}"
+            if backends.count(backend) > 1
+            else backend
         )
+        for i, backend in enumerate(backends)
+    ]
 
 
-def report(raw_data: List[Benchmark]) -> Optional[BenchmarkReport]:
+def report(
+    raw_data: List[Benchmark],
+    baseline: int = 0,
+) -> Optional[BenchmarkReport]:
+    """Compare all benchmarks to the one at index `baseline`"""
     if raw_data == []:
         return None
+    if not 0 <= baseline < len(raw_data):
+        raise ValueError(
+            f"Baseline index {baseline} out of range for {len(raw_data)} benchmarks"
+        )
 
     report = BenchmarkReport()
 
@@ -120,98 +301,68 @@ def report(raw_data: List[Benchmark]) -> Optional[BenchmarkReport]:
             f", {bench_data.node_setup[2]} ranks\n"
         )
 
-    # Compute speed ups
-    raw_backends_2by2 = itertools.combinations(raw_data, 2)
-    for benchA, benchB in raw_backends_2by2:  # Time
-        time_report = f"{benchA.backend} vs {benchB.backend}\n\n"
-        time_report += _comparison_in_X(
-            benchA.global_run_time, benchB.global_run_time, "Global RUN"
-        )
-
-        first_fv_timestep_A = benchA.fv_dyncore_timings[0]
-        first_fv_timestep_B = benchB.fv_dyncore_timings[0]
-
-        benchA_fvcomp_run = 0.0
-        for key, value, _ in benchA.fv_gridcomp_detailed_profiling:
-            if key == "RUN":
-                benchA_fvcomp_run += value - first_fv_timestep_A
-            elif key == "RUN2":
-                benchA_fvcomp_run += value
-        benchB_fvcomp_run = 0.0
-        for key, value, _ in benchB.fv_gridcomp_detailed_profiling:
-            if key == "RUN":
-                benchB_fvcomp_run = value - first_fv_timestep_B
-            elif key == "RUN2":
-                benchB_fvcomp_run += value
-        time_report += _comparison_in_X(
-            benchA_fvcomp_run,
-            benchB_fvcomp_run,
-            "FV Grid Comp (1st timestep removed)",
-        )
-
-        benchA_dycore_median = np.median(benchA.fv_dyncore_timings)
-        benchB_dycore_median = np.median(benchB.fv_dyncore_timings)
-        time_report += _comparison_in_X(
-            benchA_dycore_median,
-            benchB_dycore_median,
-            "Dycore (median)",
-        )
-        if benchA.inner_dycore_timings != [] and benchB.inner_dycore_timings != []:
-            time_report += _comparison_in_X(
-                np.median(benchA.inner_dycore_timings),
-                np.median(benchB.inner_dycore_timings),
-                "GT dycore (median)",
-            )
-
-        report.per_backend_per_metric_comparison.append({REPORT_TIME_KEY: time_report})
-
-        # Energy
-        if benchA.hws_data != {}:
-            energy_report = f"{benchA.backend} vs {benchB.backend}\n\n"
-
-            eReport = energy_envelop_calculation(
-                benchA.hws_data["cpu_psu"],
-                benchA.hws_data["gpu_psu"],
-            )
-            if benchA.backend == "fortran":
-                benchA_global_kW_envelop = eReport.CPU_envelop_kWh
-            else:
-                benchA_global_kW_envelop = (
-                    eReport.GPU_envelop_kWh + eReport.CPU_envelop_kWh
-                )
-
-            eReport = energy_envelop_calculation(
-                benchB.hws_data["cpu_psu"],
-                benchB.hws_data["gpu_psu"],
-            )
-            if benchB.backend == "fortran":
-                benchB_global_kW_envelop = eReport.CPU_envelop_kWh
-            else:
-                benchB_global_kW_envelop = (
-                    eReport.GPU_envelop_kWh + eReport.CPU_envelop_kWh
-                )
-
-            energy_report += _comparison_in_X(
-                benchA_global_kW_envelop,
-                benchB_global_kW_envelop,
-                "Overall energy envelop",
-                unit="kW",
-            )
-            report.per_backend_per_metric_comparison.append(
-                {REPORT_ENERGY_KEY: energy_report}
-            )
+    # One pass over the data, metrics without any value are dropped
+    report.backends = _unique_labels(raw_data)
+    report.baseline = baseline
+    fv_stats = [_dycore_stats(bench_data) for bench_data in raw_data]
+    report.dycore_stats = [stats if stats.count > 0 else None for stats in fv_stats]
+    per_backend = [
+        _metrics(bench_data, stats) for bench_data, stats in zip(raw_data, fv_stats)
+    ]
+    for metric in per_backend[0].keys():
+        values = [metrics[metric] for metrics in per_backend]
+        if any(value is not None for value in values):
+            report.metrics[metric] = values
 
     return report
 
 
 @click.command()
 @click.argument("geos_logs", nargs=-1)
-def cli(geos_logs: Iterable[str]):
-    benchmark_raw_data: List[Benchmark] = []
-    for log in geos_logs:
-        benchmark_raw_data.append(parse_geos_log(log))
-    r = report(benchmark_raw_data)
+@click.option("--history", default="", help="Benchmark history store to append to")
+@click.option("--experiment", default="report", help="Experiment name in history")
+@click.option("--baseline", default=0, help="Index of the baseline log")
+@click.option(
+    "--output",
+    default="",
+    help="Write the report to this file, format from the extension (.md, .html, .json)",
+)
+@click.option(
+    "--hws",
+    multiple=True,
+    help="Hardware sampler dump (.npz, .arrows) of each log, in the same order",
+)
+def cli(
+    geos_logs: Iterable[str],
+    history: str,
+    experiment: str,
+    baseline: int,
+    output: str,
+    hws: Iterable[str],
+):
+    geos_logs = list(geos_logs)
+    if geos_logs != [] and not 0 <= baseline < len(geos_logs):
+        raise click.BadParameter(
+            f"{baseline} is not the index of one of the {len(geos_logs)} logs",
+            param_hint="--baseline",
+        )
+    benchmark_raw_data = parse_geos_logs(geos_logs)
+    for raw_data, hws_dump in zip(benchmark_raw_data, hws):
+        raw_data.hws_data = dict(load_data(hws_dump))
+    if history != "":
+        benchmark_history = BenchmarkHistory(history)
+        for raw_data in benchmark_raw_data:
+            benchmark_history.append(raw_data, experiment)
+    r = report(benchmark_raw_data, baseline=baseline)
     print(r)
+    if r and output != "":
+        with open(output, "w") as f:
+            if output.endswith(".html"):
+                f.write(r.to_html())
+            elif output.endswith(".json"):
+                f.write(r.to_json())
+            else:
+                f.write(str(r))
     for raw_data in benchmark_raw_data:
         if raw_data.fv_gridcomp_detailed_profiling != []:
             sankey_plot_of_gridcomp(
@@ -220,8 +371,11 @@ def cli(geos_logs: Iterable[str]):
                 f"FV Grid Comp for {raw_data.backend}",
             )
     for raw_data in benchmark_raw_data:
+        warmup = detect_warmup(raw_data.fv_dyncore_timings)
         x = np.arange(len(raw_data.fv_dyncore_timings))
-        fig = go.Figure(data=go.Scatter(x=x[1:], y=raw_data.fv_dyncore_timings[1:]))
+        fig = go.Figure(
+            data=go.Scatter(x=x[warmup:], y=raw_data.fv_dyncore_timings[warmup:])
+        )
         fig.write_image(f"dyncore_verif_{raw_data.backend}.png")
 
 
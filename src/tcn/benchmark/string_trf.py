@@ -1,5 +1,5 @@
 import re
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
 _numeric_const_pattern = (
     "[-+]? (?: (?: \d* \. \d+ ) | (?: \d+ \.? ) )(?: [Ee] [+-]? \d+ ) ?"  # noqa
@@ -16,6 +16,87 @@ def extract_numerics(strings: List[str]) -> List[float]:
     return [float(r) for r in results]
 
 
+class LineConsumer:
+    """Receives the lines of a file one at a time, see `grep_stream`"""
+
+    done: bool = False
+
+    def feed(self, line: str) -> None:
+        raise NotImplementedError
+
+
+class LineGrep(LineConsumer):
+    """Streaming version of `grep`: lines are fed one at a time.
+
+    Allows many patterns to be searched in a single read of the file,
+    see `grep_stream`.
+    """
+
+    def __init__(
+        self,
+        pattern: str,
+        exclude_pattern: Optional[bool] = False,
+        start_patterns: Optional[List[str]] = None,
+        end_pattern: Optional[str] = None,
+        expected: Optional[bool] = True,
+        starts_with: bool = False,
+    ):
+        self.pattern = pattern
+        self.exclude_pattern = exclude_pattern
+        self.end_pattern = end_pattern
+        self.expected = expected
+        self.starts_with = starts_with
+        self.results: List[str] = []
+        self.done = False
+        self._start_patterns = start_patterns.copy() if start_patterns else None
+        self._start_pattern = (
+            self._start_patterns.pop(0) if self._start_patterns else None
+        )
+
+    def feed(self, line: str) -> None:
+        if self.done:
+            return
+        if self._start_pattern and self._start_pattern in line:
+            if self._start_patterns != []:
+                self._start_pattern = (
+                    self._start_patterns.pop(0) if self._start_patterns else None
+                )
+            else:
+                self._start_pattern = None
+        if self.end_pattern and self.end_pattern in line:
+            self.done = True
+            return
+        if not self._start_pattern and self.pattern in line:
+            if self.exclude_pattern and self.starts_with and line.startswith(
+                self.pattern
+            ):
+                line = "".join(line.split(self.pattern)[1:])
+            elif self.exclude_pattern and self.pattern in line:
+                line = "".join(line.split(self.pattern)[1:])
+            if line != "":
+                self.results.append(line)
+
+    def check(self) -> List[str]:
+        """Results of the grep, raise if results were expected but none found"""
+        if self.expected and self.results == []:
+            raise RuntimeError(f"Expecting {self.pattern} to be found")
+        return self.results
+
+
+def grep_stream(filename: str, consumers: Iterable[LineConsumer]) -> None:
+    """Read `filename` once, line by line, feeding every consumer.
+
+    Reading stops early when all consumers are done.
+    """
+    consumers = list(consumers)
+    with open(filename, "r") as f:
+        for line in f:
+            for c in consumers:
+                c.feed(line)
+            if all(c.done for c in consumers):
+                break
+
+
 def grep(
     filename: str,
     pattern: str,
@@ -25,25 +106,13 @@ def grep(
     expected: Optional[bool] = True,
     starts_with: bool = False,
 ) -> List[str]:
-    results = []
-    spatterns = start_patterns.copy() if start_patterns else None
-    start_pattern = spatterns.pop(0) if spatterns else None
-    with open(filename, "r") as f:
-        for line in f.readlines():
-            if start_pattern and start_pattern and start_pattern in line:
-                if spatterns != []:
-                    start_pattern = spatterns.pop(0) if spatterns else None
-                else:
-                    start_pattern = None
-            if end_pattern and end_pattern in line:
-                break
-            if not start_pattern and pattern in line:
-                if exclude_pattern and starts_with and line.startswith(pattern):
-                    line = "".join(line.split(pattern)[1:])
-                elif exclude_pattern and pattern in line:
-                    line = "".join(line.split(pattern)[1:])
-                if line != "":
-                    results.append(line)
-    if expected and results == []:
-        raise RuntimeError(f"Expecting {pattern} to be found")
-    return results
+    g = LineGrep(
+        pattern,
+        exclude_pattern=exclude_pattern,
+        start_patterns=start_patterns,
+        end_pattern=end_pattern,
+        expected=expected,
+        starts_with=starts_with,
+    )
+    grep_stream(filename, [g])
+    return g.check()
@@ -0,0 +1,127 @@
+import dataclasses
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from tcn.benchmark.utils import MAD_TO_STD, robust_spread
+
+
+@dataclasses.dataclass
+class TimingSeriesStats:
+    """Statistics of a per-timestep timing series (seconds)"""
+
+    count: int = 0
+    warmup_steps: int = 0  # leading slow steps (compilation, caches...)
+    warmup_time: float = 0
+    steady_state_time: float = 0  # total time after warmup
+    outliers: List[int] = dataclasses.field(default_factory=list)  # step index
+    mean: float = float("nan")  # steady state only from here
+    p50: float = float("nan")
+    p90: float = float("nan")
+    p99: float = float("nan")
+    jitter: float = float("nan")  # robust coefficient of variation (MAD / median)
+    throughput_sdpd: float = float("nan")  # simulated days per day
+
+    def __str__(self) -> str:
+        return (
+            f"{self.count} steps ({self.warmup_steps} warmup: "
+            f"{self.warmup_time:.2f}s, {len(self.outliers)} outliers) "
+            f"p50 {self.p50:.3f}s p90 {self.p90:.3f}s p99 {self.p99:.3f}s "
+            f"jitter {self.jitter:.1%}"
+            + (
+                f" throughput {self.throughput_sdpd:.1f} SDPD"
+                if not np.isnan(self.throughput_sdpd)
+                else ""
+            )
+        )
+
+
+def _warmup_split(x: np.ndarray, max_split: int, z_threshold: float) -> int:
+    """Best single mean-shift changepoint in the first `max_split` steps,
+    0 if the head is not significantly slower than the tail"""
+    n = len(x)
+    if n < 3 or max_split < 1:
+        return 0
+
+    # SSE of x[:k] and x[k:] for all k in [1, n-1], scored at once
+    csum = np.cumsum(x)
+    csum2 = np.cumsum(x * x)
+    k = np.arange(1, n)
+    head_sse = csum2[:-1] - csum[:-1] ** 2 / k
+    tail_sum = csum[-1] - csum[:-1]
+    tail_sse = (csum2[-1] - csum2[:-1]) - tail_sum**2 / (n - k)
+    cost = head_sse + tail_sse
+    split = int(np.argmin(cost[:max_split])) + 1
+
+    steady = x[split:]
+    median = float(np.median(steady))
+    spread = robust_spread(steady, median)
+    if np.all(x[:split] > median + z_threshold * spread):
+        return split
+    return 0
+
+
+def detect_warmup(
+    timings: Sequence[float],
+    max_warmup_fraction: float = 0.5,
+    z_threshold: float = 5.0,
+) -> int:
+    """Number of leading warmup steps (compilation, cache build...).
+
+    Found as mean-shift changepoints: the best split of the series is kept if
+    all steps before it are significantly slower than the steps after it,
+    measured in robust standard deviations. The search is repeated on the
+    remaining steps since warmup decays over several steps (e.g. DaCe
+    `BuildAndRun`), up to `max_warmup_fraction` of the series.
+    """
+    x = np.asarray(timings, dtype=np.float64)
+    max_warmup = int(len(x) * max_warmup_fraction)
+    warmup = 0
+    while True:
+        split = _warmup_split(x[warmup:], max_warmup - warmup, z_threshold)
+        if split == 0:
+            return warmup
+        warmup += split
+
+
+def analyze_timings(
+    timings: Sequence[float],
+    timestep_s: Optional[float] = None,
+    outlier_z_threshold: float = 5.0,
+) -> TimingSeriesStats:
+    """Warmup, outliers, percentiles and throughput of a timing series.
+
+    Args:
+        timings: wall time of each timestep in seconds
+        timestep_s: simulated time of a timestep, to compute the throughput
+        outlier_z_threshold: robust z-score above which a steady state
+            step is an outlier
+    """
+    x = np.asarray(timings, dtype=np.float64)
+    stats = TimingSeriesStats(count=len(x))
+    if len(x) == 0:
+        return stats
+
+    warmup = detect_warmup(x)
+    stats.warmup_steps = warmup
+    stats.warmup_time = float(np.sum(x[:warmup]))
+    steady = x[warmup:]
+    stats.steady_state_time = float(np.sum(steady))
+
+    stats.mean = float(np.mean(steady))
+    stats.p50, stats.p90, stats.p99 = (
+        float(p) for p in np.percentile(steady, [50, 90, 99])
+    )
+    mad = float(np.median(np.abs(steady - stats.p50)))
+    stats.jitter = MAD_TO_STD * mad / stats.p50 if stats.p50 > 0 else float("nan")
+    if mad > 0:
+        z = np.abs(steady - stats.p50) / (MAD_TO_STD * mad)
+        stats.outliers = [
+            int(i) + stats.warmup_steps for i in np.flatnonzero(z > outlier_z_threshold)
+        ]
+
+    if timestep_s is not None and stats.steady_state_time > 0:
+        # simulated seconds per wall seconds == simulated days per day
+        stats.throughput_sdpd = timestep_s * len(steady) / stats.steady_state_time
+
+    return stats
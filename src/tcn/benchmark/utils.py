@@ -0,0 +1,73 @@
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Scale of the MAD to be a consistent estimator of the standard deviation
+MAD_TO_STD = 1.4826
+
+
+def robust_spread(
+    values: np.ndarray,
+    median: Optional[float] = None,
+    min_relative_spread: float = 1e-3,
+) -> float:
+    """Robust standard deviation (scaled MAD) of `values` around their median.
+
+    Degenerate distributions (most values equal) have a zero MAD: the spread
+    is then floored to `min_relative_spread` of the median.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if median is None:
+        median = float(np.median(values))
+    spread = MAD_TO_STD * float(np.median(np.abs(values - median)))
+    return max(spread, min_relative_spread * median)
+
+
+def _call_or_error(function: Callable[[Any], Any], item: Any) -> Tuple[Any, str]:
+    """Worker side: exceptions are returned as text to be re-raised by the caller"""
+    try:
+        return function(item), ""
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def parallel_parse(
+    function: Callable[[str], Any],
+    filenames: Iterable[str],
+    max_workers: Optional[int] = None,
+    chunksize: int = 1,
+    description: str = "files",
+) -> List[Any]:
+    """Parse files concurrently with a process pool, in the order of `filenames`.
+
+    If any file fails to parse, a RuntimeError listing all failing files is
+    raised.
+
+    Args:
+        function: module level (picklable) parser of a single file
+        max_workers: size of the pool, default to one process per file
+            capped by the CPU count. 1 parses serially in-process.
+        description: what is parsed, for the error message
+    """
+    filenames = list(filenames)
+    if max_workers is None:
+        max_workers = min(len(filenames), os.cpu_count() or 1)
+
+    worker = functools.partial(_call_or_error, function)
+    if max_workers <= 1:
+        results = [worker(filename) for filename in filenames]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(worker, filenames, chunksize=chunksize))
+
+    errors = [
+        f"  {filename}: {error}"
+        for filename, (_, error) in zip(filenames, results)
+        if error != ""
+    ]
+    if errors != []:
+        raise RuntimeError(f"Failed to parse {description}:\n" + "\n".join(errors))
+    return [result for result, _ in results]
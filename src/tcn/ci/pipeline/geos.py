@@ -1,3 +1,4 @@
+import os
 from typing import Any, Dict, Optional
 
 from tcn.ci.actions.discover import one_gpu_srun
@@ -7,6 +8,7 @@ from tcn.ci.utils.environment import Environment
 from tcn.ci.utils.progress import Progress
 from tcn.ci.utils.registry import Registry
 from tcn.ci.utils.shell import ShellScript
+from tcn.validation.geos_status import get_all_repo_status
 
 
 def _epilogue(env: Environment):
@@ -54,6 +56,28 @@ def set_python_environment(
     return set_env
 
 
+def benchmark_history_directory(env: Environment) -> str:
+    """Benchmark history store: TCN_BENCHMARK_HISTORY or the artifact directory"""
+    directory = env.get("TCN_BENCHMARK_HISTORY")
+    if directory == "":
+        directory = f"{env.artifact_directory}/benchmark_history"
+    return directory
+
+
+def geos_git_hashes(geos_directory: str) -> str:
+    """`name@hexsha` of the repositories of a mepo-managed GEOS checkout,
+    comma separated, empty if unavailable"""
+    components = f"{geos_directory}/components.yaml"
+    if not os.path.isfile(components):
+        return ""
+    try:
+        geos_status = get_all_repo_status(components)
+    except Exception as e:
+        print(f"[Benchmark history] Can't read git status of {geos_directory}: {e}")
+        return ""
+    return ",".join(f"{r.name}@{r.hexsha}" for r in geos_status.repositories)
+
+
 def copy_input_to_experiment_directory(
     input_directory: str,
     geos_directory: str,
@@ -1,16 +1,25 @@
 import glob
 import os
 import shutil
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Tuple
 
 import click
 
-from tcn.benchmark.geos_log_parser import parse_geos_log
+from tcn.benchmark.geos_log_parser import parse_geos_logs
+from tcn.benchmark.history import BenchmarkHistory
+from tcn.benchmark.rank_aggregation import imbalance_report
+from tcn.benchmark.regression import (
+    RegressionResult,
+    detect_regressions,
+    regression_report,
+)
 from tcn.benchmark.report import report
 from tcn.ci.actions.pipeline import PipelineAction
 from tcn.ci.actions.slurm import SlurmConfiguration
 from tcn.ci.pipeline.geos import (
+    benchmark_history_directory,
     copy_input_to_experiment_directory,
+    geos_git_hashes,
     set_python_environment,
 )
 from tcn.ci.pipeline.gtfv3_config import GTFV3Config
@@ -416,20 +425,44 @@ class HeldSuarez(TaskBase):
             env.experiment_action == PipelineAction.Benchmark
             or env.experiment_action == PipelineAction.All
         ):
+            history = BenchmarkHistory(benchmark_history_directory(env))
+            git_hashes = geos_git_hashes(geos_path)
+            regressions: List[RegressionResult] = []
             for resolution in ["C180-L72", "C180-L91", "C180-L137"]:
                 logs = glob.glob(f"{geos_experiment_path}/{resolution}/benchmark.*")
                 benchmark_artifact = f"{artifact_directory}/Benchmark/{resolution}"
                 os.makedirs(benchmark_artifact, exist_ok=True)
-                bench_raw_data = []
+                rank0_logs = []
                 for log in logs:
                     shutil.copy(log, benchmark_artifact)
                     # Grab all rank 0 that are not caching runs
                     if ".0.out" in log and "cache" not in log:
-                        bench_raw_data.append(parse_geos_log(log))
+                        rank0_logs.append(log)
+                bench_raw_data = parse_geos_logs(rank0_logs)
+                regression_text = ""
+                for bench_data in bench_raw_data:
+                    # Check against the history before recording the run
+                    results = detect_regressions(bench_data, history)
+                    regression_text += regression_report(bench_data, results)
+                    regressions += [r for r in results if r.is_regression]
+                    history.append(bench_data, "HeldSuarez", git_hashes)
+                # Rank 0 hides the load imbalance: aggregate all ranks
+                imbalance_text = ""
+                for log in rank0_logs:
+                    imbalance_text += f"{os.path.basename(log)}: "
+                    imbalance_text += imbalance_report(log)
                 benchmark_report = report(bench_raw_data)
                 print(benchmark_report)
+                print(regression_text)
+                print(imbalance_text)
                 with open(f"{benchmark_artifact}/report_benchmark.out", "w") as f:
                     f.write(str(benchmark_report))
+                    f.write(regression_text)
+                    f.write(imbalance_text)
+
+            # Significant slowdowns fail the check, unless asked to only flag them
+            if regressions != [] and env.get("TCN_BENCHMARK_REGRESSION") != "flag":
+                return False
 
         return True
 
@@ -563,12 +596,11 @@ def benchmark(
     )
 
     # Report
-    bench_raw_data = []
-    bench_raw_data.append(
-        parse_geos_log(f"{experiment_directory}/benchmark.1day.dacegpu.0.out")
-    )
-    bench_raw_data.append(
-        parse_geos_log(f"{experiment_directory}/benchmark.1day.fortran.0.out")
+    bench_raw_data = parse_geos_logs(
+        [
+            f"{experiment_directory}/benchmark.1day.dacegpu.0.out",
+            f"{experiment_directory}/benchmark.1day.fortran.0.out",
+        ]
     )
 
     benchmark_report = report(bench_raw_data)
@@ -25,8 +25,8 @@ else
     if [ $LOCAL_RANK -eq 0 ]; then
         echo "Hardware sampling is ON"
     fi
-    # We restrict usage to (world) rank 0
-    if [ $SLURM_PROCID -eq 0 ]; then
+    # One sampler per node (local rank 0), sampling all its GPUs
+    if [ $LOCAL_RANK -eq 0 ]; then
         geosongpu_hws server &
         sleep 10
         geosongpu_hws client start
@@ -9,8 +9,8 @@ if [ -z ${HARDWARE_SAMPLING} ]; then
     echo "Hardware sampling is OFF"
 else
     echo "Hardware sampling is ON"
-    # We restrict usage to (world) rank 0
-    if [ $SLURM_PROCID -eq 0 ]; then
+    # One sampler per node (local rank 0), sampling all its GPUs
+    if [ $SLURM_LOCALID -eq 0 ]; then
         geosongpu_hws server &
         sleep 10
         geosongpu_hws client start
@@ -61,7 +61,7 @@ fi
 if [ -z ${HARDWARE_SAMPLING} ]; then
     echo ""
 else
-    if [ $SLURM_PROCID -eq 0 ]; then
+    if [ $SLURM_LOCALID -eq 0 ]; then
         geosongpu_hws client dump
         geosongpu_hws client stop
     fi
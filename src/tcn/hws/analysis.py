@@ -1,20 +1,105 @@
 import dataclasses
-from typing import Any, Dict
+import os
+from collections import Counter
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
 
 import numpy as np
 
 import tcn.hws.constants as cst
 from tcn.hws.constants import HWS_HW_CPU
+from tcn.hws.sample_buffer import CPU_FIELDS, GPU_FIELDS
+from tcn.hws.stream_dump import load_stream_dump
+
+# `trapz` was renamed `trapezoid` in NumPy 2
+_trapezoid = getattr(np, "trapezoid", None) or getattr(np, "trapz")
+
+
+def device_total(data: np.ndarray) -> np.ndarray:
+    """Sum a sensor over its devices (or nodes) columns, e.g. the run power"""
+    data = np.asarray(data)
+    return data.sum(axis=1) if data.ndim == 2 else data
+
+
+def device_mean(data: np.ndarray) -> np.ndarray:
+    """Average a sensor over its devices (or nodes) columns, e.g. utilization"""
+    data = np.asarray(data)
+    return data.mean(axis=1) if data.ndim == 2 else data
+
+
+_J_PER_KWH = 3.6e6
 
 
 @dataclasses.dataclass
 class EnergyReport:
-    CPU_envelop_integrated: float = 0  # kW * sample_count
-    CPU_envelop_kWh: float = 0
-    GPU_envelop_integrated: float = 0  # kW * sample_count
-    GPU_envelop_kWh: float = 0
-    overall_envelop_integrated: float = 0  # kW * sample_count
-    overall_envelop_kWh: float = 0
+    duration_s: float = 0
+    sample_count: int = 0
+    CPU_J: float = 0
+    GPU_J: float = 0
+    overall_J: float = 0
+
+    @property
+    def CPU_kWh(self) -> float:
+        return self.CPU_J / _J_PER_KWH
+
+    @property
+    def GPU_kWh(self) -> float:
+        return self.GPU_J / _J_PER_KWH
+
+    @property
+    def overall_kWh(self) -> float:
+        return self.overall_J / _J_PER_KWH
+
+    def _average_W(self, energy_J: float) -> float:
+        return energy_J / self.duration_s if self.duration_s > 0 else float("nan")
+
+    @property
+    def CPU_average_W(self) -> float:
+        return self._average_W(self.CPU_J)
+
+    @property
+    def GPU_average_W(self) -> float:
+        return self._average_W(self.GPU_J)
+
+    @property
+    def overall_average_W(self) -> float:
+        return self._average_W(self.overall_J)
+
+    def __str__(self) -> str:
+        return "\n".join(
+            f"{label} envelop: {energy:.0f} J, {energy / _J_PER_KWH:.4f} kWh, "
+            f"{self._average_W(energy):.1f} W average"
+            for label, energy in [
+                ("CPU", self.CPU_J),
+                ("GPU", self.GPU_J),
+                ("Overall", self.overall_J),
+            ]
+        )
+
+
+def sample_timestamps(
+    data: Mapping[str, Any],
+    sample_count: int,
+    sample_rate_s: float = cst.DEFAULT_SAMPLERATE_IN_S,
+) -> np.ndarray:
+    """Timestamps (s) of the samples, regularly spaced at `sample_rate_s` for
+    dumps recorded before samples were timestamped"""
+    if "timestamp" in data:
+        return np.asarray(data["timestamp"], dtype=np.float64)
+    return np.arange(sample_count) * sample_rate_s
+
+
+def time_slice(
+    timestamps: np.ndarray,
+    time_range: Optional[Tuple[float, float]] = None,
+) -> slice:
+    """Samples within `time_range`, in seconds since the first sample"""
+    if time_range is None or len(timestamps) == 0:
+        return slice(None)
+    start, stop = (timestamps[0] + bound for bound in time_range)
+    return slice(
+        int(np.searchsorted(timestamps, start, side="left")),
+        int(np.searchsorted(timestamps, stop, side="right")),
+    )
 
 
 def energy_envelop_calculation(
@@ -22,51 +107,261 @@ def energy_envelop_calculation(
     gpu_psu_data: np.ndarray,
     cpu_label: str = HWS_HW_CPU,
     verbose: bool = True,
+    timestamps: Optional[np.ndarray] = None,
 ) -> EnergyReport:
-    report = EnergyReport()
-    # TODO we need the sample rate here too
-    sample_count = len(cpu_psu_data)
-
-    # Grab integrated power using trapezoide integration on all samples
-    report.GPU_envelop_integrated = np.trapz(gpu_psu_data / 1000)
-    report.CPU_envelop_integrated = np.trapz(cpu_psu_data / 1000)
-    report.overall_envelop_integrated = (
-        report.GPU_envelop_integrated + report.CPU_envelop_integrated
-    )
+    """Energy from power samples (W) integrated over their actual time (s).
 
-    # Average kWh calculation
-    # TODO: Wrong?!
-    sampling_time_hours_default = (
-        (sample_count - 1) * cst.DEFAULT_SAMPLERATE_IN_S / (60 * 60)
-    )
-    report.overall_envelop_kWh = (
-        report.overall_envelop_integrated / sample_count
-    ) / sampling_time_hours_default
-    report.CPU_envelop_kWh = (
-        report.CPU_envelop_integrated / sample_count
-    ) / sampling_time_hours_default
-    report.GPU_envelop_kWh = (
-        report.GPU_envelop_integrated / sample_count
-    ) / sampling_time_hours_default
+    Without `timestamps`, samples are assumed regularly spaced at the default
+    sample rate. Per-device (or per-node) columns are summed.
+    """
+    # Whole run: all GPUs & all nodes
+    cpu_psu_data = device_total(cpu_psu_data).astype(np.float64)
+    gpu_psu_data = device_total(gpu_psu_data).astype(np.float64)
+    if timestamps is None:
+        timestamps = sample_timestamps({}, len(cpu_psu_data))
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+
+    report = EnergyReport(sample_count=len(timestamps))
+    if len(timestamps) < 2:
+        return report
+    report.duration_s = float(timestamps[-1] - timestamps[0])
+    # Trapezoidal integration against the time of each sample: sampling jitter
+    # and missed samples are accounted for
+    report.CPU_J = float(_trapezoid(cpu_psu_data, x=timestamps))
+    report.GPU_J = float(_trapezoid(gpu_psu_data, x=timestamps))
+    report.overall_J = report.CPU_J + report.GPU_J
 
     if verbose:
         print(
-            f"Number of samples: {sample_count}\n"
-            f"CPU envelop:{report.CPU_envelop_integrated:.0f} kW.sample_count\n"
-            f"CPU envelop (@ default sample rate): {report.CPU_envelop_kWh:.2f} kW/h\n"
-            f"GPU envelop:{report.GPU_envelop_integrated:.0f} kW.sample_count\n"
-            f"GPU envelop (@ default sample rate): {report.GPU_envelop_kWh:.2f} kW/h\n"
-            f"Overall envelop: {report.overall_envelop_integrated:.0f} kW.sample_count\n"
-            f"Overall envelop (@ default sample rate): {report.overall_envelop_kWh:.2f} kW/h"
+            f"Number of samples: {report.sample_count} "
+            f"over {report.duration_s:.1f}s\n{report}"
         )
 
     return report
 
 
+def _phase_slice(
+    timestamps: np.ndarray, power: np.ndarray, start: float, stop: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Samples within [start, stop], with the power interpolated at the bounds"""
+    inside = (timestamps > start) & (timestamps < stop)
+    bounds = np.array([start, stop])
+    t = np.concatenate([bounds[:1], timestamps[inside], bounds[1:]])
+    p = np.concatenate(
+        [
+            np.interp(bounds[:1], timestamps, power),
+            power[inside],
+            np.interp(bounds[1:], timestamps, power),
+        ]
+    )
+    return t, p
+
+
+def energy_per_phase(
+    timestamps: np.ndarray,
+    cpu_psu_data: np.ndarray,
+    gpu_psu_data: np.ndarray,
+    phases: Mapping[str, Tuple[float, float]],
+) -> Dict[str, EnergyReport]:
+    """Energy of each phase, given as (start, stop) timestamps"""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    cpu_psu_data = device_total(cpu_psu_data).astype(np.float64)
+    gpu_psu_data = device_total(gpu_psu_data).astype(np.float64)
+    reports = {}
+    for phase, (start, stop) in phases.items():
+        start = max(start, timestamps[0])
+        stop = min(stop, timestamps[-1])
+        if start >= stop:
+            reports[phase] = EnergyReport()
+            continue
+        t, cpu = _phase_slice(timestamps, cpu_psu_data, start, stop)
+        _, gpu = _phase_slice(timestamps, gpu_psu_data, start, stop)
+        reports[phase] = energy_envelop_calculation(
+            cpu, gpu, verbose=False, timestamps=t
+        )
+    return reports
+
+
+def _numbered_ticks(
+    tick_names: Sequence[str],
+    tick_timestamps: Sequence[float],
+    end: float,
+) -> List[Tuple[str, str, float, float]]:
+    """(tick name, phase name, start, stop) of the phases, see `tick_phases`"""
+    names = [str(name) for name in tick_names]
+    order = np.argsort(np.asarray(tick_timestamps, dtype=np.float64), kind="stable")
+    starts = [float(tick_timestamps[i]) for i in order]
+    stops = starts[1:] + [end]
+    repeated = {name for name, count in Counter(names).items() if count > 1}
+    counts: Dict[str, int] = {}
+    phases = []
+    for i, start, stop in zip(order, starts, stops):
+        name = names[i]
+        if name in repeated:
+            phase = f"{name}#{counts.get(name, 0)}"
+            counts[name] = counts.get(name, 0) + 1
+        else:
+            phase = name
+        phases.append((name, phase, start, stop))
+    return phases
+
+
+def tick_phases(
+    tick_names: Sequence[str],
+    tick_timestamps: Sequence[float],
+    end: float,
+) -> Dict[str, Tuple[float, float]]:
+    """Phases between ticks: each tick starts a phase named after it, which
+    lasts until the next tick (or `end`). Repeated names are numbered in
+    order, e.g. `timestep#0`, `timestep#1`..."""
+    return {
+        phase: (start, stop)
+        for _, phase, start, stop in _numbered_ticks(tick_names, tick_timestamps, end)
+    }
+
+
+def energy_per_tick(data: Mapping[str, Any]) -> Dict[str, List[EnergyReport]]:
+    """Energy of every phase started by a tick (see `tick_phases`), grouped by
+    tick name: e.g. one report per model timestep for the "timestep" ticks.
+    When several ranks tick, the phases are those of the lowest rank. Empty
+    without ticks or samples."""
+    if "tick_names" not in data or len(data["tick_names"]) == 0:
+        return {}
+    if len(data["cpu_psu"]) == 0:
+        return {}
+    names = np.asarray(data["tick_names"])
+    tick_timestamps = np.asarray(data["tick_timestamps"])
+    if "tick_ranks" in data:
+        ranks = np.asarray(data["tick_ranks"])
+        names, tick_timestamps = (
+            names[ranks == ranks.min()],
+            tick_timestamps[ranks == ranks.min()],
+        )
+    timestamps = sample_timestamps(data, len(data["cpu_psu"]))
+    ticks = _numbered_ticks(list(names), tick_timestamps, timestamps[-1])
+    reports = energy_per_phase(
+        timestamps,
+        data["cpu_psu"],
+        data["gpu_psu"],
+        {phase: (start, stop) for _, phase, start, stop in ticks},
+    )
+    # Grouped by the tick name: it may contain "#" too
+    grouped: Dict[str, List[EnergyReport]] = {}
+    for name, phase, _, _ in ticks:
+        grouped.setdefault(name, []).append(reports[phase])
+    return grouped
+
+
 def load_data(
     data_filepath: str,
-    data_format: str = "npz",
-) -> Dict[str, Any]:
-    if data_format != "npz":
-        raise NotImplementedError(f"Format {data_format} not implemented for graphing")
-    return np.load(data_filepath)
+    data_format: Optional[str] = None,
+) -> Mapping[str, Any]:
+    """Dump of the sampler, format defaults to the file extension.
+    Stream dumps (`.arrows`) are read through a memory map, see
+    `load_stream_dump`."""
+    if data_format is None:
+        data_format = os.path.splitext(data_filepath)[1].lstrip(".")
+    if data_format == cst.HWS_DUMP_NPZ:
+        return np.load(data_filepath)
+    if data_format == cst.HWS_DUMP_ARROW:
+        return load_stream_dump(data_filepath)
+    raise NotImplementedError(f"Format {data_format} not implemented for graphing")
+
+
+def merge_node_data(nodes: Sequence[Mapping[str, Any]]) -> Dict[str, np.ndarray]:
+    """Merge the dumps of all the nodes of a run into one dataset.
+
+    Samples are aligned on the timestamps of the first node, over the period
+    all nodes were recording, the other nodes being linearly interpolated.
+    Monotonic timestamps are first moved to the wall clock of their node.
+    GPU sensors are (sample, device) arrays with the host and NVML index of each
+    column in `gpu_host` & `gpu_device`, nodes without GPUs having no column.
+    CPU sensors are (sample, node) arrays with the host of each column in
+    `cpu_host`. Ticks of all nodes are merged,
+    moved to the wall clock as well, with the host of each in `tick_hosts`.
+    """
+    if len(nodes) == 0:
+        raise ValueError("No node data to merge")
+    origins = [
+        float(node["wall_clock_origin"] if "wall_clock_origin" in node else 0)
+        for node in nodes
+    ]
+    wall_clocks = [
+        np.asarray(node["timestamp"], dtype=np.float64) + origin
+        for node, origin in zip(nodes, origins)
+    ]
+    start = max(float(wall_clock[0]) for wall_clock in wall_clocks)
+    stop = min(float(wall_clock[-1]) for wall_clock in wall_clocks)
+    if start > stop:
+        raise ValueError("Nodes were not recording at the same time")
+    reference = wall_clocks[0]
+    timestamp = reference[(reference >= start) & (reference <= stop)]
+
+    def _align(node: Mapping[str, Any], wall_clock: np.ndarray, field: str):
+        values = np.asarray(node[field], dtype=np.float64)
+        values = values.reshape(len(values), -1)
+        if field in GPU_FIELDS:
+            # Samples hold at least one GPU: drop the placeholder of GPU-less nodes
+            device_count = np.asarray(node["devices"]).size
+            values = values[:, :device_count]
+        aligned = np.empty((len(timestamp), values.shape[1]))
+        for column in range(values.shape[1]):
+            aligned[:, column] = np.interp(timestamp, wall_clock, values[:, column])
+        return aligned
+
+    # Merged timestamps are on the wall clock
+    merged: Dict[str, np.ndarray] = {
+        "timestamp": timestamp,
+        "wall_clock_origin": np.array(0.0),
+    }
+    for field in GPU_FIELDS + CPU_FIELDS:
+        merged[field] = np.concatenate(
+            [
+                _align(node, wall_clock, field)
+                for node, wall_clock in zip(nodes, wall_clocks)
+            ],
+            axis=1,
+        ).astype(np.float32)
+    merged["gpu_host"] = np.array(
+        [
+            str(node["host"])
+            for node in nodes
+            for _ in range(np.asarray(node["devices"]).size)
+        ]
+    )
+    merged["gpu_device"] = np.concatenate(
+        [np.asarray(node["devices"]).reshape(-1) for node in nodes]
+    )
+    merged["cpu_host"] = np.array([str(node["host"]) for node in nodes])
+
+    ticked = [
+        (node, origin)
+        for node, origin in zip(nodes, origins)
+        if "tick_names" in node and len(node["tick_names"]) > 0
+    ]
+    if ticked != []:
+        tick_timestamps = np.concatenate(
+            [
+                np.asarray(node["tick_timestamps"], dtype=np.float64) + origin
+                for node, origin in ticked
+            ]
+        )
+        order = np.argsort(tick_timestamps, kind="stable")
+        merged["tick_timestamps"] = tick_timestamps[order]
+        merged["tick_names"] = np.concatenate(
+            [np.asarray(node["tick_names"]).astype(str) for node, _ in ticked]
+        )[order]
+        merged["tick_ranks"] = np.concatenate(
+            [
+                (
+                    np.asarray(node["tick_ranks"], dtype=np.int64)
+                    if "tick_ranks" in node
+                    else np.zeros(len(node["tick_names"]), dtype=np.int64)
+                )
+                for node, _ in ticked
+            ]
+        )[order]
+        merged["tick_hosts"] = np.concatenate(
+            [[str(node["host"])] * len(node["tick_names"]) for node, _ in ticked]
+        )[order]
+    return merged
@@ -1,11 +1,15 @@
+import sys
 from typing import Optional, Tuple
 
 import click
+import numpy as np
 
+import tcn.hws.analysis as hws_analysis
 import tcn.hws.client as hws_client
 import tcn.hws.constants as cst
 import tcn.hws.graph as hws_graph
 import tcn.hws.server as hws_server
+from tcn.hws.decimate import DECIMATE_LTTB, DECIMATE_MINMAX
 
 
 @click.group()
@@ -21,31 +25,93 @@ def server():
 
 @cli.command()
 @click.argument("command")
-@click.option("--name", default="hws", help="[dump] Filename for the .npz dump")
-def client(command: str, name: str):
-    hws_client.cli(command, name)
+@click.option("--name", default="hws", help="[start, dump] Name of the dump file")
+@click.option(
+    "--dt", type=float, default=None, help="[start] Sampling period in seconds"
+)
+@click.option("--marker", default=None, help="[tick] Name of the phase starting")
+@click.option(
+    "--count", type=int, default=None, help="[query] Number of latest samples"
+)
+def client(
+    command: str,
+    name: str,
+    dt: Optional[float],
+    marker: Optional[str],
+    count: Optional[int],
+):
+    hws_client.cli(command, name, dt, marker, count)
+
+
+@cli.command()
+def stalled():
+    """Exit with status 1 if the GPUs of the node were idle over the whole
+    rolling window, e.g. for the CI to abort a stalled run"""
+    stats = hws_client.client_main(cst.CLIENT_CMD_STATS, "")
+    if stats["gpu_idle"]:
+        print(f"GPUs idle for the last {stats['window_s']:.0f} seconds")
+        sys.exit(1)
+
+
+def _plot_options(command):
+    command = click.option(
+        "--html", is_flag=True, help="Also write an interactive, zoomable figure"
+    )(command)
+    command = click.option(
+        "--decimation",
+        type=click.Choice([DECIMATE_MINMAX, DECIMATE_LTTB]),
+        default=DECIMATE_MINMAX,
+        help="Downsampling of the traces",
+    )(command)
+    return click.option(
+        "--max_points",
+        type=int,
+        default=cst.HWS_GRAPH_MAX_POINTS,
+        help="Points per trace (coarsest level of detail)",
+    )(command)
 
 
 @cli.command()
 @click.argument("data_filepath")
-def graph(data_filepath: str):
-    hws_graph.cli(data_filepath)
+@_plot_options
+def graph(data_filepath: str, max_points: int, decimation: str, html: bool):
+    hws_graph.cli(
+        data_filepath, max_points=max_points, decimation=decimation, html=html
+    )
+
+
+@cli.command()
+@click.argument("output")
+@click.argument("node_dumps", nargs=-1, required=True)
+def merge(output: str, node_dumps: Tuple[str, ...]):
+    """Merge the per-node NODE_DUMPS (.npz, .arrows) of a run into OUTPUT (.npz)"""
+    nodes = [hws_analysis.load_data(dump) for dump in node_dumps]
+    np.savez_compressed(output, **hws_analysis.merge_node_data(nodes))
 
 
 @cli.command()
 @click.argument("data_filepath")
-@click.option("--data_range", nargs=2, type=float)
+@click.option(
+    "--data_range",
+    nargs=2,
+    type=float,
+    help="Start & stop in seconds since the first sample",
+)
+@_plot_options
 def envelop(
-    data_filepath: str, data_range: Optional[Tuple[float, float]]
-):  # TODO: this should be saved in a header in the data file
-    dt = cst.CLIENT_CMDS[cst.CLIENT_CMD_START]["dt"]
-    if data_range:
-        range_start, range_stop = data_range
-        range_start = int(range_start / dt)
-        range_stop = int(range_stop / dt)
-        hws_graph.cli(data_filepath, data_range=slice(range_start, range_stop))
-    else:
-        hws_graph.cli(data_filepath)
+    data_filepath: str,
+    data_range: Optional[Tuple[float, float]],
+    max_points: int,
+    decimation: str,
+    html: bool,
+):
+    hws_graph.cli(
+        data_filepath,
+        data_range=data_range or None,
+        max_points=max_points,
+        decimation=decimation,
+        html=html,
+    )
 
 
 if __name__ == "__main__":
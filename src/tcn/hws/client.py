@@ -1,21 +1,167 @@
 import json
+import os
 import socket
+import time
+from typing import Any, Dict, Optional
 
-from tcn.hws.constants import CLIENT_CMDS, SOCKET_FILENAME
+from tcn.hws.constants import (
+    CLIENT_CMD_QUERY,
+    CLIENT_CMD_STATS,
+    CLIENT_CMD_STATUS,
+    CLIENT_CMD_TICK,
+    CLIENT_CMDS,
+    HWS_CLIENT_TIMEOUT_S,
+    HWS_RANK_ENV_VARS,
+    HWS_TICK_DEFAULT,
+    SOCKET_FILENAME,
+)
+from tcn.hws.protocol import ProtocolError, recv_message, send_message
 
 
-def client_main(order: str, dump_name: str):
-    filtered_order = CLIENT_CMDS[order]
+def process_rank() -> int:
+    """MPI rank of the process from the launcher environment, 0 if unknown"""
+    for variable in HWS_RANK_ENV_VARS:
+        if os.getenv(variable, "") != "":
+            return int(os.environ[variable])
+    return 0
+
+
+class HWSClient:
+    """Persistent connection to the sampler server of the node.
+
+    Requests are acknowledged by the server: `request` returns its reply or
+    raises if the server refused the order. `send` doesn't wait for any reply.
+    """
+
+    def __init__(
+        self,
+        socket_filename: str = SOCKET_FILENAME,
+        timeout_s: float = HWS_CLIENT_TIMEOUT_S,
+    ) -> None:
+        self.socket_filename = socket_filename
+        self.timeout_s = timeout_s
+        self._socket: Optional[socket.socket] = None
+
+    def connect(self) -> None:
+        if self._socket is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout_s)
+            try:
+                sock.connect(self.socket_filename)
+            except OSError:
+                sock.close()
+                raise
+            self._socket = sock
+
+    def request(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        self.connect()
+        assert self._socket is not None
+        try:
+            send_message(self._socket, order)
+            reply = recv_message(self._socket)
+        except (OSError, ProtocolError):
+            # Connection is in an unknown state: reconnect on the next request
+            self.close()
+            raise
+        if not reply.pop("ok", False):
+            raise RuntimeError(f"[HWS Client] {reply.get('error', 'Order refused')}")
+        return reply
+
+    def send(self, order: Dict[str, Any]) -> None:
+        """Send `order` without acknowledgment: errors are only logged by the
+        server"""
+        self.connect()
+        assert self._socket is not None
+        try:
+            send_message(self._socket, dict(order, ack=False))
+        except (OSError, ProtocolError):
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def __enter__(self) -> "HWSClient":
+        self.connect()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def client_main(
+    order: str,
+    dump_name: str,
+    dt: Optional[float] = None,
+    marker: Optional[str] = None,
+    count: Optional[int] = None,
+    client: Optional[HWSClient] = None,
+    ack: bool = True,
+) -> Dict[str, Any]:
+    """Send the command `order` to the server, returns its reply (empty
+    without `ack`)"""
+    filtered_order = dict(CLIENT_CMDS[order])
     filtered_order["dump_name"] = dump_name
-    data = json.dumps(filtered_order)
-    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-    server.connect(SOCKET_FILENAME)
-    server.send(data.encode("utf8"))
+    if dt is not None:
+        filtered_order["dt"] = dt
+    if count is not None:
+        filtered_order["count"] = count
+    if order == CLIENT_CMD_TICK:
+        # Monotonic clock is shared by all processes of the node
+        filtered_order["name"] = marker or HWS_TICK_DEFAULT
+        filtered_order["timestamp"] = time.monotonic()
+        filtered_order["rank"] = process_rank()
+    if client is not None and not ack:
+        client.send(filtered_order)
+        return {}
+    if client is not None:
+        return client.request(filtered_order)
+    with HWSClient() as one_time_client:
+        if not ack:
+            one_time_client.send(filtered_order)
+            return {}
+        return one_time_client.request(filtered_order)
+
+
+# Connection kept open by `tick`, ticks are sent every timestep
+_tick_client: Optional[HWSClient] = None
+
+
+def tick(name: str) -> bool:
+    """Mark the start of the phase `name` (e.g. "timestep") in the sampling.
+
+    Meant to be called from the model or its hooks: does nothing and returns
+    False if no sampler server runs on the node. The connection to the server
+    is kept open for the next ticks, which are not acknowledged: a tick costs
+    one message on the socket, without a round trip.
+    """
+    global _tick_client
+    if _tick_client is None:
+        if not os.path.exists(SOCKET_FILENAME):
+            return False
+        _tick_client = HWSClient()
+    try:
+        client_main(CLIENT_CMD_TICK, "", marker=name, client=_tick_client, ack=False)
+    except (OSError, ProtocolError):
+        # Server is gone: look for a new one on the next tick
+        _tick_client = None
+        return False
+    return True
 
 
-def cli(command: str, dump_name: str):
+def cli(
+    command: str,
+    dump_name: str,
+    dt: Optional[float] = None,
+    marker: Optional[str] = None,
+    count: Optional[int] = None,
+):
     if command in CLIENT_CMDS.keys():
-        client_main(command, dump_name)
+        reply = client_main(command, dump_name, dt, marker, count)
+        if command in [CLIENT_CMD_STATUS, CLIENT_CMD_QUERY, CLIENT_CMD_STATS]:
+            print(json.dumps(reply, indent=2))
     else:
         raise RuntimeError(
             f"[HWS Client] Unknown cmds {command} as first argument of the executable"
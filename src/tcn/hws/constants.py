@@ -1,31 +1,90 @@
 import os
+import socket
 from typing import Any, Dict
 
 # Socket details
 SOCKET_DIRECTORY = "./sockets-runtime"
-SOCKET_FILENAME = f"{SOCKET_DIRECTORY}/hws"
+# One server per node: the socket directory can be on a shared filesystem
+SOCKET_FILENAME = f"{SOCKET_DIRECTORY}/hws.{socket.gethostname()}"
+# Local HTTP port serving the live statistics (/stats, /metrics for Prometheus)
+HWS_HTTP_PORT = (
+    int(os.environ["HWSAMPLER_HTTP_PORT"])
+    if os.getenv("HWSAMPLER_HTTP_PORT", "") != ""
+    else None
+)
+# Seconds a client waits for the server to reply
+HWS_CLIENT_TIMEOUT_S = float(os.getenv("HWSAMPLER_CLIENT_TIMEOUT", "10"))
+# Environment variables giving the rank of a process, first one set is used
+HWS_RANK_ENV_VARS = ["OMPI_COMM_WORLD_RANK", "PMI_RANK", "SLURM_PROCID"]
 
 # Dump
 HWS_DUMP_NAME = "hws_dump"
 HWS_DUMP_NPZ = "npz"
 HWS_DUMP_JSON = "json"
+# Append-only Arrow IPC stream, written in the background while recording
+HWS_DUMP_ARROW = "arrows"
 HWS_DUMP_FORMAT = os.getenv("HWSAMPLER_DUMP_FORMAT", HWS_DUMP_NPZ)
+# Samples per chunk appended to an `arrows` dump (a minute at the default rate)
+HWS_STREAM_FLUSH_SAMPLES = int(os.getenv("HWSAMPLER_FLUSH_SAMPLES", "600"))
 
+# NVML indices of the sampled GPUs (e.g. "0,1,2,3"), default to all devices
+HWS_DEVICES = (
+    [int(device) for device in os.environ["HWSAMPLER_DEVICES"].split(",")]
+    if os.getenv("HWSAMPLER_DEVICES", "") != ""
+    else None
+)
+
+# Sensor providers (e.g. "nvml,psutil,rapl" or "simulated"), see tcn.hws.sensors
+HWS_SENSORS = (
+    os.environ["HWSAMPLER_SENSORS"].split(",")
+    if os.getenv("HWSAMPLER_SENSORS", "") != ""
+    else None
+)
+
+# Samples buffer: allocated by chunks, a ring of exactly the max samples if given
+HWS_BUFFER_CHUNK_SIZE = 65536
+HWS_BUFFER_MAX_SAMPLES = (
+    int(os.environ["HWSAMPLER_MAX_SAMPLES"])
+    if "HWSAMPLER_MAX_SAMPLES" in os.environ
+    else None
+)
+
+# Live statistics over the last seconds of sampling
+HWS_ROLLING_WINDOW_S = float(os.getenv("HWSAMPLER_ROLLING_WINDOW", "60"))
+# GPUs are idle below this utilization (%) over the whole window
+HWS_IDLE_UTILIZATION_PCT = float(os.getenv("HWSAMPLER_IDLE_UTILIZATION", "1"))
+
+
+# Points per trace plotted, at the coarsest level of detail
+HWS_GRAPH_MAX_POINTS = 2000
 
 # All commands that the serve can process
 SERV_ORDER_START = "START"
 SERV_ORDER_STOP = "STOP"
 SERV_ORDER_DUMP = "DUMP"
 SERV_ORDER_TICK = "TICK"
+SERV_ORDER_STATUS = "STATUS"
+SERV_ORDER_QUERY = "QUERY"
+SERV_ORDER_STATS = "STATS"
 
 # Start the recording at dt intervals
 CLIENT_CMD_START = "start"
 # Stop recording, kill servers
 CLIENT_CMD_STOP = "stop"
 # Dump data into a format controlled by env var
-# HWS_DUMP_FORMAT = {npz, json}
+# HWS_DUMP_FORMAT = {npz, json, arrows}
 CLIENT_CMD_DUMP = "dump"
+# Mark the start of a named phase, see tcn.hws.client.tick
 CLIENT_CMD_TICK = "tick"
+HWS_TICK_DEFAULT = "tick"
+# Name of the tick sent at the start of each model timestep
+HWS_TICK_TIMESTEP = os.getenv("HWSAMPLER_TICK_TIMESTEP", "timestep")
+# State of the sampler: recording, samples, clients...
+CLIENT_CMD_STATUS = "status"
+# Latest samples recorded
+CLIENT_CMD_QUERY = "query"
+# Rolling statistics: mean/max power & utilization, VRAM high-water mark
+CLIENT_CMD_STATS = "stats"
 
 DEFAULT_SAMPLERATE_IN_S = 0.1
 
@@ -40,6 +99,9 @@ CLIENT_CMDS: Dict[str, Any] = {
         "dump_name": HWS_DUMP_NAME,
     },
     CLIENT_CMD_TICK: {"action": SERV_ORDER_TICK},
+    CLIENT_CMD_STATUS: {"action": SERV_ORDER_STATUS},
+    CLIENT_CMD_QUERY: {"action": SERV_ORDER_QUERY, "count": 1},
+    CLIENT_CMD_STATS: {"action": SERV_ORDER_STATS},
 }
 
 # Hardware specs
@@ -0,0 +1,86 @@
+from typing import List, Tuple
+
+import numpy as np
+
+DECIMATE_MINMAX = "minmax"
+DECIMATE_LTTB = "lttb"
+
+Trace = Tuple[np.ndarray, np.ndarray]
+
+
+def minmax_decimate(x: np.ndarray, y: np.ndarray, max_points: int) -> Trace:
+    """About `max_points` points of the trace: the min & max of equal-sized
+    buckets, in order. Peaks (e.g. max power) always survive."""
+    x, y = np.asarray(x), np.asarray(y)
+    bins = max(max_points // 2, 1)
+    if len(y) <= max_points:
+        return x, y
+    size = len(y) // bins
+    buckets = y[: bins * size].reshape(bins, size)
+    offsets = np.arange(bins) * size
+    # NaN (missing sensors) are never picked
+    lowest = np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1)
+    highest = np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1)
+    indices = np.concatenate([lowest + offsets, highest + offsets])
+    # The tail that doesn't fill a bucket is merged in the last one
+    full = bins * size
+    tail = y[full:]
+    if len(tail) > 0 and not np.isnan(tail).all():
+        indices = np.append(
+            indices, [full + np.nanargmin(tail), full + np.nanargmax(tail)]
+        )
+    indices = np.unique(indices)
+    return x[indices], y[indices]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> Trace:
+    """Largest-Triangle-Three-Buckets: `max_points` points keeping the visual
+    shape of the trace (Steinarsson, 2013)"""
+    x, y = np.asarray(x), np.asarray(y)
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return x, y
+    every = (n - 2) / (max_points - 2)
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for bucket in range(max_points - 2):
+        start = int(bucket * every) + 1
+        stop = int((bucket + 1) * every) + 1
+        next_stop = min(int((bucket + 2) * every) + 1, n)
+        # Third vertex: average of the next bucket (last point for the last one)
+        next_x = np.mean(x[stop:next_stop]) if stop < next_stop else x[-1]
+        next_y = np.nanmean(y[stop:next_stop]) if stop < next_stop else y[-1]
+        areas = np.abs(
+            (x[selected] - next_x) * (y[start:stop] - y[selected])
+            - (x[selected] - x[start:stop]) * (next_y - y[selected])
+        )
+        selected = start + int(np.argmax(np.nan_to_num(areas, nan=-1.0)))
+        indices[bucket + 1] = selected
+    return x[indices], y[indices]
+
+
+def decimate(x: np.ndarray, y: np.ndarray, max_points: int, method: str) -> Trace:
+    if method == DECIMATE_MINMAX:
+        return minmax_decimate(x, y, max_points)
+    elif method == DECIMATE_LTTB:
+        return lttb(x, y, max_points)
+    raise ValueError(f"Unknown decimation {method}")
+
+
+def levels_of_detail(
+    x: np.ndarray,
+    y: np.ndarray,
+    max_points: int,
+    method: str = DECIMATE_MINMAX,
+    factor: int = 4,
+) -> List[Trace]:
+    """Decimations of the trace from coarse (`max_points`) to the raw samples,
+    each level `factor` times finer than the previous one"""
+    levels = []
+    points = max_points
+    while points < len(y):
+        levels.append(decimate(x, y, points, method))
+        points *= factor
+    levels.append((np.asarray(x), np.asarray(y)))
+    return levels
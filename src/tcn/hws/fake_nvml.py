@@ -0,0 +1,67 @@
+import dataclasses
+from typing import List, Optional, Sequence
+
+
+@dataclasses.dataclass
+class _Utilization:
+    gpu: float
+    memory: float
+
+
+@dataclasses.dataclass
+class _Memory:
+    used: float  # bytes
+
+
+class FakeNVML:
+    """Stand-in for the `pynvml` module, for testing without GPUs.
+
+    Exposes the subset of NVML used by the sampler. Each device reports a
+    constant power (W), utilization (%) and memory (Mb).
+    """
+
+    def __init__(
+        self,
+        device_count: int = 1,
+        power_w: Optional[Sequence[float]] = None,
+        utilization: Optional[Sequence[float]] = None,
+        memory_mb: Optional[Sequence[float]] = None,
+        name: str = "Fake A100",
+    ) -> None:
+        self.power_w: List[float] = list(power_w or [100.0] * device_count)
+        self.utilization: List[float] = list(utilization or [50.0] * device_count)
+        self.memory_mb: List[float] = list(memory_mb or [1024.0] * device_count)
+        self.name = name
+        self.initialized = False
+        for values in [self.power_w, self.utilization, self.memory_mb]:
+            if len(values) != device_count:
+                raise ValueError(f"Expected {device_count} values per device")
+
+    def nvmlInit(self) -> None:
+        self.initialized = True
+
+    def nvmlShutdown(self) -> None:
+        self.initialized = False
+
+    def nvmlSystemGetDriverVersion(self) -> str:
+        return "fake"
+
+    def nvmlDeviceGetCount(self) -> int:
+        return len(self.power_w)
+
+    def nvmlDeviceGetHandleByIndex(self, index: int) -> int:
+        if index >= len(self.power_w):
+            raise ValueError(f"No device {index}")
+        return index
+
+    def nvmlDeviceGetName(self, handle: int) -> str:
+        return f"{self.name} #{handle}"
+
+    def nvmlDeviceGetPowerUsage(self, handle: int) -> float:
+        return self.power_w[handle] * 1000  # mW
+
+    def nvmlDeviceGetUtilizationRates(self, handle: int) -> _Utilization:
+        return _Utilization(gpu=self.utilization[handle], memory=0.0)
+
+    def nvmlDeviceGetMemoryInfo(self, handle: int) -> _Memory:
+        return _Memory(used=self.memory_mb[handle] * 1024 * 1024)
@@ -1,74 +1,245 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
-from tcn.hws.analysis import energy_envelop_calculation, load_data
-from tcn.hws.constants import HWS_HARDWARE_SPECS, HWS_HW_CPU, HWS_HW_GPU
+from tcn.hws.analysis import (
+    device_mean,
+    device_total,
+    energy_envelop_calculation,
+    load_data,
+    sample_timestamps,
+    time_slice,
+)
+from tcn.hws.constants import (
+    HWS_GRAPH_MAX_POINTS,
+    HWS_HARDWARE_SPECS,
+    HWS_HW_CPU,
+    HWS_HW_GPU,
+)
+from tcn.hws.decimate import DECIMATE_MINMAX, Trace, levels_of_detail
 
 COLOR_VRAM = "C4"
 
+# Finer levels of detail are not embedded in the HTML figure. Level `i` is cut
+# in LOD_FACTOR**i time windows of about `max_points` points each, written as
+# scripts next to the figure: on zoom, only the windows in view of the finest
+# level that keeps the visible points under the budget are loaded
+_LOD_SCRIPT = """
+var gd = document.getElementById('{plot_id}');
+var lod = %(lod)s;
+var loaded = {};
+var waiting = {};
+var request = 0;
+window.hwsLodLoaded = function(key, traces) {
+    loaded[key] = traces;
+    (waiting[key] || []).forEach(function(callback) { callback(); });
+    delete waiting[key];
+};
+function load(key, callback) {
+    if (loaded[key]) { callback(); return; }
+    if (!waiting[key]) {
+        waiting[key] = [];
+        var script = document.createElement('script');
+        script.src = lod.directory + '/' + key + '.js';
+        document.head.appendChild(script);
+    }
+    waiting[key].push(callback);
+}
+function show(traces) {
+    Plotly.restyle(gd, {
+        x: traces.map(function(t) { return t.x; }),
+        y: traces.map(function(t) { return t.y; })
+    });
+}
+gd.on('plotly_relayout', function(event) {
+    var x0 = event['xaxis.range[0]'], x1 = event['xaxis.range[1]'];
+    var zoomed = x0 !== undefined && x1 !== undefined;
+    if (!zoomed && !event['xaxis.autorange']) { return; }
+    var current = ++request;
+    var duration = lod.stop - lod.start;
+    var level = 0;
+    if (zoomed && x1 > x0) {
+        level = Math.floor(Math.log(duration / (x1 - x0)) / Math.log(lod.factor));
+        level = Math.max(0, Math.min(level, lod.levels));
+    }
+    if (level === 0) { show(lod.coarse); return; }
+    var width = duration / Math.pow(lod.factor, level);
+    var count = Math.pow(lod.factor, level);
+    var first = Math.max(0, Math.min(Math.floor((x0 - lod.start) / width), count - 1));
+    var last = Math.max(0, Math.min(Math.floor((x1 - lod.start) / width), count - 1));
+    var keys = [];
+    for (var k = first; k <= last; k++) { keys.push(level + '_' + k); }
+    var remaining = keys.length;
+    keys.forEach(function(key) {
+        load(key, function() {
+            if (--remaining > 0 || current !== request) { return; }
+            show(lod.coarse.map(function(_, i) {
+                var x = [], y = [];
+                keys.forEach(function(key) {
+                    x = x.concat(loaded[key][i].x);
+                    y = y.concat(loaded[key][i].y);
+                });
+                return {x: x, y: y};
+            }));
+        });
+    });
+});
+"""
+
+LOD_FACTOR = 4
+
+
+def _json_trace(x: np.ndarray, y: np.ndarray) -> Dict[str, list]:
+    # Missing samples (NaN) are gaps: null in JSON
+    return {"x": np.round(x, 3).tolist(), "y": np.where(np.isnan(y), None, y).tolist()}
+
+
+def write_lod_windows(
+    directory: str, traces_lod: List[List[Trace]], start: float, stop: float
+) -> int:
+    """Write the finer levels of detail (all but the coarsest) of the traces,
+    cut in time windows, as scripts loaded by the HTML figure on zoom.
+    Returns the number of windows written."""
+    os.makedirs(directory, exist_ok=True)
+    written = 0
+    for level in range(1, len(traces_lod[0])):
+        count = LOD_FACTOR**level
+        bounds = start + (stop - start) * np.arange(count + 1) / count
+        for window in range(count):
+            traces = []
+            for levels in traces_lod:
+                x, y = levels[level]
+                first = int(np.searchsorted(x, bounds[window], side="left"))
+                if window == count - 1:
+                    last = len(x)
+                else:
+                    last = int(np.searchsorted(x, bounds[window + 1], side="left"))
+                traces.append(_json_trace(x[first:last], y[first:last]))
+            key = f"{level}_{window}"
+            with open(os.path.join(directory, f"{key}.js"), "w") as f:
+                f.write(f"hwsLodLoaded({json.dumps(key)}, {json.dumps(traces)});\n")
+            written += 1
+    return written
+
+
+def _lod_script(
+    traces_lod: List[List[Trace]], directory: str, start: float, stop: float
+) -> str:
+    lod = dict(
+        coarse=[_json_trace(*levels[0]) for levels in traces_lod],
+        levels=len(traces_lod[0]) - 1,
+        factor=LOD_FACTOR,
+        directory=directory,
+        start=start,
+        stop=stop,
+    )
+    return _LOD_SCRIPT % dict(lod=json.dumps(lod))
+
 
 def cli(
     data_filepath: str,
-    data_format: str = "npz",
-    data_range: slice = slice(None),
+    data_format: Optional[str] = None,
+    data_range: Optional[Tuple[float, float]] = None,
     cpu_label: str = HWS_HW_CPU,
     gpu_label: str = HWS_HW_GPU,
+    max_points: int = HWS_GRAPH_MAX_POINTS,
+    decimation: str = DECIMATE_MINMAX,
+    html: bool = False,
 ):
+    """Plot the sensors & report the energy envelop of a dump.
+
+    Args:
+        data_range: (start, stop) in seconds since the first sample
+        max_points: traces are decimated to this number of points
+        decimation: "minmax" keeps the peaks of each bucket, "lttb" the shape
+        html: also write an interactive figure. Only the coarsest level of
+            detail is embedded, finer ones are written in `<name>_lod/` and
+            loaded on zoom, for the time windows in view
+    """
+    if data_format is None:
+        data_format = os.path.splitext(data_filepath)[1].lstrip(".")
     d = load_data(data_filepath, data_format)
-    sample_count = len(d["cpu_psu"][data_range])
-    yd = np.arange(sample_count)
+    # Whole run: power & memory are summed, utilization is averaged
+    gpu_psu = device_total(d["gpu_psu"])
+    gpu_exe_utl = device_mean(d["gpu_exe_utl"])
+    gpu_mem = device_total(d["gpu_mem"])
+    cpu_psu = device_total(d["cpu_psu"])
+    cpu_exe_utl = device_mean(d["cpu_exe_utl"])
+    gpu_count = np.asarray(d["gpu_psu"]).reshape(len(d["gpu_psu"]), -1).shape[1]
+    timestamps = sample_timestamps(d, len(cpu_psu))
+    selection = time_slice(timestamps, data_range)
+    # Seconds since the first sample
+    elapsed = (timestamps - timestamps[0])[selection]
 
-    fig = make_subplots(specs=[[{"secondary_y": True}]])
-    # Add traces
-    fig.add_trace(
-        go.Scatter(y=d["gpu_psu"][data_range], x=yd, name="GPU PSU(W)"),
-        secondary_y=False,
-    )
-    fig.add_trace(
-        go.Scatter(y=d["gpu_exe_utl"][data_range], x=yd, name="GPU Utilization(%)"),
-        secondary_y=False,
-    )
-    fig.add_trace(
-        go.Scatter(y=d["cpu_psu"][data_range], x=yd, name="CPU PSU(W - extrapolated)"),
-        secondary_y=False,
-    )
-    fig.add_trace(
-        go.Scatter(y=d["cpu_exe_utl"][data_range], x=yd, name="CPU Utilization(%)"),
-        secondary_y=False,
-    )
+    traces = [
+        (gpu_psu, "GPU PSU(W)", False),
+        (gpu_exe_utl, "GPU Utilization(%)", False),
+        (cpu_psu, "CPU PSU(W - extrapolated)", False),
+        (cpu_exe_utl, "CPU Utilization(%)", False),
+        (gpu_mem, "GPU VRAM (Mb)", True),
+    ]
+    traces_lod = [
+        levels_of_detail(
+            elapsed, values[selection], max_points, decimation, factor=LOD_FACTOR
+        )
+        for values, _, _ in traces
+    ]
 
-    fig.add_trace(
-        go.Scatter(y=d["gpu_mem"][data_range], x=yd, name="GPU VRAM (Mb)"),
-        secondary_y=True,
-    )
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    # Add traces, at their coarsest level of detail
+    for (_, name, secondary_y), levels in zip(traces, traces_lod):
+        x, y = levels[0]
+        fig.add_trace(go.Scatter(x=x, y=y, name=name), secondary_y=secondary_y)
 
     # Labels
     fig.update_layout(
         title_text="Hardware sensors",
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
     )
-    fig.update_xaxes(title_text="Sample #")
+    fig.update_xaxes(title_text="Time (s)")
     fig.update_yaxes(
         title_text="W or %",
         secondary_y=False,
-        range=[0, HWS_HARDWARE_SPECS[gpu_label]["PSU_TDP"]],
+        range=[0, HWS_HARDWARE_SPECS[gpu_label]["PSU_TDP"] * gpu_count],
     )
     fig.update_yaxes(
         title_text="Mb",
         secondary_y=True,
-        range=[0, HWS_HARDWARE_SPECS[gpu_label]["MAX_VRAM"]],
+        range=[0, HWS_HARDWARE_SPECS[gpu_label]["MAX_VRAM"] * gpu_count],
     )
 
     print(
-        f"Max VRAM: {np.max(d['gpu_mem'][data_range])}\n"
-        f"Max GPU PSU: {np.max(d['gpu_psu'][data_range])}\n"
-        f"Max CPU exe: {np.max(d['gpu_exe_utl'][data_range])}\n"
+        f"Max VRAM: {np.max(gpu_mem[selection])}\n"
+        f"Max GPU PSU: {np.max(gpu_psu[selection])}\n"
+        f"Max CPU exe: {np.max(gpu_exe_utl[selection])}\n"
     )
 
+    if html:
+        html_filepath = data_filepath.replace(f".{data_format}", ".html")
+        # Finer levels of detail next to the figure, in `<name>_lod/`
+        lod_directory = os.path.splitext(html_filepath)[0] + "_lod"
+        start, stop = (
+            (float(elapsed[0]), float(elapsed[-1])) if len(elapsed) else (0, 0)
+        )
+        write_lod_windows(lod_directory, traces_lod, start, stop)
+        fig.write_html(
+            html_filepath,
+            include_plotlyjs="cdn",
+            post_script=_lod_script(
+                traces_lod, os.path.basename(lod_directory), start, stop
+            ),
+        )
     fig.write_image(data_filepath.replace(f".{data_format}", ".png"))
 
-    energy_envelop_calculation(d["cpu_psu"][data_range], d["gpu_psu"][data_range])
+    energy_envelop_calculation(
+        cpu_psu[selection],
+        gpu_psu[selection],
+        timestamps=timestamps[selection],
+    )
 
 
 # Useful for debug
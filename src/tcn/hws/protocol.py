@@ -0,0 +1,75 @@
+import asyncio
+import json
+import socket
+import struct
+from typing import Any, Dict, Optional
+
+# Each message is a JSON object prefixed by its size (4 bytes, big endian)
+_HEADER = struct.Struct("!I")
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+class ProtocolError(RuntimeError):
+    pass
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    payload = json.dumps(message).encode("utf8")
+    if len(payload) > MAX_MESSAGE_BYTES:
+        raise ProtocolError(f"Message of {len(payload)} bytes is too large")
+    return _HEADER.pack(len(payload)) + payload
+
+
+def _decode(payload: bytes) -> Dict[str, Any]:
+    try:
+        message = json.loads(payload.decode("utf8"))
+    except ValueError as e:
+        raise ProtocolError(f"Malformed message: {e}")
+    if not isinstance(message, dict):
+        raise ProtocolError(f"Expected a JSON object, got {type(message).__name__}")
+    return message
+
+
+def _size(header: bytes) -> int:
+    (size,) = _HEADER.unpack(header)
+    if size > MAX_MESSAGE_BYTES:
+        raise ProtocolError(f"Message of {size} bytes is too large")
+    return size
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    """Next message of the stream, None if the peer closed the connection"""
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial == b"":
+            return None
+        raise ProtocolError("Connection closed within a message header")
+    try:
+        payload = await reader.readexactly(_size(header))
+    except asyncio.IncompleteReadError:
+        raise ProtocolError("Connection closed within a message")
+    return _decode(payload)
+
+
+async def write_message(writer: asyncio.StreamWriter, message: Dict[str, Any]):
+    writer.write(encode(message))
+    await writer.drain()
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if chunk == b"":
+            raise ConnectionError("Connection closed by the server")
+        data += chunk
+    return bytes(data)
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any]) -> None:
+    sock.sendall(encode(message))
+
+
+def recv_message(sock: socket.socket) -> Dict[str, Any]:
+    return _decode(_recv_exactly(sock, _size(_recv_exactly(sock, _HEADER.size))))
@@ -0,0 +1,123 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Sensors read per GPU device, one column per device
+GPU_FIELDS = ["gpu_psu", "gpu_exe_utl", "gpu_mem_utl", "gpu_mem"]  # W, %, %, Mb
+# Sensors read per node
+CPU_FIELDS = ["cpu_exe_utl", "cpu_psu"]  # %, W (extrapolated)
+
+
+def sample_dtype(device_count: int = 1) -> np.dtype:
+    """One record per sample: monotonic timestamp (s) then the sensors"""
+    return np.dtype(
+        [("timestamp", np.float64)]
+        + [(field, np.float32, (device_count,)) for field in GPU_FIELDS]
+        + [(field, np.float32) for field in CPU_FIELDS]
+    )
+
+
+SAMPLE_DTYPE = sample_dtype(1)
+
+
+class SampleBuffer:
+    """Preallocated store of typed samples (structured NumPy records).
+
+    Samples are written in place in chunks of `chunk_size` records. A new chunk
+    is allocated when the current one is full: nothing is ever copied while
+    recording. If `max_samples` is given, the buffer becomes a ring keeping
+    exactly the `max_samples` most recent samples: older ones are dropped one
+    by one, and a chunk is recycled once all its samples are dropped. Memory
+    stays flat on multi-day runs, under `max_samples` plus one chunk (chunks
+    are not larger than `max_samples`).
+    """
+
+    def __init__(
+        self,
+        dtype: np.dtype = SAMPLE_DTYPE,
+        chunk_size: int = 65536,
+        max_samples: Optional[int] = None,
+    ) -> None:
+        if chunk_size < 1:
+            raise ValueError(f"Chunk size must be positive, got {chunk_size}")
+        if max_samples is not None and max_samples < 1:
+            raise ValueError(f"Max samples must be positive, got {max_samples}")
+        self.dtype = np.dtype(dtype)
+        self.max_samples = max_samples
+        self.chunk_size = (
+            chunk_size if max_samples is None else min(chunk_size, max_samples)
+        )
+        self.dropped = 0  # samples overwritten by the ring
+        self._chunks: List[np.ndarray] = [np.empty(self.chunk_size, dtype=self.dtype)]
+        self._head = 0  # oldest record kept in the first chunk
+        self._position = 0  # next record in the last chunk
+        self._spare: Optional[np.ndarray] = None  # chunk recycled by the ring
+
+    def __len__(self) -> int:
+        return (len(self._chunks) - 1) * self.chunk_size + self._position - self._head
+
+    @property
+    def appended(self) -> int:
+        """Samples recorded since creation (or `clear`), dropped ones included"""
+        return self.dropped + len(self)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory allocated, used or not"""
+        chunks = len(self._chunks) + (self._spare is not None)
+        return chunks * self.chunk_size * self.dtype.itemsize
+
+    def append(self, *values) -> None:
+        """Record one sample, values in the order of the dtype fields"""
+        if self._position == self.chunk_size:
+            self._next_chunk()
+        self._chunks[-1][self._position] = values
+        self._position += 1
+        if self.max_samples is not None and len(self) > self.max_samples:
+            self._drop_oldest()
+
+    def _next_chunk(self) -> None:
+        if self._spare is not None:
+            self._chunks.append(self._spare)
+            self._spare = None
+        else:
+            self._chunks.append(np.empty(self.chunk_size, dtype=self.dtype))
+        self._position = 0
+
+    def _drop_oldest(self) -> None:
+        self._head += 1
+        self.dropped += 1
+        if self._head == self.chunk_size:
+            # Ring: the oldest chunk will become the newest
+            self._spare = self._chunks.pop(0)
+            self._head = 0
+
+    def to_array(self) -> np.ndarray:
+        """All samples, oldest first, as one contiguous structured array"""
+        return self.since(self.dropped)
+
+    def since(self, start: int) -> np.ndarray:
+        """Copy of the samples recorded from the `start`-th one (counted as
+        `appended`), oldest first. Samples already dropped by the ring are lost.
+        """
+        chunk, offset = divmod(
+            max(start - self.dropped, 0) + self._head, self.chunk_size
+        )
+        views = (self._chunks[:-1] + [self._chunks[-1][: self._position]])[chunk:]
+        if len(views) == 0:
+            return np.empty(0, dtype=self.dtype)
+        views[0] = views[0][offset:]
+        return np.concatenate(views)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """All samples as one array per field, e.g. to be dumped with `np.savez`"""
+        data = self.to_array()
+        return {name: data[name] for name in self.dtype.names}
+
+    def clear(self) -> None:
+        """Drop all samples, keeping a single chunk allocated"""
+        self._chunks = self._chunks[:1]
+        self._head = 0
+        self._position = 0
+        self._spare = None
+        self.dropped = 0
@@ -0,0 +1,50 @@
+import asyncio
+import time
+from typing import Callable
+
+
+class DeadlineScheduler:
+    """Wakes up on absolute deadlines `start + k * period_s`.
+
+    Unlike sleeping `period_s` after each iteration, the time spent working
+    between wake-ups doesn't accumulate into drift. If the work overruns one or
+    more deadlines, they are skipped and counted as missed: the schedule is
+    never shifted.
+    """
+
+    def __init__(
+        self,
+        period_s: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if period_s <= 0:
+            raise ValueError(f"Period must be positive, got {period_s}")
+        self.period_s = period_s
+        self.clock = clock
+        self.start = clock()
+        self.ticks = 0  # deadlines reached
+        self.missed_deadlines = 0
+        self.max_lateness_s = 0.0  # worst wake-up after its deadline
+
+    @property
+    def next_deadline(self) -> float:
+        return self.start + (self.ticks + 1) * self.period_s
+
+    def _advance(self, now: float) -> float:
+        """Move to the next deadline not yet passed, returns the time to it"""
+        deadline = self.next_deadline
+        if now > deadline:
+            # Work overran: skip the deadlines we can't honor anymore
+            missed = int((now - deadline) // self.period_s) + 1
+            self.missed_deadlines += missed
+            self.ticks += missed
+            deadline = self.next_deadline
+        self.ticks += 1
+        return deadline - now
+
+    async def wait(self) -> None:
+        """Sleep until the next deadline"""
+        delay = self._advance(self.clock())
+        await asyncio.sleep(max(delay, 0.0))
+        lateness = self.clock() - (self.start + self.ticks * self.period_s)
+        self.max_lateness_s = max(self.max_lateness_s, lateness)
@@ -0,0 +1,259 @@
+import glob
+import os
+import re
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import psutil
+
+from tcn.hws.constants import HWS_HARDWARE_SPECS, HWS_HW_CPU, HWS_HW_GPU
+from tcn.hws.sample_buffer import CPU_FIELDS, GPU_FIELDS
+
+# Names of the providers, see `make_providers`
+SENSOR_NVML = "nvml"
+SENSOR_PSUTIL = "psutil"
+SENSOR_RAPL = "rapl"
+SENSOR_SIMULATED = "simulated"
+
+
+class SensorProvider:
+    """Source of sensor readings polled by the sampler.
+
+    `read` returns a value for each of the `fields` it provides (see
+    `tcn.hws.sample_buffer`), a list with one value per device for GPU
+    fields. Providers are polled concurrently: `read` must not share
+    state with other providers.
+    """
+
+    fields: List[str] = []
+    # NVML indices of the GPUs read, empty for node sensors
+    devices: List[int] = []
+
+    def open(self) -> None:
+        pass
+
+    def read(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __str__(self) -> str:
+        return type(self).__name__
+
+
+class NVMLProvider(SensorProvider):
+    """GPU power, utilization & memory through NVML (`pynvml` or a stand-in
+    with the same functions, e.g. `FakeNVML`)"""
+
+    fields = GPU_FIELDS
+
+    def __init__(self, nvml: Any = None, devices: Optional[List[int]] = None):
+        if nvml is None:
+            import pynvml as nvml
+        self.nvml = nvml
+        self._requested_devices = devices
+        self.devices = []
+        self._handles: List[Any] = []
+
+    def open(self) -> None:
+        self.nvml.nvmlInit()
+        self.devices = (
+            self._requested_devices
+            if self._requested_devices is not None
+            else list(range(self.nvml.nvmlDeviceGetCount()))
+        )
+        self._handles = [
+            self.nvml.nvmlDeviceGetHandleByIndex(device) for device in self.devices
+        ]
+
+    def names(self) -> List[str]:
+        return [self.nvml.nvmlDeviceGetName(handle) for handle in self._handles]
+
+    def read(self) -> Dict[str, Any]:
+        gpu_psu, gpu_exe_utl, gpu_mem_utl, gpu_mem = [], [], [], []
+        for handle in self._handles:
+            gpu_psu.append(self.nvml.nvmlDeviceGetPowerUsage(handle) / 1000)
+            nvmlUtlz = self.nvml.nvmlDeviceGetUtilizationRates(handle)
+            gpu_exe_utl.append(nvmlUtlz.gpu)
+            gpu_mem_utl.append(nvmlUtlz.memory)
+            nvmlMem = self.nvml.nvmlDeviceGetMemoryInfo(handle)
+            gpu_mem.append(nvmlMem.used / (1024 * 1024))
+        return dict(
+            gpu_psu=gpu_psu,
+            gpu_exe_utl=gpu_exe_utl,
+            gpu_mem_utl=gpu_mem_utl,
+            gpu_mem=gpu_mem,
+        )
+
+    def close(self) -> None:
+        self.nvml.nvmlShutdown()
+
+
+class PsutilProvider(SensorProvider):
+    """CPU utilization, with the CPU power extrapolated linearly from it"""
+
+    fields = CPU_FIELDS
+
+    def __init__(self, cpu_label: str = HWS_HW_CPU):
+        self.idle = HWS_HARDWARE_SPECS[cpu_label]["PSU_IDLE"]
+        self.tdp = HWS_HARDWARE_SPECS[cpu_label]["PSU_TDP"]
+
+    def read(self) -> Dict[str, Any]:
+        cpu_use = psutil.cpu_percent()
+        return dict(
+            cpu_exe_utl=cpu_use, cpu_psu=max(cpu_use / 100 * self.tdp, self.idle)
+        )
+
+
+class RAPLProvider(SensorProvider):
+    """Measured CPU power of all packages from the Linux powercap (RAPL)
+    energy counters. Power is the energy consumed since the previous read."""
+
+    fields = ["cpu_psu"]
+
+    _RE_PACKAGE = re.compile(r"intel-rapl:\d+$")
+
+    def __init__(self, root: str = "/sys/class/powercap"):
+        self.root = root
+        self._packages = sorted(
+            path
+            for path in glob.glob(f"{root}/intel-rapl:*")
+            if self._RE_PACKAGE.search(path)
+        )
+        self._previous: List[int] = []
+        self._previous_time = 0.0
+
+    @classmethod
+    def available(cls, root: str = "/sys/class/powercap") -> bool:
+        """Packages are exposed and their counters readable (often root only)"""
+        packages = cls(root)._packages
+        return packages != [] and all(
+            os.access(f"{package}/energy_uj", os.R_OK) for package in packages
+        )
+
+    def _read_uj(self, filename: str) -> int:
+        with open(filename) as f:
+            return int(f.read())
+
+    def _energy_uj(self) -> List[int]:
+        return [self._read_uj(f"{package}/energy_uj") for package in self._packages]
+
+    def open(self) -> None:
+        if self._packages == []:
+            raise RuntimeError(f"No RAPL package under {self.root}")
+        self._ranges = [
+            self._read_uj(f"{package}/max_energy_range_uj")
+            for package in self._packages
+        ]
+        self._previous = self._energy_uj()
+        self._previous_time = time.monotonic()
+
+    def read(self) -> Dict[str, Any]:
+        energy = self._energy_uj()
+        now = time.monotonic()
+        dt = now - self._previous_time
+        consumed = 0
+        for current, previous, energy_range in zip(
+            energy, self._previous, self._ranges
+        ):
+            # Counters wrap around at max_energy_range_uj
+            consumed += (current - previous) % (energy_range + 1)
+        self._previous, self._previous_time = energy, now
+        return dict(cpu_psu=consumed / 1e6 / dt if dt > 0 else float("nan"))
+
+
+class SimulatedProvider(SensorProvider):
+    """Synthetic GPU & CPU sensors following a periodic load, to test or
+    benchmark the sampler without hardware. `read_latency_s` emulates the
+    cost of a sensor read."""
+
+    fields = GPU_FIELDS + CPU_FIELDS
+
+    def __init__(
+        self,
+        device_count: int = 1,
+        period_s: float = 10.0,
+        read_latency_s: float = 0.0,
+        seed: Optional[int] = 0,
+        cpu_label: str = HWS_HW_CPU,
+        gpu_label: str = HWS_HW_GPU,
+    ):
+        self.devices = list(range(device_count))
+        self.period_s = period_s
+        self.read_latency_s = read_latency_s
+        self._rng = np.random.default_rng(seed)
+        self._cpu = HWS_HARDWARE_SPECS[cpu_label]
+        self._gpu = HWS_HARDWARE_SPECS[gpu_label]
+        self._start = 0.0
+
+    def open(self) -> None:
+        self._start = time.monotonic()
+
+    def read(self) -> Dict[str, Any]:
+        if self.read_latency_s > 0:
+            time.sleep(self.read_latency_s)
+        phase = 2 * np.pi * (time.monotonic() - self._start) / self.period_s
+        # Devices are slightly out of phase with each other
+        load = 0.5 + 0.5 * np.sin(phase + 0.1 * np.arange(len(self.devices)))
+        load = np.clip(load + self._rng.normal(0, 0.02, len(self.devices)), 0, 1)
+        cpu_load = float(np.clip(1 - load.mean(), 0, 1))
+        return dict(
+            gpu_psu=(0.15 + 0.85 * load) * self._gpu["PSU_TDP"],
+            gpu_exe_utl=100 * load,
+            gpu_mem_utl=50 * load,
+            gpu_mem=np.full(len(self.devices), 0.5 * self._gpu["MAX_VRAM"]),
+            cpu_exe_utl=100 * cpu_load,
+            cpu_psu=max(cpu_load * self._cpu["PSU_TDP"], self._cpu["PSU_IDLE"]),
+        )
+
+
+class ReplayProvider(SensorProvider):
+    """Replays recorded samples (e.g. a previous dump) one per read, looping"""
+
+    def __init__(self, data: Mapping[str, Any], fields: Optional[List[str]] = None):
+        self.fields = [
+            field for field in (fields or GPU_FIELDS + CPU_FIELDS) if field in data
+        ]
+        self._data = {field: np.asarray(data[field]) for field in self.fields}
+        if "devices" in data:
+            self.devices = [int(d) for d in np.asarray(data["devices"]).reshape(-1)]
+        self._length = min(len(values) for values in self._data.values())
+        self._index = 0
+
+    def read(self) -> Dict[str, Any]:
+        values = {field: data[self._index] for field, data in self._data.items()}
+        self._index = (self._index + 1) % self._length
+        return values
+
+
+def make_providers(
+    names: Sequence[str],
+    devices: Optional[List[int]] = None,
+) -> List[SensorProvider]:
+    """Providers by name. Later providers override the fields of earlier ones,
+    e.g. `["nvml", "psutil", "rapl"]` measures the CPU power with RAPL."""
+    providers: List[SensorProvider] = []
+    for name in names:
+        if name == SENSOR_NVML:
+            providers.append(NVMLProvider(devices=devices))
+        elif name == SENSOR_PSUTIL:
+            providers.append(PsutilProvider())
+        elif name == SENSOR_RAPL:
+            providers.append(RAPLProvider())
+        elif name == SENSOR_SIMULATED:
+            providers.append(
+                SimulatedProvider(device_count=len(devices) if devices else 1)
+            )
+        else:
+            raise ValueError(f"Unknown sensor provider {name}")
+    return providers
+
+
+def default_providers(devices: Optional[List[int]] = None) -> List[SensorProvider]:
+    """NVML & psutil, with RAPL measuring the CPU power when readable"""
+    names = [SENSOR_NVML, SENSOR_PSUTIL]
+    if RAPLProvider.available():
+        names.append(SENSOR_RAPL)
+    return make_providers(names, devices)
@@ -2,149 +2,494 @@ import asyncio
 import json
 import os
 import socket
-from typing import List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import numpy as np
-import psutil
-from pynvml import (
-    nvmlDeviceGetCount,
-    nvmlDeviceGetHandleByIndex,
-    nvmlDeviceGetMemoryInfo,
-    nvmlDeviceGetName,
-    nvmlDeviceGetPowerUsage,
-    nvmlDeviceGetUtilizationRates,
-    nvmlInit,
-    nvmlSystemGetDriverVersion,
-)
 
 from tcn.hws.constants import (
+    HWS_BUFFER_CHUNK_SIZE,
+    HWS_BUFFER_MAX_SAMPLES,
+    HWS_DEVICES,
+    HWS_HTTP_PORT,
+    HWS_IDLE_UTILIZATION_PCT,
+    HWS_ROLLING_WINDOW_S,
+    HWS_SENSORS,
+    HWS_STREAM_FLUSH_SAMPLES,
+    HWS_TICK_DEFAULT,
+    HWS_DUMP_ARROW,
     HWS_DUMP_FORMAT,
     HWS_DUMP_JSON,
+    HWS_DUMP_NAME,
     HWS_DUMP_NPZ,
-    HWS_HARDWARE_SPECS,
-    HWS_HW_CPU,
     SERV_ORDER_DUMP,
+    SERV_ORDER_QUERY,
     SERV_ORDER_START,
+    SERV_ORDER_STATS,
+    SERV_ORDER_STATUS,
     SERV_ORDER_STOP,
     SERV_ORDER_TICK,
-    SOCKET_DIRECTORY,
     SOCKET_FILENAME,
 )
+from tcn.hws.protocol import ProtocolError, read_message, write_message
+from tcn.hws.sample_buffer import (
+    CPU_FIELDS,
+    GPU_FIELDS,
+    SampleBuffer,
+    sample_dtype,
+)
+from tcn.hws.scheduler import DeadlineScheduler
+from tcn.hws.sensors import SensorProvider, default_providers, make_providers
+from tcn.hws.stream_dump import StreamDumpWriter
+from tcn.hws.telemetry import RollingStats, json_page, prometheus_text, serve_http
+
+
+def assemble_sample(
+    timestamp: float,
+    readings: List[Dict[str, Any]],
+    device_count: int,
+) -> Tuple:
+    """Sample in the order of `sample_dtype(device_count)` from the readings of
+    all providers (later ones override earlier ones). Missing sensors are NaN."""
+    values: Dict[str, Any] = {}
+    for reading in readings:
+        values.update(reading)
+    return (
+        timestamp,
+        *[values.get(field, [np.nan] * device_count) for field in GPU_FIELDS],
+        *[values.get(field, np.nan) for field in CPU_FIELDS],
+    )
+
+
+def read_sample(providers: List[SensorProvider], device_count: int) -> Tuple:
+    """One sample of the node, providers read one after the other"""
+    timestamp = time.monotonic()
+    return assemble_sample(
+        timestamp, [provider.read() for provider in providers], device_count
+    )
+
+
+class StreamFlusher:
+    """Appends the samples & ticks recorded since the last flush to a stream
+    dump. Writes happen in order on a background thread: sampling never
+    waits on the filesystem.
+
+    A failed write stops the streaming: it is logged as soon as it happens and
+    raised by the next `flush` or `close`.
+    """
+
+    def __init__(
+        self,
+        writer: StreamDumpWriter,
+        samples: SampleBuffer,
+        flush_samples: int = HWS_STREAM_FLUSH_SAMPLES,
+    ) -> None:
+        self.writer = writer
+        self.samples = samples
+        self.flush_samples = flush_samples
+        self.flushed = samples.appended
+        self.ticks: List[Tuple[float, str, int]] = []  # not yet flushed
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.error: Optional[BaseException] = None
+
+    def due(self) -> bool:
+        if self.error is not None:
+            return False
+        return self.samples.appended - self.flushed >= self.flush_samples
+
+    def _written(self, future: asyncio.Future) -> None:
+        if future.cancelled() or future.exception() is None or self.error:
+            return
+        self.error = future.exception()
+        print(
+            f"[NVML SERVER] Writing {self.writer.filename} failed, "
+            f"streaming stopped: {self.error!r}"
+        )
+
+    def flush(self, missed_deadlines: int = 0) -> asyncio.Future:
+        """Hand the new samples to the writer thread, await to wait for the write"""
+        if self.error is not None:
+            raise RuntimeError(
+                f"Stream dump {self.writer.filename} failed: {self.error!r}"
+            ) from self.error
+        # Copied on the loop: the ring may recycle the samples meanwhile
+        records = self.samples.since(self.flushed)
+        self.flushed = self.samples.appended
+        ticks, self.ticks = self.ticks, []
+        future = asyncio.get_event_loop().run_in_executor(
+            self._executor, self.writer.write, records, ticks, missed_deadlines
+        )
+        future.add_done_callback(self._written)
+        return future
+
+    async def close(self, missed_deadlines: int = 0) -> None:
+        try:
+            await self.flush(missed_deadlines)
+        finally:
+            self._executor.shutdown()
+            self.writer.close()
+
+
+def stream_dump_writer(
+    dtype: np.dtype,
+    dump_name: str,
+    host: str,
+    devices: List[int],
+) -> StreamDumpWriter:
+    """Stream dump of the node, see `dump_samples` for the content"""
+    return StreamDumpWriter(
+        f"./{dump_name}.{host}.{HWS_DUMP_ARROW}",
+        dtype,
+        metadata=dict(
+            host=host,
+            devices=devices,
+            wall_clock_origin=time.time() - time.monotonic(),
+        ),
+    )
 
 
 async def psu_utlz_read(
-    gpu_psu: List[float],
-    gpu_exe_utl: List[float],
-    gpu_mem_utl: List[float],
-    gpu_mem: List[float],
-    cpu_exe_utl: List[float],
-    cpu_psu: List[float],
-    record_dt: float,
-    handle,
+    samples: SampleBuffer,
+    scheduler: DeadlineScheduler,
+    providers: List[SensorProvider],
+    device_count: int,
+    flusher: Optional[StreamFlusher] = None,
+    stats: Optional[RollingStats] = None,
 ):
-    while True:
-        # NVML reads
-        gpu_psu.append(nvmlDeviceGetPowerUsage(handle) / 1000)
-        nvmlUtlz = nvmlDeviceGetUtilizationRates(handle)
-        gpu_exe_utl.append(nvmlUtlz.gpu)
-        gpu_mem_utl.append(nvmlUtlz.memory)
-        nvmlMem = nvmlDeviceGetMemoryInfo(handle)
-        gpu_mem.append(nvmlMem.used / (1024 * 1024))
-        # CPU - EPYC 7402
-        cpu_use = psutil.cpu_percent()
-        cpu_exe_utl.append(cpu_use)
-        # linear regression for power on CPU from utl
-        idle = HWS_HARDWARE_SPECS[HWS_HW_CPU]["PSU_IDLE"]
-        tdp = HWS_HARDWARE_SPECS[HWS_HW_CPU]["PSU_TDP"]
-        cpu_psu.append(max(cpu_use / 100 * tdp, idle))
-        # Sleep the dt
-        await asyncio.sleep(record_dt)
-
-
-async def main():
-    # # Setup
-    print("NVML server up & waiting for connection")
-    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-    os.makedirs(SOCKET_DIRECTORY, exist_ok=True)
-    if os.path.exists(SOCKET_FILENAME):
-        os.remove(SOCKET_FILENAME)
-    server.bind(SOCKET_FILENAME)
-    server.listen(1)
-    server.setblocking(False)
-
-    # Actions
-    record_dt = 1
-    hardware_load = {}
-    hardware_load["gpu_psu"] = []
-    hardware_load["gpu_exe_utl"] = []
-    hardware_load["gpu_mem_utl"] = []
-    hardware_load["gpu_mem"] = []
-    hardware_load["cpu_exe_utl"] = []
-    hardware_load["cpu_psu"] = []
-    ticks = []
-
-    # Spin NVML
-    nvmlInit()
-    print("[NVML SERVER] Driver Version:", nvmlSystemGetDriverVersion())
-    deviceCount = nvmlDeviceGetCount()
-    assert deviceCount == 1
-    handle = nvmlDeviceGetHandleByIndex(0)
-    name = nvmlDeviceGetName(handle)
-    print(f"[NVML SERVER] Device: {name}")
-
-    # asyncio
     loop = asyncio.get_event_loop()
+    # Providers are polled concurrently off the event loop, a slow sensor
+    # doesn't delay the others
+    with ThreadPoolExecutor(max_workers=len(providers)) as executor:
+        while True:
+            timestamp = scheduler.clock()
+            readings = await asyncio.gather(
+                *[
+                    loop.run_in_executor(executor, provider.read)
+                    for provider in providers
+                ]
+            )
+            sample = assemble_sample(timestamp, readings, device_count)
+            samples.append(*sample)
+            if stats:
+                stats.update(sample)
+            if flusher and flusher.due():
+                flusher.flush(scheduler.missed_deadlines)
+            # Sleep until the next period: reads don't drift the sampling
+            await scheduler.wait()
+
+
+def dump_samples(
+    samples: SampleBuffer,
+    dump_name: str,
+    host: str,
+    devices: List[int],
+    dump_format: str = HWS_DUMP_FORMAT,
+    missed_deadlines: int = 0,
+    ticks: Optional[List[Tuple[float, str, int]]] = None,
+) -> str:
+    """Dump the samples of the node, tagged with host & device indices.
+
+    The host is part of the filename so all nodes can dump side by side,
+    see `tcn.hws.analysis.merge_node_data` to build the run-level data.
+    """
+    hardware_load: Dict[str, np.ndarray] = samples.columns()
+    hardware_load["host"] = np.array(host)
+    hardware_load["devices"] = np.array(devices)
+    # Timestamps are monotonic: record the wall clock time of their origin
+    # to align the nodes of a run
+    hardware_load["wall_clock_origin"] = np.array(time.time() - time.monotonic())
+    hardware_load["missed_deadlines"] = np.array(missed_deadlines)
+    # Phase markers of all ranks, on the clock of the samples
+    ticks = ticks or []
+    hardware_load["tick_timestamps"] = np.array(
+        [timestamp for timestamp, _, _ in ticks], dtype=np.float64
+    )
+    hardware_load["tick_names"] = np.array([name for _, name, _ in ticks], dtype=str)
+    hardware_load["tick_ranks"] = np.array(
+        [rank for _, _, rank in ticks], dtype=np.int64
+    )
+    if samples.dropped:
+        print(f"[NVML SERVER] {samples.dropped} oldest samples dropped")
+    filename = f"./{dump_name}.{host}.{dump_format}"
+    if dump_format == HWS_DUMP_NPZ:
+        np.savez_compressed(filename, **hardware_load)
+    elif dump_format == HWS_DUMP_JSON:
+        json_data = json.dumps(
+            {key: value.tolist() for key, value in hardware_load.items()},
+            indent=4,
+        )
+        with open(filename, "w") as f:
+            f.write(json_data)
+    elif dump_format == HWS_DUMP_ARROW:
+        writer = stream_dump_writer(samples.dtype, dump_name, host, devices)
+        writer.write(samples.to_array(), ticks, missed_deadlines)
+        writer.close()
+    else:
+        raise RuntimeWarning(f"Can't dump in unknown format {dump_format}")
+    return filename
+
 
-    # Server loop
-    while True:
-        # Deal with client/server
-        client, _ = await loop.sock_accept(server)
-        print(f"[NVML SERVER] Connection from {client}")
-
-        # Process request
-        request = (await loop.sock_recv(client, 255)).decode("utf8")
-        order = json.loads(request)
-
-        # We have a valid message
-        if order["action"] == SERV_ORDER_STOP:
-            print("[NVML SERVER] Closing...")
-            client.close()
-            break
-        elif order["action"] == SERV_ORDER_START:
-            record_dt = order["dt"]
-            loop.create_task(
-                psu_utlz_read(
-                    hardware_load["gpu_psu"],
-                    hardware_load["gpu_exe_utl"],
-                    hardware_load["gpu_mem_utl"],
-                    hardware_load["gpu_mem"],
-                    hardware_load["cpu_exe_utl"],
-                    hardware_load["cpu_psu"],
-                    record_dt,
-                    handle,
-                )
+def open_providers(
+    providers: Optional[List[SensorProvider]] = None,
+) -> Tuple[List[SensorProvider], List[int]]:
+    """Open the providers (default: HWSAMPLER_SENSORS or `default_providers`),
+    returns them with the indices of the GPUs sampled"""
+    if providers is None:
+        providers = (
+            make_providers(HWS_SENSORS, HWS_DEVICES)
+            if HWS_SENSORS is not None
+            else default_providers(HWS_DEVICES)
+        )
+    for provider in providers:
+        provider.open()
+    devices = next(
+        (provider.devices for provider in providers if provider.devices != []), []
+    )
+    return providers, devices
+
+
+class SamplerServer:
+    """Sampler of the node, serving the orders of any number of clients.
+
+    Each client keeps its connection open and every order gets a reply:
+    `{"ok": true, ...}` or `{"ok": false, "error": ...}` (see
+    `tcn.hws.protocol` for the framing).
+    """
+
+    def __init__(
+        self,
+        providers: List[SensorProvider],
+        devices: List[int],
+        host: Optional[str] = None,
+    ) -> None:
+        self.providers = providers
+        self.devices = devices
+        self.host = host or socket.gethostname()
+        self.device_count = max(len(devices), 1)
+        self.samples = SampleBuffer(
+            dtype=sample_dtype(self.device_count),
+            chunk_size=HWS_BUFFER_CHUNK_SIZE,
+            max_samples=HWS_BUFFER_MAX_SAMPLES,
+        )
+        self.scheduler: Optional[DeadlineScheduler] = None
+        self.flusher: Optional[StreamFlusher] = None
+        self.stats: Optional[RollingStats] = None
+        self.ticks: List[Tuple[float, str, int]] = []
+        self._sampling: Optional[asyncio.Task] = None
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self._stopped: Optional[asyncio.Event] = None
+
+    @property
+    def missed_deadlines(self) -> int:
+        return self.scheduler.missed_deadlines if self.scheduler else 0
+
+    async def start(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        if self._sampling is not None:
+            raise RuntimeError("Already recording")
+        self.scheduler = DeadlineScheduler(order["dt"])
+        self.stats = RollingStats(
+            window=max(1, round(HWS_ROLLING_WINDOW_S / self.scheduler.period_s)),
+            period_s=self.scheduler.period_s,
+            device_count=self.device_count,
+        )
+        if HWS_DUMP_FORMAT == HWS_DUMP_ARROW:
+            writer = stream_dump_writer(
+                self.samples.dtype,
+                order.get("dump_name", HWS_DUMP_NAME),
+                self.host,
+                self.devices,
             )
-            print(f"[NVML SERVER] Recording every {record_dt} seconds")
-        elif order["action"] == SERV_ORDER_DUMP:
-            hws_dump_name = order["dump_name"]
-            if HWS_DUMP_FORMAT == HWS_DUMP_NPZ:
-                np.savez_compressed(f"./{hws_dump_name}.npz", **hardware_load)
-            elif HWS_DUMP_FORMAT == HWS_DUMP_JSON:
-                json_data = json.dumps(hardware_load, indent=4)
-                with open(f"{hws_dump_name}.json", "w") as f:
-                    f.write(json_data)
-            else:
-                raise RuntimeWarning(f"Can't dump in unknown format {HWS_DUMP_FORMAT}")
-        elif order["action"] == SERV_ORDER_TICK:
-            ticks.append(len(hardware_load))
-            print(f"[NVML SERVER] Recorded tick at {ticks[-1]}")
+            self.flusher = StreamFlusher(writer, self.samples)
+            print(f"[NVML SERVER] Streaming samples to {writer.filename}")
+        self._sampling = asyncio.ensure_future(
+            psu_utlz_read(
+                self.samples,
+                self.scheduler,
+                self.providers,
+                self.device_count,
+                self.flusher,
+                self.stats,
+            )
+        )
+        print(f"[NVML SERVER] Recording every {self.scheduler.period_s} seconds")
+        return dict(dt=self.scheduler.period_s)
+
+    async def stop(self) -> Dict[str, Any]:
+        print("[NVML SERVER] Closing...")
+        if self._sampling is not None:
+            self._sampling.cancel()
+            self._sampling = None
+        try:
+            if self.flusher:
+                await self.flusher.close(self.missed_deadlines)
+        finally:
+            if self._stopped is not None:
+                self._stopped.set()
+        return dict(samples=self.samples.appended)
+
+    async def dump(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        if self.flusher:
+            # Already on disk up to the last chunk: append the rest
+            await self.flusher.flush(self.missed_deadlines)
+            filename = self.flusher.writer.filename
         else:
-            print(f"[NVML SERVER] Received unknown {order}")
+            filename = dump_samples(
+                self.samples,
+                order.get("dump_name", HWS_DUMP_NAME),
+                self.host,
+                self.devices,
+                missed_deadlines=self.missed_deadlines,
+                ticks=self.ticks,
+            )
+        print(
+            f"[NVML SERVER] Dumped {len(self.samples)} samples in {filename} "
+            f"({self.missed_deadlines} missed deadlines)"
+        )
+        return dict(filename=filename, samples=len(self.samples))
+
+    def tick(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        self.ticks.append(
+            (
+                order.get("timestamp", time.monotonic()),
+                order.get("name", HWS_TICK_DEFAULT),
+                order.get("rank", 0),
+            )
+        )
+        if self.flusher:
+            self.flusher.ticks.append(self.ticks[-1])
+        return dict(ticks=len(self.ticks))
+
+    def status(self) -> Dict[str, Any]:
+        return dict(
+            host=self.host,
+            devices=self.devices,
+            sensors=[str(provider) for provider in self.providers],
+            recording=self._sampling is not None,
+            dt=self.scheduler.period_s if self.scheduler else None,
+            samples=len(self.samples),
+            dropped=self.samples.dropped,
+            missed_deadlines=self.missed_deadlines,
+            ticks=len(self.ticks),
+            clients=len(self._clients),
+            stream=self.flusher.writer.filename if self.flusher else None,
+        )
+
+    def query(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        """Latest `count` samples, restricted to `fields` if given"""
+        count = max(int(order.get("count", 1)), 0)
+        fields = order.get("fields") or list(self.samples.dtype.names)
+        unknown = set(fields) - set(self.samples.dtype.names)
+        if unknown:
+            raise ValueError(f"Unknown fields {sorted(unknown)}")
+        records = self.samples.since(self.samples.appended - count)
+        return {field: records[field].tolist() for field in fields}
+
+    def rolling_stats(self) -> Dict[str, Any]:
+        if self.stats is None:
+            raise RuntimeError("Not recording")
+        return self.stats.summary(HWS_IDLE_UTILIZATION_PCT)
+
+    def prometheus_metrics(self) -> str:
+        if self.stats is None:
+            return ""
+        return prometheus_text(self.rolling_stats(), self.host)
+
+    async def handle(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        """Process one order, returns the content of the reply"""
+        action = order.get("action")
+        if action == SERV_ORDER_START:
+            return await self.start(order)
+        elif action == SERV_ORDER_STOP:
+            return await self.stop()
+        elif action == SERV_ORDER_DUMP:
+            return await self.dump(order)
+        elif action == SERV_ORDER_TICK:
+            return self.tick(order)
+        elif action == SERV_ORDER_STATUS:
+            return self.status()
+        elif action == SERV_ORDER_QUERY:
+            return self.query(order)
+        elif action == SERV_ORDER_STATS:
+            return self.rolling_stats()
+        raise ValueError(f"Unknown order {order}")
+
+    async def serve_client(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Process the orders of a client until it disconnects"""
+        self._clients.add(writer)
+        try:
+            while True:
+                order = await read_message(reader)
+                if order is None:
+                    break
+                try:
+                    reply = dict(ok=True, **(await self.handle(order)))
+                except Exception as e:
+                    print(f"[NVML SERVER] Refused {order}: {e}")
+                    reply = dict(ok=False, error=f"{type(e).__name__}: {e}")
+                if order.get("ack", True):
+                    await write_message(writer, reply)
+        except (ConnectionError, ProtocolError) as e:
+            print(f"[NVML SERVER] Dropped client: {e}")
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def serve(
+        self,
+        socket_filename: str = SOCKET_FILENAME,
+        http_port: Optional[int] = HWS_HTTP_PORT,
+    ) -> None:
+        """Serve clients on `socket_filename` until a STOP order. If an
+        `http_port` is given, statistics are also served over HTTP on localhost
+        (/status & /stats as JSON, /metrics for Prometheus)."""
+        self._stopped = asyncio.Event()
+        os.makedirs(os.path.dirname(socket_filename) or ".", exist_ok=True)
+        if os.path.exists(socket_filename):
+            os.remove(socket_filename)
+        server = await asyncio.start_unix_server(self.serve_client, socket_filename)
+        print("NVML server up & waiting for connection")
+        http_server = None
+        if http_port is not None:
+            http_server = await serve_http(
+                http_port,
+                {
+                    "/status": json_page(self.status),
+                    "/stats": json_page(
+                        lambda: self.rolling_stats() if self.stats else {}
+                    ),
+                    "/metrics": lambda: ("text/plain", self.prometheus_metrics()),
+                },
+            )
+            print(f"[NVML SERVER] Statistics on http://127.0.0.1:{http_port}/stats")
+        await self._stopped.wait()
+        if http_server is not None:
+            http_server.close()
+        server.close()
+        # Persistent clients (e.g. ticking ranks) are disconnected
+        for writer in list(self._clients):
+            writer.close()
+        await server.wait_closed()
+        if os.path.exists(socket_filename):
+            os.remove(socket_filename)
+
 
-        # One-time client
-        client.close()
-    # psu_read_task.cancel()
-    server.close()
+async def main(providers: Optional[List[SensorProvider]] = None):
+    providers, devices = open_providers(providers)
+    server = SamplerServer(providers, devices)
+    print(
+        f"[NVML SERVER] {server.host} sensors: "
+        f"{', '.join(str(p) for p in providers)}, GPUs: {devices}"
+    )
+    try:
+        await server.serve()
+    finally:
+        for provider in providers:
+            provider.close()
 
 
 def cli():
@@ -0,0 +1,154 @@
+import json
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+# Key of our metadata: the node (host, devices...) on the stream schema, the
+# ticks & missed deadlines on each chunk
+_METADATA_KEY = b"hws"
+
+
+def arrow_schema(dtype: np.dtype, metadata: Dict[str, Any]) -> pa.Schema:
+    """Arrow schema of samples of structured `dtype` (see `sample_dtype`).
+    Per-device sensors are fixed size lists, one value per device."""
+    fields = []
+    for name in dtype.names:
+        arrow_type = pa.from_numpy_dtype(dtype[name].base)
+        if dtype[name].shape != ():
+            arrow_type = pa.list_(arrow_type, int(np.prod(dtype[name].shape)))
+        fields.append(pa.field(name, arrow_type, nullable=False))
+    return pa.schema(fields, metadata={_METADATA_KEY: json.dumps(metadata)})
+
+
+def _record_batch(records: np.ndarray, schema: pa.Schema) -> pa.RecordBatch:
+    arrays = []
+    for field in schema:
+        column = np.ascontiguousarray(records[field.name])
+        if pa.types.is_fixed_size_list(field.type):
+            arrays.append(
+                pa.FixedSizeListArray.from_arrays(
+                    column.reshape(-1), field.type.list_size
+                )
+            )
+        else:
+            arrays.append(pa.array(column, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class StreamDumpWriter:
+    """Append-only dump of samples as an Arrow IPC stream (`.arrows`).
+
+    Each `write` appends one self-contained chunk (record batch) to the file:
+    a run killed mid-way keeps all the chunks written before. Node information
+    (host, devices, wall clock origin) is written once, in the stream header.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        dtype: np.dtype,
+        metadata: Dict[str, Any],
+    ) -> None:
+        self.filename = filename
+        self.schema = arrow_schema(np.dtype(dtype), metadata)
+        self.samples = 0
+        self.chunks = 0
+        self._sink = pa.OSFile(filename, "wb")
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def write(
+        self,
+        records: np.ndarray,
+        ticks: Sequence[Tuple[float, str, int]] = (),
+        missed_deadlines: int = 0,
+    ) -> None:
+        """Append a chunk of samples with the ticks recorded since the last one"""
+        chunk_metadata = {
+            "tick_timestamps": [float(timestamp) for timestamp, _, _ in ticks],
+            "tick_names": [name for _, name, _ in ticks],
+            "tick_ranks": [int(rank) for _, _, rank in ticks],
+            "missed_deadlines": int(missed_deadlines),
+        }
+        self._writer.write_batch(
+            _record_batch(records, self.schema),
+            custom_metadata={_METADATA_KEY: json.dumps(chunk_metadata)},
+        )
+        self._sink.flush()
+        self.samples += len(records)
+        self.chunks += 1
+
+    def close(self) -> None:
+        self._writer.close()
+        self._sink.close()
+
+
+def iter_stream_dump(
+    filename: str,
+) -> Iterator[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+    """Chunks of a stream dump as (columns, chunk metadata), oldest first.
+
+    The file is memory-mapped: the columns of each chunk are read-only views
+    on it, nothing is copied. A chunk truncated by a killed run ends the
+    iteration.
+    """
+    reader = pa.ipc.open_stream(pa.memory_map(filename))
+    while True:
+        try:
+            batch, custom_metadata = reader.read_next_batch_with_custom_metadata()
+        except StopIteration:
+            return
+        except (pa.ArrowInvalid, OSError):
+            # Last chunk was being written
+            return
+        columns = {}
+        for field, array in zip(batch.schema, batch.columns):
+            if pa.types.is_fixed_size_list(field.type):
+                columns[field.name] = (
+                    array.flatten().to_numpy().reshape(len(array), field.type.list_size)
+                )
+            else:
+                columns[field.name] = array.to_numpy()
+        yield columns, json.loads(custom_metadata[_METADATA_KEY])
+
+
+def load_stream_dump(filename: str) -> Dict[str, np.ndarray]:
+    """Stream dump as the arrays of a `.npz` dump (see `dump_samples`).
+
+    Columns of a single chunk dump are views on the memory-mapped file, those
+    of several chunks are concatenated in memory: iterate over the chunks with
+    `iter_stream_dump` to avoid the copy.
+    """
+    schema = pa.ipc.open_stream(pa.memory_map(filename)).schema
+    node = json.loads(schema.metadata[_METADATA_KEY])
+    chunks: List[Dict[str, np.ndarray]] = []
+    tick_timestamps: List[float] = []
+    tick_names: List[str] = []
+    tick_ranks: List[int] = []
+    missed_deadlines = 0
+    for columns, chunk_metadata in iter_stream_dump(filename):
+        chunks.append(columns)
+        tick_timestamps += chunk_metadata["tick_timestamps"]
+        tick_names += chunk_metadata["tick_names"]
+        tick_ranks += chunk_metadata["tick_ranks"]
+        missed_deadlines = chunk_metadata["missed_deadlines"]
+
+    data: Dict[str, np.ndarray] = {}
+    for field in schema:
+        if len(chunks) == 1:
+            data[field.name] = chunks[0][field.name]
+        elif len(chunks) > 1:
+            data[field.name] = np.concatenate([c[field.name] for c in chunks])
+        elif pa.types.is_fixed_size_list(field.type):
+            data[field.name] = np.empty(
+                (0, field.type.list_size), dtype=field.type.value_type.to_pandas_dtype()
+            )
+        else:
+            data[field.name] = np.empty(0, dtype=field.type.to_pandas_dtype())
+    for key, value in node.items():
+        data[key] = np.array(value)
+    data["missed_deadlines"] = np.array(missed_deadlines)
+    data["tick_timestamps"] = np.array(tick_timestamps, dtype=np.float64)
+    data["tick_names"] = np.array(tick_names, dtype=str)
+    data["tick_ranks"] = np.array(tick_ranks, dtype=np.int64)
+    return data
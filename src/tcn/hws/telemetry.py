@@ -0,0 +1,199 @@
+import asyncio
+import json
+import math
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tcn.hws.sample_buffer import CPU_FIELDS, GPU_FIELDS
+
+# Node level series: GPU power & memory are summed over the devices,
+# utilizations are averaged
+_SUMMED = ["gpu_psu", "gpu_mem"]
+
+
+class RollingWindow:
+    """Mean & max of the last `size` values of a series.
+
+    Each value is pushed in O(1): the sum is updated with the value entering and
+    the value leaving the window, the max is kept in a monotonic deque (amortized
+    O(1)). NaN (missing sensor) are ignored.
+    """
+
+    def __init__(self, size: int) -> None:
+        if size < 1:
+            raise ValueError(f"Window size must be positive, got {size}")
+        self.size = size
+        self._values = np.zeros(size, dtype=np.float64)
+        self._pushed = 0
+        self._sum = 0.0
+        # (push index, value) of the candidate maxima, values decreasing
+        self._maxima: Deque[Tuple[int, float]] = deque()
+
+    def __len__(self) -> int:
+        return min(self._pushed, self.size)
+
+    def push(self, value: float) -> None:
+        if math.isnan(value):
+            return
+        slot = self._pushed % self.size
+        if self._pushed >= self.size:
+            self._sum -= self._values[slot]
+        self._values[slot] = value
+        self._sum += value
+        if slot == self.size - 1:
+            # Resync once per window: rounding errors don't accumulate
+            self._sum = float(self._values.sum())
+        while self._maxima and self._maxima[-1][1] <= value:
+            self._maxima.pop()
+        self._maxima.append((self._pushed, value))
+        if self._maxima[0][0] <= self._pushed - self.size:
+            self._maxima.popleft()
+        self._pushed += 1
+
+    @property
+    def mean(self) -> float:
+        return self._sum / len(self) if len(self) > 0 else float("nan")
+
+    @property
+    def max(self) -> float:
+        return self._maxima[0][1] if self._maxima else float("nan")
+
+
+class RollingStats:
+    """Live statistics of the node over the last `window` samples, plus the
+    VRAM high-water mark of each device over the whole run"""
+
+    def __init__(self, window: int, period_s: float, device_count: int = 1) -> None:
+        self.window = window
+        self.period_s = period_s
+        self.series = {
+            field: RollingWindow(window) for field in GPU_FIELDS + CPU_FIELDS
+        }
+        self.vram_high_water_mb = np.full(device_count, np.nan)
+        self.samples = 0
+        self.last_timestamp = float("nan")
+
+    def update(self, sample: Sequence[Any]) -> None:
+        """Add a sample in the order of `sample_dtype` (see `assemble_sample`)"""
+        timestamp, *values = sample
+        for field, value in zip(GPU_FIELDS + CPU_FIELDS, values):
+            value = np.asarray(value, dtype=np.float64)
+            if value.ndim == 0:
+                self.series[field].push(float(value))
+            elif not np.isnan(value).all():
+                node_value = np.nansum(value) if field in _SUMMED else np.nanmean(value)
+                self.series[field].push(float(node_value))
+            if field == "gpu_mem":
+                self.vram_high_water_mb = np.fmax(self.vram_high_water_mb, value)
+        self.samples += 1
+        self.last_timestamp = float(timestamp)
+
+    def gpu_idle(self, utilization_pct: float) -> bool:
+        """GPUs were not used over a whole window (e.g. a stalled run)"""
+        utilization = self.series["gpu_exe_utl"]
+        return len(utilization) == self.window and utilization.max <= utilization_pct
+
+    def summary(self, idle_utilization_pct: float = 1.0) -> Dict[str, Any]:
+        """JSON-able statistics, NaN (no data) as None"""
+
+        def _value(value: float) -> Optional[float]:
+            return None if math.isnan(value) else value
+
+        return dict(
+            window_s=self.window * self.period_s,
+            window_samples=len(self.series["cpu_psu"]),
+            samples=self.samples,
+            last_timestamp=_value(self.last_timestamp),
+            mean={f: _value(s.mean) for f, s in self.series.items()},
+            max={f: _value(s.max) for f, s in self.series.items()},
+            vram_high_water_mb=[_value(v) for v in self.vram_high_water_mb.tolist()],
+            gpu_idle=self.gpu_idle(idle_utilization_pct),
+        )
+
+
+# Prometheus metrics: field -> (name, help)
+_PROMETHEUS_METRICS = {
+    "gpu_psu": ("hws_gpu_power_watts", "GPU power of the node"),
+    "gpu_exe_utl": ("hws_gpu_utilization_percent", "GPU utilization"),
+    "gpu_mem_utl": ("hws_gpu_memory_utilization_percent", "GPU memory bandwidth"),
+    "gpu_mem": ("hws_gpu_memory_mb", "GPU memory used on the node"),
+    "cpu_exe_utl": ("hws_cpu_utilization_percent", "CPU utilization"),
+    "cpu_psu": ("hws_cpu_power_watts", "CPU power"),
+}
+
+
+def prometheus_text(summary: Dict[str, Any], host: str) -> str:
+    """Statistics of `RollingStats.summary` in the Prometheus text format"""
+    lines = []
+    for field, (name, help) in _PROMETHEUS_METRICS.items():
+        lines += [
+            f"# HELP {name} {help}, over the rolling window",
+            f"# TYPE {name} gauge",
+        ]
+        for stat in ["mean", "max"]:
+            if summary[stat][field] is not None:
+                lines.append(
+                    f'{name}{{host="{host}",stat="{stat}"}} {summary[stat][field]}'
+                )
+    lines += [
+        "# HELP hws_gpu_memory_high_water_mb Maximum GPU memory used",
+        "# TYPE hws_gpu_memory_high_water_mb gauge",
+    ]
+    for device, value in enumerate(summary["vram_high_water_mb"]):
+        if value is not None:
+            lines.append(
+                f'hws_gpu_memory_high_water_mb{{host="{host}",device="{device}"}} '
+                f"{value}"
+            )
+    lines += [
+        "# HELP hws_gpu_idle GPUs unused over the whole rolling window",
+        "# TYPE hws_gpu_idle gauge",
+        f'hws_gpu_idle{{host="{host}"}} {int(summary["gpu_idle"])}',
+        "# HELP hws_samples_total Samples recorded",
+        "# TYPE hws_samples_total counter",
+        f'hws_samples_total{{host="{host}"}} {summary["samples"]}',
+    ]
+    return "\n".join(lines) + "\n"
+
+
+async def serve_http(
+    port: int,
+    pages: Dict[str, Callable[[], Tuple[str, str]]],
+    host: str = "127.0.0.1",
+) -> asyncio.AbstractServer:
+    """Minimal read-only HTTP server: GET of a path in `pages` returns the
+    (content type, body) of its callable, anything else a 404"""
+
+    async def _respond(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin1").split()
+            # Headers are ignored
+            while (await reader.readline()) not in [b"\r\n", b"\n", b""]:
+                pass
+            path = request_line[1].split("?")[0] if len(request_line) > 1 else ""
+            if request_line[:1] != ["GET"] or path not in pages:
+                status, content_type, body = "404 Not Found", "text/plain", "\n"
+            else:
+                status = "200 OK"
+                content_type, body = pages[path]()
+            payload = body.encode("utf8")
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode(
+                    "latin1"
+                )
+                + payload
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(_respond, host, port)
+
+
+def json_page(get: Callable[[], Dict[str, Any]]) -> Callable[[], Tuple[str, str]]:
+    return lambda: ("application/json", json.dumps(get()))
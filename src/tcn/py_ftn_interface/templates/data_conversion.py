@@ -1,8 +1,10 @@
 # type: ignore
 
+import collections
+import dataclasses
 from math import prod
 from types import ModuleType
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import cffi
 import numpy as np
@@ -20,57 +22,377 @@ if cp is not None:
         cp = None
 
 DeviceArray = cp.ndarray if cp else None
+
+# `ndarray.get(blocking=False)` (asynchronous download) requires cupy >= 13,
+# older versions download synchronously on the stream
+_ASYNC_GET = cp is None or int(cp.__version__.split(".")[0]) >= 13
 PythonArray: TypeAlias = np.ndarray
 
+# C type of the Fortran data -> NumPy dtype
+# Fortran `logical(c_bool)` is `_Bool`, default `logical` is 4 bytes: use `int`
+_TYPEMAP = {
+    "float": np.float32,
+    "double": np.float64,
+    "int": np.int32,
+    "int32_t": np.int32,
+    "long": np.int64,
+    "long long": np.int64,
+    "int64_t": np.int64,
+    "_Bool": np.bool_,
+    "float _Complex": np.complex64,
+    "double _Complex": np.complex128,
+    # cffi >= 1.17 names of the complex types
+    "_cffi_float_complex_t": np.complex64,
+    "_cffi_double_complex_t": np.complex128,
+}
+
+
+# Fields packed in a staging buffer start on this boundary (bytes)
+_STAGING_ALIGNMENT = 256
+
+
+@dataclasses.dataclass(frozen=True)
+class TransferPlan:
+    """Layout of a Fortran argument & its Python counterpart, validated once
+    per signature (C type, dimensions, swapped axes)"""
+
+    ctype: str
+    dtype: np.dtype
+    dim: Tuple[int, ...]  # Fortran dimensions
+    swap_axes: Optional[Tuple[int, int]] = None
+
+    @property
+    def count(self) -> int:
+        return prod(self.dim)
+
+    @property
+    def nbytes(self) -> int:
+        return self.count * self.dtype.itemsize
+
+    @property
+    def python_shape(self) -> Tuple[int, ...]:
+        shape = list(self.dim)
+        if self.swap_axes:
+            a, b = self.swap_axes
+            shape[a], shape[b] = shape[b], shape[a]
+        return tuple(shape)
+
+
+def _staging_layout(plans: Sequence[TransferPlan]) -> Tuple[List[int], int]:
+    """Offsets of the fields packed in a staging buffer & its size (bytes)"""
+    offsets, nbytes = [], 0
+    for plan in plans:
+        offsets.append(nbytes)
+        nbytes += -(-plan.nbytes // _STAGING_ALIGNMENT) * _STAGING_ALIGNMENT
+    return offsets, nbytes
+
+
+def _field_bytes(buffer: Any, offset: int, plan: TransferPlan) -> Any:
+    """Bytes of the field packed at `offset` of a staging buffer"""
+    return buffer[offset : offset + plan.nbytes]  # noqa: E203
+
+
+def _get_async(device_array: Any, stream: Any, out: np.ndarray) -> None:
+    """Download `device_array` to the host buffer `out` on `stream`, without
+    waiting for the copy when cupy supports it"""
+    if _ASYNC_GET:
+        device_array.get(stream=stream, out=out, blocking=False)
+    else:
+        device_array.get(stream=stream, out=out)
+
+
+# Staging buffers are allocated by size class: powers of 2 from this size
+_STAGING_MIN_BUCKET_BYTES = 4096
+# Pinned host memory kept for reuse, the least recently used is freed beyond
+_STAGING_MAX_CACHED_BYTES = 256 * 1024 * 1024
+
+
+class PinnedStagingPool:
+    """Pinned (page-locked) host buffers, reused between transfers.
+
+    Buffers are allocated by size class (powers of 2), so a buffer serves any
+    transfer of its bucket. A buffer released with the event of its pending
+    asynchronous copy is only handed out again once the event completed. Free
+    buffers beyond `max_cached_bytes` are freed, least recently used first.
+
+    `cuda` is the CUDA runtime module (`cupy.cuda`), or anything exposing
+    `alloc_pinned_memory` and events with `done` & `synchronize`.
+    """
+
+    def __init__(
+        self,
+        cuda: Optional[ModuleType] = None,
+        max_cached_bytes: int = _STAGING_MAX_CACHED_BYTES,
+        min_bucket_bytes: int = _STAGING_MIN_BUCKET_BYTES,
+    ):
+        self._cuda = cuda if cuda is not None else cp.cuda
+        self.max_cached_bytes = max_cached_bytes
+        self.min_bucket_bytes = min_bucket_bytes
+        # Released buffers, least recently used first: id -> (buffer, event)
+        self._free: "collections.OrderedDict[int, Tuple[np.ndarray, Any]]" = (
+            collections.OrderedDict()
+        )
+        self.cached_bytes = 0
+        self.allocated_bytes = 0
+
+    def bucket(self, nbytes: int) -> int:
+        """Size class of a transfer of `nbytes`"""
+        return max(self.min_bucket_bytes, 1 << max(nbytes - 1, 0).bit_length())
+
+    def acquire(self, nbytes: int) -> np.ndarray:
+        """Pinned buffer of at least `nbytes` (uint8), not used by any copy"""
+        size = self.bucket(nbytes)
+        for key, (buffer, event) in self._free.items():
+            if buffer.nbytes == size and (event is None or event.done):
+                del self._free[key]
+                self.cached_bytes -= size
+                return buffer
+        memory = self._cuda.alloc_pinned_memory(size)
+        self.allocated_bytes += size
+        return np.frombuffer(memory, dtype=np.uint8, count=size)
+
+    def release(self, buffer: np.ndarray, event: Any = None) -> None:
+        """Give back a buffer, still read or written until `event` completes"""
+        self._free[id(buffer)] = (buffer, event)
+        self.cached_bytes += buffer.nbytes
+        while self.cached_bytes > self.max_cached_bytes:
+            _, (evicted, pending) = self._free.popitem(last=False)
+            if pending is not None:
+                # Can't free memory a copy still uses
+                pending.synchronize()
+            self.cached_bytes -= evicted.nbytes
+            self.allocated_bytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        """Free all cached buffers"""
+        while self._free:
+            _, (buffer, event) = self._free.popitem(last=False)
+            if event is not None:
+                event.synchronize()
+            self.allocated_bytes -= buffer.nbytes
+        self.cached_bytes = 0
+
+
+# Device memory kept by the resident buffers of a converter
+_DEVICE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+@dataclasses.dataclass
+class ResidentBuffer:
+    """Device copy of a Fortran array, in Python layout"""
+
+    fptr: "cffi.FFI.CData"
+    plan: TransferPlan
+    array: Any
+    # Written by Python, the Fortran memory is stale
+    dirty: bool = False
+
+
+class DeviceBufferCache:
+    """Device copies of Fortran arrays kept across calls, with a memory cap.
+
+    Buffers are keyed by Fortran address and plan (dimensions, dtype, swapped
+    axes). Beyond `max_bytes` the least recently used are evicted: `put`
+    returns them, dirty ones must then be copied back to Fortran.
+    """
+
+    def __init__(self, max_bytes: int = _DEVICE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # (address, plan) -> buffer, least recently used first
+        self._buffers: Dict[Tuple[int, TransferPlan], ResidentBuffer] = (
+            collections.OrderedDict()
+        )
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def get(self, address: int, plan: TransferPlan) -> Optional[ResidentBuffer]:
+        buffer = self._buffers.get((address, plan))
+        if buffer is not None:
+            self._buffers.move_to_end((address, plan))
+        return buffer
+
+    def put(self, address: int, buffer: ResidentBuffer) -> List[ResidentBuffer]:
+        """Keep `buffer`, returns the buffers evicted to make room"""
+        evicted = self.pop(address, buffer.plan)
+        if buffer.plan.nbytes > self.max_bytes:
+            return evicted + [buffer]
+        self._buffers[(address, buffer.plan)] = buffer
+        self.nbytes += buffer.plan.nbytes
+        while self.nbytes > self.max_bytes:
+            _, oldest = self._buffers.popitem(last=False)
+            self.nbytes -= oldest.plan.nbytes
+            evicted.append(oldest)
+        return evicted
+
+    def pop(
+        self,
+        address: Optional[int] = None,
+        plan: Optional[TransferPlan] = None,
+    ) -> List[ResidentBuffer]:
+        """Remove the buffers of `address` (of any plan by default), or all"""
+        keys = [
+            key
+            for key in self._buffers
+            if (address is None or key[0] == address)
+            and (plan is None or key[1] == plan)
+        ]
+        buffers = [self._buffers.pop(key) for key in keys]
+        self.nbytes -= sum(buffer.plan.nbytes for buffer in buffers)
+        return buffers
+
+    def dirty(self, address: Optional[int] = None) -> List[ResidentBuffer]:
+        """Buffers of `address`, or all, written by Python"""
+        return [
+            buffer
+            for (key_address, _), buffer in self._buffers.items()
+            if buffer.dirty and (address is None or key_address == address)
+        ]
+
 
 class FortranPythonConversion:
     """
     Convert Fortran arrays to NumPy and vice-versa.
 
-    WARNING: This class DOES NOT type cast
+    On CPU, Fortran arrays are given to Python as Fortran-ordered views of the
+    Fortran memory (zero-copy): results written in place are already in Fortran
+    and are not copied back. Copies are only made when the dtype or the layout
+    differ.
+
+    On GPU (`target_numpy_module` is `cupy`, or any device module with a `cuda`
+    runtime) transfers go through pinned staging buffers, asynchronously on two
+    alternating streams. CUDA events order them with the work of the caller's
+    stream. With `double_buffering`, batches are moved field by field, so the
+    host copy or the layout kernel of a field overlaps the transfer of the
+    previous one. Otherwise a batch moves in a single transfer, better for many
+    small fields.
+
+    On GPU, `resident` transfers keep device copies across calls (up to
+    `device_cache_bytes`). A resident input that is already on device is not
+    uploaded again. A resident output stays on device until `flush`, which
+    must be called before Fortran reads it. Changes to the Fortran memory
+    aren't detected: `invalidate` the fields Fortran writes. Python must not
+    modify resident inputs without giving them back as resident outputs.
+
+    WARNING: Arrays given back to Fortran are cast to the Fortran type like
+    NumPy `unsafe` casting (e.g. float to int truncates). With `strict`, only
+    casts within the same kind (e.g. double to float) are allowed.
     """
 
-    def __init__(self, target_numpy_module: ModuleType):
+    def __init__(
+        self,
+        target_numpy_module: ModuleType,
+        double_buffering: bool = False,
+        staging_pool: Optional[PinnedStagingPool] = None,
+        device_cache_bytes: int = _DEVICE_CACHE_MAX_BYTES,
+        strict: bool = False,
+    ):
         # Python numpy-like module is given by the caller leaving
         # optional control of upload/download in the case
         # of GPU/CPU system
         self._target_np = target_numpy_module
 
         # Device parameters
-        self._python_targets_gpu = self._target_np == cp
+        self._python_targets_gpu = target_numpy_module is not np and hasattr(
+            target_numpy_module, "cuda"
+        )
+        self._double_buffering = double_buffering
+        self._strict = strict
         if self._python_targets_gpu:
-            self._stream_A = cp.cuda.Stream(non_blocking=True)
-            self._stream_B = cp.cuda.Stream(non_blocking=True)
+            self._cuda = target_numpy_module.cuda
+            self._stream_A = self._cuda.Stream(non_blocking=True)
+            self._stream_B = self._cuda.Stream(non_blocking=True)
             self._current_stream = self._stream_A
+            self._staging_pool = staging_pool or PinnedStagingPool(self._cuda)
+        self._resident = DeviceBufferCache(device_cache_bytes)
 
         # cffi init
         self._ffi = cffi.FFI()
-        self._TYPEMAP = {
-            "float": np.float32,
-            "double": np.float64,
-            "int": np.int32,
-        }
+        self._TYPEMAP = _TYPEMAP
+        # Plans by (cffi type, dimensions, swapped axes)
+        self._plans: Dict[Tuple[Any, ...], TransferPlan] = {}
 
     def sync(self):
         """Synchronize the working CUDA streams"""
         self._stream_A.synchronize()
         self._stream_B.synchronize()
 
+    def transfer_plan(
+        self,
+        fptr: "cffi.FFI.CData",
+        dim: List[int],
+        swap_axes: Optional[Tuple[int, int]] = None,
+    ) -> TransferPlan:
+        """Plan of the transfers of `fptr`, cached per signature.
+
+        Callers transferring the same argument at every call can keep the plan
+        and give it to `fortran_to_python`/`python_to_fortran` to skip the
+        type introspection altogether.
+        """
+        ctype = self._ffi.typeof(fptr)
+        key = (ctype, tuple(dim), tuple(swap_axes) if swap_axes else None)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._make_plan(ctype, dim, swap_axes)
+            self._plans[key] = plan
+        return plan
+
+    def _make_plan(
+        self,
+        ctype: "cffi.FFI.CType",
+        dim: List[int],
+        swap_axes: Optional[Tuple[int, int]] = None,
+    ) -> TransferPlan:
+        if ctype.kind not in ["pointer", "array"]:
+            raise TypeError(f"Expected a pointer to Fortran data, got {ctype.cname}")
+        ftype = self._ffi.getctype(ctype.item)
+        if ftype not in self._TYPEMAP:
+            raise TypeError(f"Fortran data of C type {ftype} is not supported")
+        dtype = np.dtype(self._TYPEMAP[ftype])
+        # Byte counts derive from the C type: both sizes must agree
+        if dtype.itemsize != self._ffi.sizeof(ctype.item):
+            raise TypeError(
+                f"C type {ftype} is {self._ffi.sizeof(ctype.item)} bytes "
+                f"but {dtype} is {dtype.itemsize} bytes"
+            )
+        if any(extent < 0 for extent in dim):
+            raise ValueError(f"Negative dimension in {dim}")
+        if swap_axes and not all(0 <= axis < len(dim) for axis in swap_axes):
+            raise ValueError(f"Can't swap axes {swap_axes} of {len(dim)}D data")
+        return TransferPlan(
+            ftype,
+            dtype,
+            tuple(dim),
+            tuple(swap_axes) if swap_axes else None,
+        )
+
     def fortran_to_python(
         self,
         fptr: np.ndarray,
         dim: List[int],
         swap_axes: Optional[Tuple[int, int]] = None,
+        plan: Optional[TransferPlan] = None,
+        resident: bool = False,
     ) -> PythonArray:
-        """Move fortran memory into python space"""
-        np_array = self._fortran_pointer_to_numpy_buffer(fptr, dim)
-        if self._python_targets_gpu:
-            return self._upload_and_transform(np_array, dim, swap_axes)
+        """Move fortran memory into python space.
+
+        On CPU the array is a view of the Fortran memory: writing to it writes
+        to Fortran directly. On GPU a `resident` array is only uploaded if it
+        isn't already on device.
+        """
+        if plan is None:
+            plan = self.transfer_plan(fptr, dim, swap_axes)
+        if self._python_targets_gpu and resident:
+            return self._upload_resident([fptr], [plan])[0]
+        elif self._python_targets_gpu:
+            self._sync_resident([fptr], written=False)
+            return self._upload_fields([fptr], [plan])[0]
         else:
             return self._transform_from_fortran_layout(
-                np_array,
-                dim,
-                swap_axes,
+                self._fortran_pointer_to_numpy_buffer(fptr, plan),
+                plan.dim,
+                plan.swap_axes,
             )
 
     def python_to_fortran(
@@ -79,57 +401,403 @@ class FortranPythonConversion:
         fptr: "cffi.FFI.CData",
         ptr_offset: int = 0,
         swap_axes: Optional[Tuple[int, int]] = None,
-    ) -> np.ndarray:
-        """
-        Input: Fortran data pointed to by fptr and of shape dim = (i, j, k)
-        Output: C-ordered double precision NumPy data of shape (i, j, k)
+        plan: Optional[TransferPlan] = None,
+        resident: bool = False,
+    ) -> None:
+        """Copy `array` (Python layout) into the Fortran data pointed by `fptr`.
+
+        Values are cast to the Fortran type. With `strict` only within the
+        same kind (e.g. double to float), anything else raises a TypeError. On
+        GPU a
+        `resident` array stays on device until `flush`.
         """
-        ftype = self._ffi.getctype(self._ffi.typeof(fptr).item)
-        assert ftype in self._TYPEMAP
-        dtype = self._TYPEMAP[ftype]
+        plan = self._python_plan(array, fptr, swap_axes, plan)
+        if self._python_targets_gpu and resident:
+            self._keep_resident(fptr + ptr_offset, plan, array, dirty=True)
+            return
+        elif self._python_targets_gpu:
+            self._sync_resident([fptr + ptr_offset], written=True)
+            self._download_fields([array], [fptr + ptr_offset], [plan])
+            return
+        if self._is_fortran_view(array, fptr, ptr_offset, plan.dtype, plan.swap_axes):
+            # Python worked in place on the Fortran memory: nothing to copy
+            return
         numpy_array = self._transform_from_python_layout(
             array,
-            dtype,
-            swap_axes,
+            plan.dtype,
+            plan.swap_axes,
         )
-        self._ffi.memmove(fptr + ptr_offset, numpy_array, 4 * numpy_array.size)
+        self._ffi.memmove(fptr + ptr_offset, numpy_array, plan.nbytes)
 
-    def _fortran_pointer_to_numpy_buffer(
+    def fortran_to_python_batch(
         self,
-        fptr: "cffi.FFI.CData",
-        dim: List[int],
-    ) -> np.ndarray:
+        fields: Sequence[Tuple["cffi.FFI.CData", List[int], Optional[Tuple[int, int]]]],
+        resident: bool = False,
+    ) -> List[PythonArray]:
+        """Move several Fortran arrays, as (fptr, dim, swap_axes), into python
+        space at once.
+
+        On GPU the fields are packed in one pinned host buffer, uploaded with a
+        single transfer and unpacked as views of the device buffer: no kernel
+        is launched. With double buffering they are uploaded one by one
+        instead, packing a field while the previous one is in flight.
+        `resident` arrays already on device are not uploaded.
         """
-        Input: Fortran data pointed to by fptr and of shape dim = (i, j, k)
-        Output: C-ordered double precision NumPy data of shape (i, j, k)
+        plans = [self.transfer_plan(fptr, dim, swap) for fptr, dim, swap in fields]
+        if not self._python_targets_gpu:
+            return [
+                self.fortran_to_python(fptr, dim, plan=plan)
+                for (fptr, dim, _), plan in zip(fields, plans)
+            ]
+        fptrs = [fptr for fptr, _, _ in fields]
+        if resident:
+            return self._upload_resident(fptrs, plans)
+        self._sync_resident(fptrs, written=False)
+        if self._double_buffering:
+            return self._upload_fields(fptrs, plans)
+        return self._upload_packed(fptrs, plans)
+
+    def python_to_fortran_batch(
+        self,
+        fields: Sequence[
+            Tuple[PythonArray, "cffi.FFI.CData", Optional[Tuple[int, int]]]
+        ],
+        resident: bool = False,
+    ) -> None:
+        """Copy several arrays, as (array, fptr, swap_axes), back to Fortran
+        at once.
+
+        On GPU the fields are packed in Fortran layout in one device buffer,
+        downloaded with a single transfer into pinned host memory, then copied
+        to each Fortran array. With double buffering they are downloaded one
+        by one instead, the layout kernel of a field running while the
+        previous one is downloaded. `resident` arrays stay on device until
+        `flush`.
         """
-        ftype = self._ffi.getctype(self._ffi.typeof(fptr).item)
-        assert ftype in self._TYPEMAP
-        return np.frombuffer(  # noqa
-            buffer=self._ffi.buffer(fptr, prod(dim) * self._ffi.sizeof(ftype)),
-            dtype=self._TYPEMAP[ftype],
+        plans = [
+            self._python_plan(array, fptr, swap_axes)
+            for array, fptr, swap_axes in fields
+        ]
+        if not self._python_targets_gpu:
+            for (array, fptr, _), plan in zip(fields, plans):
+                self.python_to_fortran(array, fptr, plan=plan)
+            return
+        arrays = [array for array, _, _ in fields]
+        fptrs = [fptr for _, fptr, _ in fields]
+        if resident:
+            for array, fptr, plan in zip(arrays, fptrs, plans):
+                self._keep_resident(fptr, plan, array, dirty=True)
+        else:
+            self._sync_resident(fptrs, written=True)
+            self._download(arrays, fptrs, plans)
+
+    def flush(self, fptr: Optional["cffi.FFI.CData"] = None) -> None:
+        """Copy the resident outputs of `fptr`, or all, back to Fortran.
+        They stay resident."""
+        address = None if fptr is None else self._address(fptr)
+        self._flush_buffers(self._resident.dirty(address))
+
+    def invalidate(self, fptr: Optional["cffi.FFI.CData"] = None) -> None:
+        """Fortran changed the data of `fptr`, or of all arrays: drop their
+        device copies. Resident outputs not flushed are lost."""
+        address = None if fptr is None else self._address(fptr)
+        self._resident.pop(address)
+
+    def _sync_resident(self, fptrs: Sequence["cffi.FFI.CData"], written: bool) -> None:
+        """Keep resident copies coherent with a transfer that bypasses them:
+        flush them before Fortran is read, drop them when Fortran is written"""
+        if len(self._resident) == 0:
+            return
+        for fptr in fptrs:
+            if written:
+                self._resident.pop(self._address(fptr))
+            else:
+                self._flush_buffers(self._resident.dirty(self._address(fptr)))
+
+    def _address(self, fptr: "cffi.FFI.CData") -> int:
+        return int(self._ffi.cast("uintptr_t", fptr))
+
+    def _upload_resident(
+        self,
+        fptrs: Sequence["cffi.FFI.CData"],
+        plans: Sequence[TransferPlan],
+    ) -> List[DeviceArray]:
+        """Device copies of the fields, uploading those not resident yet.
+
+        Each field is uploaded in its own allocation, so that evicting it frees
+        its memory.
+        """
+        buffers = [
+            self._resident.get(self._address(fptr), plan)
+            for fptr, plan in zip(fptrs, plans)
+        ]
+        missing = [i for i, buffer in enumerate(buffers) if buffer is None]
+        # Outputs resident under another plan are read through Fortran
+        self._sync_resident([fptrs[i] for i in missing], written=False)
+        uploaded = self._upload_fields(
+            [fptrs[i] for i in missing], [plans[i] for i in missing]
         )
+        arrays = [buffer.array if buffer else None for buffer in buffers]
+        for i, array in zip(missing, uploaded):
+            self._keep_resident(fptrs[i], plans[i], array, dirty=False)
+            arrays[i] = array
+        return arrays
 
-    def _upload_and_transform(
+    def _keep_resident(
         self,
-        host_array: np.ndarray,
-        dim: List[int],
+        fptr: "cffi.FFI.CData",
+        plan: TransferPlan,
+        array: DeviceArray,
+        dirty: bool,
+    ) -> None:
+        address = self._address(fptr)
+        if dirty:
+            # Later uploads of the field return it in the Fortran type
+            array = array.astype(plan.dtype, copy=False)
+            # Copies under other plans are stale: their outputs are written
+            # back first, this one supersedes them once flushed
+            stale = self._resident.pop(address)
+            self._flush_buffers(
+                [buffer for buffer in stale if buffer.dirty and buffer.plan != plan]
+            )
+        evicted = self._resident.put(address, ResidentBuffer(fptr, plan, array, dirty))
+        self._flush_buffers([buffer for buffer in evicted if buffer.dirty])
+
+    def _flush_buffers(self, buffers: Sequence[ResidentBuffer]) -> None:
+        if buffers:
+            self._download(
+                [buffer.array for buffer in buffers],
+                [buffer.fptr for buffer in buffers],
+                [buffer.plan for buffer in buffers],
+            )
+        for buffer in buffers:
+            buffer.dirty = False
+
+    def _download(
+        self,
+        arrays: Sequence[DeviceArray],
+        fptrs: Sequence["cffi.FFI.CData"],
+        plans: Sequence[TransferPlan],
+    ) -> None:
+        if self._double_buffering:
+            self._download_fields(arrays, fptrs, plans)
+        else:
+            self._download_packed(arrays, fptrs, plans)
+
+    def _python_plan(
+        self,
+        array: PythonArray,
+        fptr: "cffi.FFI.CData",
         swap_axes: Optional[Tuple[int, int]] = None,
-    ) -> DeviceArray:
-        """Upload to device & transform to Pace compatible layout"""
-        with self._current_stream:
-            device_array = cp.asarray(host_array)
-            final_array = self._transform_from_fortran_layout(
-                device_array,
-                dim,
-                swap_axes,
+        plan: Optional[TransferPlan] = None,
+    ) -> TransferPlan:
+        """Plan to copy `array` back to Fortran, checking it matches"""
+        if plan is None:
+            dim = list(array.shape)
+            if swap_axes:
+                dim[swap_axes[0]], dim[swap_axes[1]] = (
+                    dim[swap_axes[1]],
+                    dim[swap_axes[0]],
+                )
+            plan = self.transfer_plan(fptr, dim, swap_axes)
+        elif tuple(array.shape) != plan.python_shape:
+            raise ValueError(
+                f"Array of shape {array.shape} doesn't match the planned "
+                f"{plan.python_shape}"
             )
-            self._current_stream = (
-                self._stream_A
-                if self._current_stream == self._stream_B
-                else self._stream_B
+        if self._strict and not np.can_cast(
+            array.dtype, plan.dtype, casting="same_kind"
+        ):
+            raise TypeError(
+                f"Can't convert {array.dtype} to Fortran {plan.ctype} in strict "
+                f"mode: cast the array, e.g. `array.astype(np.{plan.dtype.name})`"
             )
-            return final_array
+        return plan
+
+    def _switch_stream(self):
+        """Next transfer goes on the other stream"""
+        self._current_stream = (
+            self._stream_A if self._current_stream == self._stream_B else self._stream_B
+        )
+
+    def _record_event(self, stream: Any) -> Any:
+        event = self._cuda.Event(disable_timing=True)
+        event.record(stream)
+        return event
+
+    def _upload_fields(
+        self,
+        fptrs: Sequence["cffi.FFI.CData"],
+        plans: Sequence[TransferPlan],
+    ) -> List[DeviceArray]:
+        """Upload fields one by one, alternating streams & staging buffers.
+
+        The host copy of a field into its pinned buffer overlaps the upload of
+        the previous one. At most two uploads are in flight: a staging buffer
+        is reused once its upload completed.
+        """
+        caller_stream = self._cuda.get_current_stream()
+        arrays, in_flight = [], []
+        for fptr, plan in zip(fptrs, plans):
+            if len(in_flight) == 2:
+                in_flight.pop(0).synchronize()
+            staging = self._staging_pool.acquire(plan.nbytes)
+            staging[: plan.nbytes] = np.frombuffer(
+                self._ffi.buffer(fptr, plan.nbytes), dtype=np.uint8
+            )
+            stream = self._current_stream
+            with stream:
+                device_buffer = self._target_np.empty(plan.nbytes, dtype=np.uint8)
+                device_buffer.set(staging[: plan.nbytes], stream=stream)
+                uploaded = self._record_event(stream)
+            self._staging_pool.release(staging, uploaded)
+            in_flight.append(uploaded)
+            # The caller's work on the array waits for the upload, not the host
+            caller_stream.wait_event(uploaded)
+            arrays.append(
+                self._transform_from_fortran_layout(
+                    device_buffer.view(plan.dtype), plan.dim, plan.swap_axes
+                )
+            )
+            self._switch_stream()
+        return arrays
+
+    def _upload_packed(
+        self,
+        fptrs: Sequence["cffi.FFI.CData"],
+        plans: Sequence[TransferPlan],
+    ) -> List[DeviceArray]:
+        """Upload fields packed in a single staging buffer & transfer"""
+        offsets, nbytes = _staging_layout(plans)
+        staging = self._staging_pool.acquire(nbytes)
+        for fptr, plan, offset in zip(fptrs, plans, offsets):
+            _field_bytes(staging, offset, plan)[...] = np.frombuffer(
+                self._ffi.buffer(fptr, plan.nbytes), dtype=np.uint8
+            )
+        stream = self._current_stream
+        with stream:
+            device_buffer = self._target_np.empty(nbytes, dtype=np.uint8)
+            device_buffer.set(staging[:nbytes], stream=stream)
+            uploaded = self._record_event(stream)
+        self._staging_pool.release(staging, uploaded)
+        self._cuda.get_current_stream().wait_event(uploaded)
+        self._switch_stream()
+        return [
+            self._transform_from_fortran_layout(
+                _field_bytes(device_buffer, offset, plan).view(plan.dtype),
+                plan.dim,
+                plan.swap_axes,
+            )
+            for plan, offset in zip(plans, offsets)
+        ]
+
+    def _download_fields(
+        self,
+        arrays: Sequence[DeviceArray],
+        fptrs: Sequence["cffi.FFI.CData"],
+        plans: Sequence[TransferPlan],
+    ) -> None:
+        """Download fields one by one, alternating streams & staging buffers.
+
+        The layout kernel of a field runs while the previous field is
+        downloaded, and its copy to Fortran is done by the host meanwhile.
+        """
+        # Arrays were computed on the caller's stream
+        computed = self._record_event(self._cuda.get_current_stream())
+        pending = None
+        for array, fptr, plan in zip(arrays, fptrs, plans):
+            stream = self._current_stream
+            staging = self._staging_pool.acquire(plan.nbytes)
+            with stream:
+                stream.wait_event(computed)
+                device_array = self._transform_to_fortran_layout(
+                    array, plan.dtype, plan.swap_axes
+                )
+                _get_async(device_array.view(np.uint8), stream, staging[: plan.nbytes])
+                downloaded = self._record_event(stream)
+            if pending is not None:
+                self._copy_to_fortran(*pending)
+            pending = (fptr, plan, staging, downloaded, device_array)
+            self._switch_stream()
+        if pending is not None:
+            self._copy_to_fortran(*pending)
+
+    def _copy_to_fortran(
+        self,
+        fptr: "cffi.FFI.CData",
+        plan: TransferPlan,
+        staging: np.ndarray,
+        downloaded: Any,
+        device_array: DeviceArray,
+    ) -> None:
+        """Copy a downloaded field from its staging buffer to Fortran.
+
+        `device_array` is only kept alive until the download completed.
+        """
+        downloaded.synchronize()
+        self._ffi.memmove(fptr, staging[: plan.nbytes], plan.nbytes)
+        self._staging_pool.release(staging)
+
+    def _download_packed(
+        self,
+        arrays: Sequence[DeviceArray],
+        fptrs: Sequence["cffi.FFI.CData"],
+        plans: Sequence[TransferPlan],
+    ) -> None:
+        """Download fields packed in a single device buffer & transfer"""
+        offsets, nbytes = _staging_layout(plans)
+        staging = self._staging_pool.acquire(nbytes)
+        computed = self._record_event(self._cuda.get_current_stream())
+        stream = self._current_stream
+        with stream:
+            stream.wait_event(computed)
+            device_buffer = self._target_np.empty(nbytes, dtype=np.uint8)
+            for array, plan, offset in zip(arrays, plans, offsets):
+                packed = _field_bytes(device_buffer, offset, plan).view(plan.dtype)
+                # Fortran-ordered view of the packed field, in Python layout
+                packed = self._transform_from_fortran_layout(
+                    packed, plan.dim, plan.swap_axes
+                )
+                packed[...] = array
+            _get_async(device_buffer, stream, staging[:nbytes])
+            downloaded = self._record_event(stream)
+        self._switch_stream()
+        downloaded.synchronize()
+        for fptr, plan, offset in zip(fptrs, plans, offsets):
+            self._ffi.memmove(fptr, _field_bytes(staging, offset, plan), plan.nbytes)
+        self._staging_pool.release(staging)
+
+    def _is_fortran_view(
+        self,
+        array: PythonArray,
+        fptr: "cffi.FFI.CData",
+        ptr_offset: int,
+        dtype: type,
+        swap_axes: Optional[Tuple[int, int]] = None,
+    ) -> bool:
+        """Array is the view of the Fortran memory given by `fortran_to_python`"""
+        if not isinstance(array, np.ndarray) or array.dtype != dtype:
+            return False
+        if swap_axes:
+            array = np.swapaxes(array, swap_axes[0], swap_axes[1])
+        address = int(self._ffi.cast("uintptr_t", fptr + ptr_offset))
+        return (
+            array.flags.f_contiguous and array.__array_interface__["data"][0] == address
+        )
+
+    def _fortran_pointer_to_numpy_buffer(
+        self,
+        fptr: "cffi.FFI.CData",
+        plan: TransferPlan,
+    ) -> np.ndarray:
+        """
+        Input: Fortran data pointed to by fptr, as planned
+        Output: flat NumPy view of the Fortran memory
+        """
+        return np.frombuffer(  # noqa
+            buffer=self._ffi.buffer(fptr, plan.nbytes),
+            dtype=plan.dtype,
+        )
 
     def _transform_from_fortran_layout(
         self,
@@ -147,28 +815,23 @@ class FortranPythonConversion:
             )
         return trf_array
 
-    def _transform_and_download(
+    def _transform_to_fortran_layout(
         self,
         device_array: DeviceArray,
         dtype: type,
         swap_axes: Optional[Tuple[int, int]] = None,
-    ) -> np.ndarray:
-        with self._current_stream:
-            if swap_axes:
-                device_array = cp.swapaxes(
-                    device_array,
-                    swap_axes[0],
-                    swap_axes[1],
-                )
-            host_array = cp.asnumpy(
-                device_array.astype(dtype).flatten(order="F"),
-            )
-            self._current_stream = (
-                self._stream_A
-                if self._current_stream == self._stream_B
-                else self._stream_B
+    ) -> DeviceArray:
+        """Flat Fortran-ordered copy of a device array, on the current stream.
+        Copies only if the dtype or the layout differ."""
+        if swap_axes:
+            device_array = self._target_np.swapaxes(
+                device_array,
+                swap_axes[0],
+                swap_axes[1],
             )
-            return host_array
+        return self._target_np.asfortranarray(
+            device_array.astype(dtype, copy=False)
+        ).ravel(order="F")
 
     def _transform_from_python_layout(
         self,
@@ -177,15 +840,11 @@ class FortranPythonConversion:
         swap_axes: Optional[Tuple[int, int]] = None,
     ) -> np.ndarray:
         """Copy back a numpy array in python layout to Fortran"""
-
-        if self._python_targets_gpu:
-            numpy_array = self._transform_and_download(array, dtype, swap_axes)
-        else:
-            numpy_array = array.astype(dtype).flatten(order="F")
-            if swap_axes:
-                numpy_array = np.swapaxes(
-                    numpy_array,
-                    swap_axes[0],
-                    swap_axes[1],
-                )
-        return numpy_array
+        if swap_axes:
+            array = np.swapaxes(
+                array,
+                swap_axes[0],
+                swap_axes[1],
+            )
+        # Copy only if dtype or layout differ, flattening is then a view
+        return np.asfortranarray(array, dtype=dtype).ravel(order="F")
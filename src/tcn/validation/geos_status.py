@@ -38,9 +38,8 @@ class GEOSStatus:
         return True
 
 
-def _get_all_repo_status(
-    mepo_components_path: str, verbose: bool = False
-) -> GEOSStatus:
+def get_all_repo_status(mepo_components_path: str, verbose: bool = False) -> GEOSStatus:
+    """Git status of the repositories listed in a mepo `components.yaml`"""
     geos_dir = pathlib.Path(mepo_components_path).parent.resolve()
     with open(mepo_components_path) as f:
         comps = yaml.safe_load(f)
@@ -65,10 +64,10 @@ def _get_all_repo_status(
 
 if __name__ == "__main__":
     geos_mepo_components = "/home/fgdeconi/work/git/hs/geos/components.yaml"
-    hs = _get_all_repo_status(geos_mepo_components, verbose=True)
+    hs = get_all_repo_status(geos_mepo_components, verbose=True)
     geos_mepo_components = "/home/fgdeconi/work/git/hs/geos/components.yaml"
-    hs2 = _get_all_repo_status(geos_mepo_components, verbose=True)
+    hs2 = get_all_repo_status(geos_mepo_components, verbose=True)
     geos_mepo_components = "/home/fgdeconi/work/git/aq/geos/components.yaml"
-    aq = _get_all_repo_status(geos_mepo_components, verbose=True)
+    aq = get_all_repo_status(geos_mepo_components, verbose=True)
     assert hs == hs2
     assert hs == aq
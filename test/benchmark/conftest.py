@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def benchmark_cache_dir(tmp_path, monkeypatch):
+    """Keep the parsed log cache out of the user's home"""
+    cache_dir = tmp_path / "benchmark_cache"
+    monkeypatch.setenv("TCN_BENCHMARK_CACHE_DIR", str(cache_dir))
+    return cache_dir
@@ -0,0 +1,65 @@
+import os
+import shutil
+
+import pytest
+
+from tcn.benchmark.benchmark import Benchmark
+from tcn.benchmark.cache import BenchmarkCache
+from tcn.benchmark.geos_log_parser import PARSER_CACHE_KEY, parse_geos_log
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def test_parse_geos_log_is_cached(tmp_path, benchmark_cache_dir):
+    log = str(tmp_path / "geos.0.out")
+    shutil.copy(os.path.join(DATA_DIR, "geos_gtfv3.0.out"), log)
+
+    benchmark = parse_geos_log(log)
+    cache = BenchmarkCache(str(benchmark_cache_dir), max_size_bytes=2**30)
+    cached = cache.load(log, PARSER_CACHE_KEY)
+    assert cached is not None
+    assert Benchmark.from_dict(cached) == benchmark
+    assert parse_geos_log(log) == benchmark
+
+    # Content change invalidates the entry
+    with open(log, "a") as f:
+        f.write(" 0 , geos_gtfv3 0.5\n")
+    assert cache.load(log, PARSER_CACHE_KEY) is None
+    assert parse_geos_log(log).fv_dyncore_timings[-1] == 0.5
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = BenchmarkCache(str(tmp_path / "cache"), max_size_bytes=2**30)
+    logs = []
+    for i in range(3):
+        log = str(tmp_path / f"log{i}")
+        with open(log, "w") as f:
+            f.write(f"log {i}")
+        logs.append(log)
+        cache.store(log, "key", ["x" * 1000])
+        # mtime resolution can be coarse: force the LRU order
+        entry = os.path.join(cache.directory, f"{cache.content_hash(log)}.key.json")
+        os.utime(entry, (i, i))
+
+    cache.max_size_bytes = 2500
+    cache.evict()
+    assert cache.load(logs[0], "key") is None
+    assert cache.load(logs[2], "key") is not None
+
+
+def test_cache_concurrent_eviction_and_failed_write(tmp_path, monkeypatch):
+    cache = BenchmarkCache(str(tmp_path / "cache"), max_size_bytes=2**30)
+    path = os.path.join(cache.directory, "entry.json")
+    cache._write(path, {"a": 1})
+
+    # Entry evicted by another process right after being read
+    def evicted(path, *args):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", evicted)
+    assert cache._read(path) == {"a": 1}
+
+    # Failed writes leave no temporary file behind
+    with pytest.raises(TypeError):
+        cache._write(path, {"a": object()})
+    assert sorted(os.listdir(cache.directory)) == ["entry.json"]
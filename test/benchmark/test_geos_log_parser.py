@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from tcn.benchmark.geos_log_parser import parse_geos_log, parse_geos_logs
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def test_parse_gtfv3_log():
+    benchmark = parse_geos_log(os.path.join(DATA_DIR, "geos_gtfv3.0.out"))
+
+    assert benchmark.backend == "gtfv3_dacegpu"
+    assert benchmark.grid_resolution == (180, 180, 72)
+    assert benchmark.node_setup == (4, 4, 96)
+    assert benchmark.timestep_s == 450
+    assert benchmark.global_init_time == 40.0
+    assert benchmark.global_run_time == 250.0
+    assert benchmark.global_finalize_time == 8.0
+    assert benchmark.fv_dyncore_timings == [0.812345, 0.402111, 0.398432, 0.401002]
+    assert benchmark.inner_dycore_timings == [0.701, 0.35, 0.348, 0.349]
+    agcm = {name: (time, parent) for name, time, parent in benchmark.agcm_timings}
+    assert agcm["FV_DYNAMICS"] == (75.0, "DYN_CORE")
+    assert agcm["LAND"] == (18.0, "SURFACE")
+    assert agcm["GOCART2G"] == (6.6, "CHEMISTRY")
+    assert agcm["BACM_1M"] == (30.0, "MOIST")
+    ogcm = {name: (time, parent) for name, time, parent in benchmark.ogcm_timings}
+    assert ogcm["SEAICE"] == (6.0, "OGCM")
+    assert ogcm["DATASEA"] == (18.0, "OCEAN")
+    assert benchmark.run_timings[0] == ("RUN", 250.0, "")
+
+
+def test_parse_fortran_log():
+    benchmark = parse_geos_log(os.path.join(DATA_DIR, "geos_fortran.0.out"))
+
+    assert benchmark.backend == "fortran"
+    assert benchmark.fv_dyncore_timings == [0.812345, 0.402111, 0.398432, 0.401002]
+    assert benchmark.inner_dycore_timings == []
+
+
+def test_parse_geos_logs_keeps_order_and_reports_errors():
+    logs = [
+        os.path.join(DATA_DIR, "geos_fortran.0.out"),
+        os.path.join(DATA_DIR, "geos_gtfv3.0.out"),
+    ]
+    benchmarks = parse_geos_logs(logs, max_workers=2)
+    assert [b.backend for b in benchmarks] == ["fortran", "gtfv3_dacegpu"]
+
+    missing = os.path.join(DATA_DIR, "missing.0.out")
+    with pytest.raises(RuntimeError, match="missing.0.out"):
+        parse_geos_logs(logs + [missing], max_workers=2)
@@ -0,0 +1,69 @@
+import datetime
+import os
+
+from tcn.benchmark.geos_log_parser import parse_geos_log
+from tcn.benchmark.history import (
+    GROUP_DYCORE,
+    GROUP_SUMMARY,
+    TIMER_FV_DYCORE_MEDIAN,
+    BenchmarkHistory,
+)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def test_history_query_last_runs(tmp_path):
+    history = BenchmarkHistory(str(tmp_path / "history"))
+    gtfv3 = parse_geos_log(os.path.join(DATA_DIR, "geos_gtfv3.0.out"))
+    fortran = parse_geos_log(os.path.join(DATA_DIR, "geos_fortran.0.out"))
+
+    for day, scale in enumerate([10.0, 1.0, 2.0, 3.0]):
+        gtfv3.fv_dyncore_timings = [scale]
+        history.append(
+            gtfv3,
+            experiment="HeldSuarez",
+            timestamp=datetime.datetime(2024, 1, day + 1),
+        )
+    history.append(fortran, experiment="HeldSuarez")
+
+    series = history.timer_series(
+        GROUP_DYCORE, TIMER_FV_DYCORE_MEDIAN, "gtfv3_dacegpu", "C180-L72"
+    )
+    assert list(series) == [10.0, 1.0, 2.0, 3.0]
+    assert (
+        history.timer_median(
+            GROUP_DYCORE, TIMER_FV_DYCORE_MEDIAN, "gtfv3_dacegpu", "C180-L72", last_n=3
+        )
+        == 2.0
+    )
+    runs = history.load(columns=["run_id"], backend="fortran")
+    assert runs["run_id"].nunique() == 1
+
+
+def test_history_timer_repeated_in_a_run(tmp_path):
+    history = BenchmarkHistory(str(tmp_path / "history"))
+    benchmark = parse_geos_log(os.path.join(DATA_DIR, "geos_gtfv3.0.out"))
+    for day in range(4):
+        benchmark.timings = [
+            ("GCM", 10.0 + day, "TOTAL"),
+            ("GCM", 100.0 + day, "RUN"),
+            ("EXTDATA", 1.0, "GCM"),
+        ]
+        history.append(
+            benchmark, "HeldSuarez", timestamp=datetime.datetime(2024, 1, day + 1)
+        )
+
+    # One value per run, the first occurrence in the summary
+    series = history.timer_series(
+        GROUP_SUMMARY, "GCM", "gtfv3_dacegpu", "C180-L72", last_n=3
+    )
+    assert list(series) == [11.0, 12.0, 13.0]
+    assert series.index.is_unique
+    series = history.timer_series(
+        GROUP_SUMMARY, "GCM", "gtfv3_dacegpu", "C180-L72", last_n=3, parent="RUN"
+    )
+    assert list(series) == [101.0, 102.0, 103.0]
+    assert (
+        history.timer_median(GROUP_SUMMARY, "GCM", "gtfv3_dacegpu", "C180-L72", 2)
+        == 12.5
+    )
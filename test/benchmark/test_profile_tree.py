@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+
+from tcn.benchmark.benchmark import Benchmark
+from tcn.benchmark.profile_tree import EXCLUSIVE, INCLUSIVE, ProfileTree
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def _summary_profile() -> ProfileTree:
+    benchmark = Benchmark()
+    benchmark.parse_geos_log_summary(os.path.join(DATA_DIR, "geos_gtfv3.0.out"))
+    assert benchmark.profile is not None
+    return benchmark.profile
+
+
+def test_profile_from_summary():
+    profile = _summary_profile()
+
+    assert profile.columns == ["#-cycles", INCLUSIVE, "% Incl", EXCLUSIVE, "% Excl"]
+    assert profile.get("Run/GCM/AGCM/PHYSICS/MOIST") == 30.0
+    assert profile.get("All/Run/GCM/AGCM/PHYSICS/MOIST") == 30.0
+    assert profile.get("Run/GCM/AGCM/PHYSICS/SURFACE/LAND", EXCLUSIVE) == 1.0
+    # Same name, different parents
+    assert profile.get("Initialize/GCM") == 35.0
+    assert profile.get("Finalize/GCM") == 6.0
+    land = profile.index("Run/GCM/AGCM/PHYSICS/SURFACE/LAND")
+    assert profile.names[profile.parent(land)] == "SURFACE"
+    assert [profile.names[c] for c in profile.children(land)] == ["VEGDYN", "CATCH"]
+    assert "Run/GCM/AGCM/PHYSICS/NOPE" not in profile
+
+    assert ProfileTree.from_dict(profile.to_dict()) == profile
+
+
+def test_profile_diff_and_merge():
+    profile = _summary_profile()
+    other = ProfileTree.from_depths(
+        ["All", "Run", "EXTRA"], [0, 2, 4], [[1, 300.0], [1, 200.0], [1, 5.0]]
+    )
+
+    diff = profile.diff(other)
+    assert diff.get("Run") == 50.0
+    assert np.isnan(diff.get("Run/GCM"))
+
+    merged = profile.merge(other)
+    assert merged.get("Run") == 450.0
+    assert merged.get("Run/EXTRA") == 5.0
+    assert merged.get("Run/GCM") == 230.0
+    assert merged.names[merged.parent(merged.index("Run/EXTRA"))] == "Run"
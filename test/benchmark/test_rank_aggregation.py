@@ -0,0 +1,82 @@
+import os
+import shutil
+
+import pytest
+
+from tcn.benchmark.history import TIMER_FV_DYCORE_MEDIAN
+from tcn.benchmark.rank_aggregation import (
+    TIMER_FV_DYCORE_TOTAL,
+    aggregate_ranks,
+    imbalance_report,
+    parse_rank_log,
+    rank_logs,
+)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def _write_rank_logs(directory, ranks: int, slow_rank: int):
+    for rank in range(ranks):
+        step = 0.9 if rank == slow_rank else 0.4 + 0.001 * rank
+        with open(directory / f"benchmark.1day.dacegpu.{rank}.out", "w") as f:
+            for _ in range(4):
+                f.write(f" {rank} , geos_gtfv3 {step}\n")
+    # Not part of the run
+    (directory / "benchmark.cache.dacegpu.0.out").write_text("")
+
+
+def test_rank_logs(tmp_path):
+    _write_rank_logs(tmp_path, 12, slow_rank=7)
+
+    logs = rank_logs(str(tmp_path / "benchmark.1day.dacegpu.3.out"))
+
+    assert list(logs.keys()) == list(range(12))
+    assert logs[10] == str(tmp_path / "benchmark.1day.dacegpu.10.out")
+    with pytest.raises(ValueError):
+        rank_logs(str(tmp_path / "benchmark.log"))
+
+
+def test_parse_rank_log_with_profiler_report(tmp_path):
+    log = tmp_path / "geos_gtfv3.0.out"
+    shutil.copy(os.path.join(DATA_DIR, "geos_gtfv3.0.out"), log)
+
+    timers = parse_rank_log(str(log))
+
+    assert timers[TIMER_FV_DYCORE_TOTAL] == pytest.approx(2.01389)
+    assert timers["All/Run/GCM/AGCM/PHYSICS/MOIST"] == 30.0
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_aggregate_ranks(tmp_path, max_workers):
+    _write_rank_logs(tmp_path, 12, slow_rank=7)
+
+    aggregate = aggregate_ranks(
+        rank_logs(str(tmp_path / "benchmark.1day.dacegpu.0.out")),
+        max_workers=max_workers,
+    )
+
+    stats = aggregate.timers[TIMER_FV_DYCORE_MEDIAN]
+    assert stats.ranks == list(range(12))
+    assert stats.min == pytest.approx(0.4)
+    assert stats.max == pytest.approx(0.9)
+    assert stats.slowest_rank == 7
+    assert stats.imbalance == pytest.approx(0.9 / stats.mean - 1)
+    assert stats.stragglers == [7]
+    assert aggregate.stragglers() == {
+        7: [TIMER_FV_DYCORE_TOTAL, TIMER_FV_DYCORE_MEDIAN]
+    }
+    assert "Straggler ranks" in str(aggregate)
+
+
+def test_imbalance_report_of_failing_rank(tmp_path):
+    _write_rank_logs(tmp_path, 4, slow_rank=2)
+    log = str(tmp_path / "benchmark.1day.dacegpu.0.out")
+    assert imbalance_report(log).startswith("Load imbalance over 4 ranks")
+
+    # Unreadable rank log: reported, not raised
+    (tmp_path / "benchmark.1day.dacegpu.4.out").mkdir()
+    with pytest.raises(RuntimeError):
+        aggregate_ranks(rank_logs(log), max_workers=1)
+    report = imbalance_report(log)
+    assert report.startswith("Load imbalance not available: Failed to parse rank logs")
+    assert "benchmark.1day.dacegpu.4.out" in report
@@ -0,0 +1,51 @@
+import datetime
+import os
+
+import numpy as np
+
+from tcn.benchmark.geos_log_parser import parse_geos_log
+from tcn.benchmark.history import TIMER_FV_DYCORE_MEDIAN, BenchmarkHistory
+from tcn.benchmark.regression import compare_to_baseline, detect_regressions
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def test_compare_to_baseline():
+    rng = np.random.default_rng(42)
+    baseline = 1.0 + rng.normal(0, 0.01, size=20)
+
+    assert not compare_to_baseline(baseline, 1.01).is_regression
+    assert compare_to_baseline(baseline, 1.07).is_regression
+    # Faster is never a regression
+    assert not compare_to_baseline(baseline, 0.8).is_regression
+    # Not enough history to decide
+    assert not compare_to_baseline(baseline[:3], 2.0).is_regression
+
+
+def test_compare_to_zero_baseline():
+    # Timer absent (zero) in the history
+    zeros = np.zeros(10)
+    result = compare_to_baseline(zeros, 0.0)
+    assert result.relative_change == 0.0
+    assert not result.is_regression
+    result = compare_to_baseline(zeros, 0.5)
+    assert result.relative_change == np.inf
+    assert result.is_regression
+    assert "REGRESSION" in str(result)
+
+
+def test_detect_regressions_against_history(tmp_path):
+    history = BenchmarkHistory(str(tmp_path / "history"))
+    benchmark = parse_geos_log(os.path.join(DATA_DIR, "geos_gtfv3.0.out"))
+    rng = np.random.default_rng(0)
+    for day in range(10):
+        benchmark.fv_dyncore_timings = [0.4 + rng.normal(0, 0.002)]
+        history.append(
+            benchmark, "HeldSuarez", timestamp=datetime.datetime(2024, 1, day + 1)
+        )
+
+    benchmark.fv_dyncore_timings = [0.4 * 1.07]
+    results = {r.timer: r for r in detect_regressions(benchmark, history)}
+    assert results[TIMER_FV_DYCORE_MEDIAN].is_regression
+    assert results[TIMER_FV_DYCORE_MEDIAN].baseline_runs == 10
+    assert not results["run"].is_regression
@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from tcn.benchmark.geos_log_parser import parse_geos_log
+from tcn.benchmark.report import (
+    REPORT_DYCORE,
+    REPORT_GLOBAL_RUN,
+    REPORT_THROUGHPUT,
+    cli,
+    report,
+)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def test_report_against_baseline():
+    fortran = parse_geos_log(os.path.join(DATA_DIR, "geos_fortran.0.out"))
+    gpu_A = parse_geos_log(os.path.join(DATA_DIR, "geos_gtfv3.0.out"))
+    gpu_B = parse_geos_log(os.path.join(DATA_DIR, "geos_gtfv3.0.out"))
+    gpu_A.global_run_time = 125.0
+    gpu_B.global_run_time = 500.0
+
+    r = report([fortran, gpu_A, gpu_B])
+    assert r is not None
+    assert r.backends == ["fortran", "gtfv3_dacegpu #1", "gtfv3_dacegpu #2"]
+    assert r.speedups(REPORT_GLOBAL_RUN) == [1.0, 2.0, 0.5]
+    assert REPORT_DYCORE in r.metrics
+
+    markdown = r.to_markdown()
+    assert "fortran (baseline)" in markdown
+    assert "125.00 (2.00x)" in markdown
+    assert "<table>" in r.to_html()
+    data = json.loads(r.to_json())
+    assert data["baseline"] == "fortran"
+    assert data["metrics"][REPORT_GLOBAL_RUN]["values"] == [250.0, 125.0, 500.0]
+
+
+def test_report_throughput():
+    fortran = parse_geos_log(os.path.join(DATA_DIR, "geos_fortran.0.out"))
+    gpu = parse_geos_log(os.path.join(DATA_DIR, "geos_gtfv3.0.out"))
+    fortran.fv_dyncore_timings = [4.0] * 10
+    gpu.fv_dyncore_timings = [2.0] * 10
+    fortran.timestep_s = gpu.timestep_s = 450.0
+
+    r = report([fortran, gpu])
+    assert r is not None
+    # 450 simulated seconds every 4 wall seconds
+    assert r.metrics[REPORT_THROUGHPUT] == [112.5, 225.0]
+    # Higher throughput is better
+    assert r.speedups(REPORT_THROUGHPUT) == [1.0, 2.0]
+
+
+def test_report_dycore_stats():
+    fortran = parse_geos_log(os.path.join(DATA_DIR, "geos_fortran.0.out"))
+    gpu = parse_geos_log(os.path.join(DATA_DIR, "geos_gtfv3.0.out"))
+    # Slow first step (warmup) & a late outlier
+    gpu.fv_dyncore_timings = [30.0] + [2.0 + 0.01 * (i % 3) for i in range(40)]
+    gpu.fv_dyncore_timings[30] = 9.0
+
+    r = report([fortran, gpu])
+    assert r is not None
+    stats = r.dycore_stats[1]
+    assert stats.warmup_steps == 1 and stats.outliers == [30]
+    for rendered in [r.to_markdown(), r.to_html()]:
+        assert (
+            "gtfv3_dacegpu dycore: 41 steps (1 warmup: 30.00s, 1 outliers)" in rendered
+        )
+        assert "p90" in rendered and "p99" in rendered and "jitter" in rendered
+    data = json.loads(r.to_json())["dycore_stats"]["gtfv3_dacegpu"]
+    assert data["warmup_steps"] == 1
+    assert data["outliers"] == [30]
+    assert data["p99"] >= data["p90"] >= data["p50"]
+
+
+def test_report_baseline_out_of_range():
+    log = os.path.join(DATA_DIR, "geos_fortran.0.out")
+    with pytest.raises(ValueError):
+        report([parse_geos_log(log)], baseline=1)
+    result = CliRunner().invoke(cli, [log, "--baseline", "1"])
+    assert result.exit_code == 2
+    assert "--baseline" in result.output
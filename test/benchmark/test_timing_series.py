@@ -0,0 +1,30 @@
+import numpy as np
+
+from tcn.benchmark.timing_series import analyze_timings, detect_warmup
+
+
+def _steady(count: int = 200) -> list:
+    rng = np.random.default_rng(0)
+    return list(0.4 + rng.normal(0, 0.004, size=count))
+
+
+def test_detect_warmup():
+    assert detect_warmup(_steady()) == 0
+    assert detect_warmup([0.8] + _steady()) == 1
+    # DaCe BuildAndRun: several slow steps
+    assert detect_warmup([120.0, 30.0, 5.0] + _steady()) == 3
+
+
+def test_analyze_timings():
+    timings = [120.0, 30.0] + _steady()
+    timings[100] = 1.5
+    stats = analyze_timings(timings, timestep_s=450)
+
+    assert stats.count == 202
+    assert stats.warmup_steps == 2
+    assert stats.warmup_time == 150.0
+    assert stats.outliers == [100]
+    assert abs(stats.p50 - 0.4) < 0.002
+    assert stats.p50 <= stats.p90 <= stats.p99
+    assert stats.jitter < 0.02
+    assert abs(stats.throughput_sdpd - 450 / stats.mean) < 1e-6
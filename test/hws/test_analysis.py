@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from tcn.hws.analysis import (
+    energy_envelop_calculation,
+    energy_per_phase,
+    sample_timestamps,
+)
+
+
+def test_energy_integrated_over_actual_time():
+    # Jittery sampling with a missed sample: ~0.1s apart over 10s
+    rng = np.random.default_rng(0)
+    timestamps = np.sort(np.concatenate([[0.0, 10.0], rng.uniform(0, 10, 80)]))
+    gpu_psu = np.full((len(timestamps), 4), 100.0)  # 4 GPUs
+    cpu_psu = np.full(len(timestamps), 50.0)
+
+    report = energy_envelop_calculation(
+        cpu_psu, gpu_psu, verbose=False, timestamps=timestamps
+    )
+
+    assert report.duration_s == pytest.approx(10)
+    assert report.GPU_J == pytest.approx(4000)
+    assert report.CPU_J == pytest.approx(500)
+    assert report.overall_kWh == pytest.approx(4500 / 3.6e6)
+    assert report.overall_average_W == pytest.approx(450)
+
+
+def test_energy_without_timestamps():
+    data = {"cpu_psu": np.full(11, 60.0), "gpu_psu": np.zeros(11)}
+    timestamps = sample_timestamps(data, 11, sample_rate_s=0.5)
+
+    report = energy_envelop_calculation(
+        data["cpu_psu"], data["gpu_psu"], verbose=False, timestamps=timestamps
+    )
+
+    assert report.duration_s == 5.0
+    assert report.CPU_J == pytest.approx(300)
+
+
+def test_energy_per_phase():
+    timestamps = np.arange(0, 10.5, 1.0)
+    # Power ramps from 0W to 100W over 10s
+    gpu_psu = timestamps * 10
+    cpu_psu = np.zeros_like(timestamps)
+
+    reports = energy_per_phase(
+        timestamps,
+        cpu_psu,
+        gpu_psu,
+        {"init": (0, 2.5), "run": (2.5, 10), "after": (12, 20)},
+    )
+
+    assert reports["init"].GPU_J == pytest.approx(10 * 2.5**2 / 2)
+    assert reports["run"].GPU_J == pytest.approx(500 - 10 * 2.5**2 / 2)
+    assert reports["run"].GPU_average_W == pytest.approx(reports["run"].GPU_J / 7.5)
+    assert reports["after"].sample_count == 0
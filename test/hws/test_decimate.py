@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from tcn.hws.analysis import time_slice
+from tcn.hws.decimate import levels_of_detail, lttb, minmax_decimate
+
+
+def _trace(n: int = 100_003):
+    rng = np.random.default_rng(0)
+    x = np.arange(n) * 0.1
+    y = 200 + 100 * np.sin(x / 60) + rng.normal(0, 5, n)
+    y[n // 8] = 1000  # power spike
+    y[n // 2] = np.nan  # missing sensor
+    return x, y
+
+
+def test_minmax_keeps_peaks():
+    x, y = _trace()
+    dx, dy = minmax_decimate(x, y, 1000)
+
+    assert len(dy) <= 1002
+    assert np.all(np.diff(dx) > 0)
+    assert np.nanmax(dy) == 1000
+    assert np.nanmin(dy) == np.nanmin(y)
+    assert not np.isnan(dy).any()
+    # Short traces are untouched
+    assert len(minmax_decimate(x[:10], y[:10], 1000)[1]) == 10
+
+
+def test_lttb():
+    x, y = _trace()
+    dx, dy = lttb(x, y, 500)
+
+    assert len(dy) == 500
+    assert dx[0] == x[0] and dx[-1] == x[-1]
+    assert np.all(np.diff(dx) > 0)
+    # The spike is the largest triangle of its bucket
+    assert 1000 in dy
+
+
+@pytest.mark.parametrize("method", ["minmax", "lttb"])
+def test_levels_of_detail(method):
+    x, y = _trace(50_000)
+    levels = levels_of_detail(x, y, 1000, method, factor=4)
+
+    assert all(
+        len(lx) <= points + 2 for (lx, _), points in zip(levels, [1000, 4000, 16000])
+    )
+    assert len(levels) == 4  # 1000, 4000, 16000 points then raw
+    assert len(levels[-1][0]) == 50_000
+    assert all(len(a[0]) < len(b[0]) for a, b in zip(levels, levels[1:]))
+
+
+def test_time_slice():
+    timestamps = 100 + np.arange(100) * 0.1
+
+    selection = time_slice(timestamps, (1.0, 2.0))
+    np.testing.assert_allclose(timestamps[selection][[0, -1]], [101.0, 102.0])
+    assert time_slice(timestamps) == slice(None)
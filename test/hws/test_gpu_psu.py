@@ -1,5 +1,6 @@
 import multiprocessing as mp
 import os
+import socket
 import time
 
 import cupy as cp
@@ -29,7 +30,7 @@ def test_gpu_psu_sampling():
     client_main("stop")
     p_server.join()
 
-    assert os.path.exists(f"{HWS_DUMP_NAME}.{HWS_DUMP_NPZ}")
+    assert os.path.exists(f"{HWS_DUMP_NAME}.{socket.gethostname()}.{HWS_DUMP_NPZ}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+import json
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+
+import tcn.hws.graph as hws_graph
+from tcn.hws.sample_buffer import SampleBuffer, sample_dtype
+from tcn.hws.server import dump_samples
+
+
+def test_html_lazy_levels_of_detail(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # PNG export needs a browser: not tested
+    monkeypatch.setattr(go.Figure, "write_image", lambda *args, **kwargs: None)
+    samples = SampleBuffer(sample_dtype(1), chunk_size=1024)
+    count = 5000
+    for i in range(count):
+        samples.append(0.1 * i, [100 + i % 7], [50], [10], [1000], 20, 80)
+    dump = dump_samples(samples, "hws", "node", [0], "npz")
+
+    hws_graph.cli(dump, max_points=100, html=True)
+
+    # 100, 400, 1600 points & raw: the finer levels are cut in 4**level windows
+    directory = tmp_path / "hws.node_lod"
+    assert len(os.listdir(directory)) == 4 + 16 + 64
+    # Only the coarse traces are embedded in the figure
+    html = (tmp_path / "hws.node.html").read_text()
+    lod = json.loads(html.split("var lod = ")[1].split(";\n")[0])
+    assert lod["levels"] == 3
+    assert all(len(trace["x"]) <= 100 for trace in lod["coarse"])
+    assert len(html) < 200_000
+
+    # Raw level windows hold every sample once
+    x = []
+    for window in range(64):
+        script = (directory / f"3_{window}.js").read_text()
+        # hwsLodLoaded("<key>", <traces>);
+        traces = json.loads(script.split(", ", 1)[1].rsplit(");", 1)[0])
+        assert len(traces) == 5
+        assert len(traces[0]["x"]) <= 2 * 100
+        x += traces[0]["x"]
+    np.testing.assert_allclose(x, 0.1 * np.arange(count), atol=1e-3)
@@ -0,0 +1,151 @@
+from typing import Optional
+
+import numpy as np
+import pytest
+
+from tcn.hws.analysis import (
+    device_total,
+    energy_envelop_calculation,
+    energy_per_tick,
+    load_data,
+    merge_node_data,
+)
+from tcn.hws.fake_nvml import FakeNVML
+from tcn.hws.sample_buffer import SampleBuffer, sample_dtype
+from tcn.hws.sensors import NVMLProvider, PsutilProvider
+from tcn.hws.server import dump_samples, open_providers, read_sample
+
+
+def _record_node(nvml: Optional[FakeNVML], timestamps) -> SampleBuffer:
+    """Samples of a node, without GPUs if `nvml` is None"""
+    sensors = [] if nvml is None else [NVMLProvider(nvml)]
+    providers, devices = open_providers(sensors + [PsutilProvider()])
+    # As the server: samples hold at least one GPU
+    device_count = max(len(devices), 1)
+    samples = SampleBuffer(dtype=sample_dtype(device_count), chunk_size=8)
+    for timestamp in timestamps:
+        samples.append(timestamp, *read_sample(providers, device_count)[1:])
+    return samples
+
+
+def test_sample_all_devices():
+    nvml = FakeNVML(device_count=4, power_w=[100, 200, 300, 400])
+
+    samples = _record_node(nvml, np.arange(5.0))
+
+    gpu_psu = samples.columns()["gpu_psu"]
+    assert gpu_psu.shape == (5, 4)
+    np.testing.assert_array_equal(gpu_psu[0], [100, 200, 300, 400])
+    np.testing.assert_array_equal(device_total(gpu_psu), [1000] * 5)
+
+
+def test_merge_nodes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    node_a = _record_node(FakeNVML(device_count=4, power_w=[100] * 4), np.arange(10.0))
+    # Second node started later and sampled out of phase
+    node_b = _record_node(
+        FakeNVML(device_count=4, power_w=[250] * 4), np.arange(10.0) + 2.5
+    )
+    dumps = [
+        dump_samples(node_a, "hws_dump", "node-a", [0, 1, 2, 3], "npz"),
+        dump_samples(node_b, "hws_dump", "node-b", [0, 1, 2, 3], "npz"),
+    ]
+    assert dumps[1] == "./hws_dump.node-b.npz"
+
+    nodes = [load_data(dump) for dump in dumps]
+    merged = merge_node_data(nodes)
+
+    # Overlap of both recordings on the (wall clock) timestamps of the first node
+    np.testing.assert_allclose(
+        merged["timestamp"] - nodes[0]["wall_clock_origin"],
+        np.arange(3.0, 10.0),
+        atol=1e-3,
+    )
+    assert merged["gpu_psu"].shape == (7, 8)
+    assert merged["cpu_psu"].shape == (7, 2)
+    assert list(merged["gpu_host"]) == ["node-a"] * 4 + ["node-b"] * 4
+    assert list(merged["gpu_device"]) == [0, 1, 2, 3] * 2
+    assert list(merged["cpu_host"]) == ["node-a", "node-b"]
+    np.testing.assert_array_equal(device_total(merged["gpu_psu"]), [1400] * 7)
+
+    # Energy of all 8 GPUs, not only the first one
+    single = energy_envelop_calculation(
+        merged["cpu_psu"][:, 0], merged["gpu_psu"][:, 0], verbose=False
+    )
+    run = energy_envelop_calculation(
+        merged["cpu_psu"], merged["gpu_psu"], verbose=False
+    )
+    assert run.GPU_J == pytest.approx(14 * single.GPU_J)
+
+
+def test_merge_nodes_without_overlap():
+    node_a = _record_node(FakeNVML(), np.arange(3.0)).columns()
+    node_b = _record_node(FakeNVML(), np.arange(3.0) + 10).columns()
+    for node, host in [(node_a, "a"), (node_b, "b")]:
+        node["host"] = np.array(host)
+        node["devices"] = np.array([0])
+
+    with pytest.raises(ValueError):
+        merge_node_data([node_a, node_b])
+
+
+def test_merge_nodes_without_gpu(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    nodes = [
+        load_data(
+            dump_samples(
+                _record_node(nvml, np.arange(5.0)),
+                "hws_dump",
+                host,
+                devices,
+                "npz",
+            )
+        )
+        for host, nvml, devices in [
+            ("gpu-a", FakeNVML(device_count=2), [0, 1]),
+            ("cpu", None, []),
+            ("gpu-b", FakeNVML(device_count=3), [0, 1, 2]),
+        ]
+    ]
+    assert nodes[1]["gpu_psu"].shape == (5, 1)
+
+    merged = merge_node_data(nodes)
+
+    # Wall clock origins of the dumps differ slightly: only columns are checked
+    assert merged["gpu_psu"].shape[1] == 5
+    assert list(merged["gpu_host"]) == ["gpu-a"] * 2 + ["gpu-b"] * 3
+    assert list(merged["gpu_device"]) == [0, 1, 0, 1, 2]
+    assert merged["cpu_psu"].shape[1] == 3
+
+
+def test_merge_nodes_ticks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    node_a = _record_node(FakeNVML(device_count=4, power_w=[100] * 4), np.arange(10.0))
+    node_b = _record_node(
+        FakeNVML(device_count=4, power_w=[250] * 4), np.arange(10.0) + 2.5
+    )
+    ticks_a = [(t, "timestep", 0) for t in [3.0, 5.0, 7.0]]
+    ticks_b = [(t, "timestep", 4) for t in [4.0, 6.0]]
+    nodes = [
+        load_data(
+            dump_samples(node, "hws_dump", host, [0, 1, 2, 3], "npz", ticks=ticks)
+        )
+        for node, host, ticks in [
+            (node_a, "node-a", ticks_a),
+            (node_b, "node-b", ticks_b),
+        ]
+    ]
+
+    merged = merge_node_data(nodes)
+
+    # Ticks of all nodes, on the wall clock like the merged samples
+    origin = float(nodes[0]["wall_clock_origin"])
+    np.testing.assert_allclose(
+        merged["tick_timestamps"] - origin, [3, 4, 5, 6, 7], atol=1e-3
+    )
+    assert list(merged["tick_ranks"]) == [0, 4, 0, 4, 0]
+    assert list(merged["tick_hosts"]) == ["node-a", "node-b"] * 2 + ["node-a"]
+    # Phases of the lowest rank, with the power of both nodes
+    timesteps = energy_per_tick(merged)["timestep"]
+    assert len(timesteps) == 3
+    assert timesteps[0].GPU_J == pytest.approx(2 * 1400, rel=1e-3)
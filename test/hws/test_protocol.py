@@ -0,0 +1,102 @@
+import asyncio
+import os
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from tcn.hws.analysis import load_data
+from tcn.hws.client import HWSClient
+from tcn.hws.protocol import (
+    MAX_MESSAGE_BYTES,
+    ProtocolError,
+    encode,
+    recv_message,
+    send_message,
+)
+from tcn.hws.sensors import SimulatedProvider
+from tcn.hws.server import SamplerServer, open_providers
+
+
+def test_framing():
+    a, b = socket.socketpair()
+    send_message(a, {"action": "TICK", "name": "timestep"})
+    send_message(a, {"action": "STATUS"})
+    assert recv_message(b) == {"action": "TICK", "name": "timestep"}
+    assert recv_message(b) == {"action": "STATUS"}
+
+    a.sendall(struct.pack("!I", MAX_MESSAGE_BYTES + 1))
+    with pytest.raises(ProtocolError):
+        recv_message(b)
+    a.sendall(encode({"action": "STOP"})[:-2])
+    a.close()
+    with pytest.raises(ConnectionError):
+        recv_message(b)
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    providers, devices = open_providers([SimulatedProvider(device_count=2)])
+    server = SamplerServer(providers, devices, host="node")
+    socket_filename = str(tmp_path / "hws.sock")
+    thread = threading.Thread(target=asyncio.run, args=(server.serve(socket_filename),))
+    thread.start()
+    while not os.path.exists(socket_filename):
+        time.sleep(0.01)
+    yield server, socket_filename
+    thread.join(timeout=1)
+    if thread.is_alive():
+        with HWSClient(socket_filename) as client:
+            client.request({"action": "STOP"})
+    thread.join(timeout=5)
+
+
+def test_persistent_clients(server):
+    server, socket_filename = server
+    rank_0, rank_1 = HWSClient(socket_filename), HWSClient(socket_filename)
+
+    assert rank_0.request({"action": "START", "dt": 0.01}) == {"dt": 0.01}
+    for timestep in range(3):
+        for rank, client in enumerate([rank_0, rank_1]):
+            reply = client.request({"action": "TICK", "name": "timestep", "rank": rank})
+    assert reply == {"ticks": 6}
+    # Not acknowledged, even if refused: the next reply is the status
+    rank_1.send({"action": "TICK", "name": "finalize", "rank": 1})
+    rank_1.send({"action": "REBOOT"})
+    time.sleep(0.1)
+
+    status = rank_1.request({"action": "STATUS"})
+    assert status["ticks"] == 7
+    assert status["recording"]
+    assert status["clients"] == 2
+    assert status["devices"] == [0, 1]
+    assert status["samples"] > 3
+
+    stats = rank_0.request({"action": "STATS"})
+    assert stats["window_samples"] > 3
+    assert len(stats["vram_high_water_mb"]) == 2
+
+    latest = rank_0.request({"action": "QUERY", "count": 3, "fields": ["gpu_psu"]})
+    assert list(latest.keys()) == ["gpu_psu"]
+    assert np.asarray(latest["gpu_psu"]).shape == (3, 2)
+
+    # Refused orders are acknowledged as such, the connection stays usable
+    with pytest.raises(RuntimeError, match="Unknown fields"):
+        rank_0.request({"action": "QUERY", "fields": ["nope"]})
+    with pytest.raises(RuntimeError, match="Unknown order"):
+        rank_0.request({"action": "REBOOT"})
+
+    dump = rank_1.request({"action": "DUMP", "dump_name": "hws"})
+    assert dump["filename"] == "./hws.node.npz"
+    data = load_data(dump["filename"])
+    assert list(data["tick_ranks"]) == [0, 1] * 3 + [1]
+
+    rank_0.request({"action": "STOP"})
+    with pytest.raises((ConnectionError, OSError)):
+        rank_1.request({"action": "STATUS"})
+    rank_0.close()
+    rank_1.close()
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from tcn.hws.sample_buffer import SAMPLE_DTYPE, SampleBuffer
+
+
+def _sample(i: int):
+    return (float(i), i, i, i, i, i, i)
+
+
+def test_sample_buffer_grows_by_chunks():
+    samples = SampleBuffer(chunk_size=4)
+    for i in range(10):
+        samples.append(*_sample(i))
+
+    assert len(samples) == 10
+    assert samples.nbytes == 3 * 4 * SAMPLE_DTYPE.itemsize
+    assert samples.dropped == 0
+    columns = samples.columns()
+    assert list(columns.keys()) == list(SAMPLE_DTYPE.names)
+    np.testing.assert_array_equal(columns["timestamp"], np.arange(10))
+    assert columns["gpu_psu"].dtype == np.float32
+
+
+def test_sample_buffer_ring():
+    samples = SampleBuffer(chunk_size=4, max_samples=8)
+    for i in range(11):
+        samples.append(*_sample(i))
+
+    # Exactly the max_samples most recent, memory under max_samples + 1 chunk
+    assert len(samples) == 8
+    assert samples.dropped == 3
+    assert samples.nbytes == 12 * SAMPLE_DTYPE.itemsize
+    np.testing.assert_array_equal(samples.to_array()["cpu_psu"], np.arange(3, 11))
+    # Fully dropped chunks are recycled
+    for i in range(11, 100):
+        samples.append(*_sample(i))
+        assert len(samples) <= 8
+    assert samples.nbytes == 12 * SAMPLE_DTYPE.itemsize
+    np.testing.assert_array_equal(samples.to_array()["cpu_psu"], np.arange(92, 100))
+
+    samples.clear()
+    assert len(samples) == 0
+    assert samples.to_array().shape == (0,)
+
+
+def test_sample_buffer_ring_smaller_than_chunk():
+    samples = SampleBuffer(chunk_size=65536, max_samples=10)
+    for i in range(1000):
+        samples.append(*_sample(i))
+
+    assert len(samples) == 10
+    assert samples.dropped == 990
+    assert samples.nbytes <= 20 * SAMPLE_DTYPE.itemsize
+    np.testing.assert_array_equal(samples.to_array()["timestamp"], np.arange(990, 1000))
+
+
+def test_sample_buffer_invalid_chunk():
+    with pytest.raises(ValueError):
+        SampleBuffer(chunk_size=0)
+    with pytest.raises(ValueError):
+        SampleBuffer(max_samples=0)
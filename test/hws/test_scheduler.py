@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from tcn.hws.scheduler import DeadlineScheduler
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_deadlines_are_absolute():
+    clock = _Clock()
+    scheduler = DeadlineScheduler(0.01, clock=clock)
+
+    # Work of 4ms then 7ms: the next wake-ups stay on the 10ms grid
+    clock.now = 0.004
+    assert scheduler._advance(clock()) == pytest.approx(0.006)
+    clock.now = 0.017
+    assert scheduler._advance(clock()) == pytest.approx(0.003)
+    assert scheduler.missed_deadlines == 0
+
+    # Work overran the 0.03 deadline: skipped, schedule unchanged
+    clock.now = 0.0355
+    assert scheduler._advance(clock()) == pytest.approx(0.0045)
+    assert scheduler.missed_deadlines == 1
+    assert scheduler.ticks == 4
+
+
+def test_invalid_period():
+    with pytest.raises(ValueError):
+        DeadlineScheduler(0)
+
+
+def test_sampling_at_10ms_does_not_drift():
+    scheduler = DeadlineScheduler(0.01)
+    wakeups = []
+
+    async def _loop(iterations: int):
+        for _ in range(iterations):
+            wakeups.append(time.monotonic())
+            time.sleep(0.004)  # blocking work, less than a period
+            await scheduler.wait()
+
+    asyncio.run(_loop(50))
+
+    # Sleeping dt after the work would have taken 50 * 14ms. A busy machine
+    # can make us miss deadlines: they are skipped, never shifted
+    elapsed = wakeups[-1] - scheduler.start
+    assert elapsed == pytest.approx(
+        (49 + scheduler.missed_deadlines) * 0.01, abs=0.01 + 0.002 * 50
+    )
+    assert scheduler.missed_deadlines < 5
+    assert np.median(np.diff(wakeups)) == pytest.approx(0.01, abs=0.002)
@@ -0,0 +1,89 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from tcn.hws.sample_buffer import SampleBuffer, sample_dtype
+from tcn.hws.scheduler import DeadlineScheduler
+from tcn.hws.sensors import (
+    RAPLProvider,
+    ReplayProvider,
+    SimulatedProvider,
+    make_providers,
+)
+from tcn.hws.server import psu_utlz_read, read_sample
+
+
+def _write_package(root, index: int, energy_uj: int, max_range_uj: int = 1000000):
+    package = root / f"intel-rapl:{index}"
+    package.mkdir(exist_ok=True)
+    (package / "energy_uj").write_text(f"{energy_uj}\n")
+    (package / "max_energy_range_uj").write_text(f"{max_range_uj}\n")
+    # Sub-domains (core, dram...) are not summed
+    (root / f"intel-rapl:{index}:0").mkdir(exist_ok=True)
+
+
+def test_rapl_provider(tmp_path, monkeypatch):
+    _write_package(tmp_path, 0, 100)
+    _write_package(tmp_path, 1, 999900)
+    assert RAPLProvider.available(str(tmp_path))
+    assert not RAPLProvider.available(str(tmp_path / "none"))
+
+    clock = iter([10.0, 12.0])
+    monkeypatch.setattr("tcn.hws.sensors.time.monotonic", lambda: next(clock))
+    rapl = RAPLProvider(str(tmp_path))
+    rapl.open()
+    _write_package(tmp_path, 0, 200100)
+    # Counter wraps around
+    _write_package(tmp_path, 1, 199899)
+
+    # (0.2 J + 0.2 J) / 2 s
+    assert rapl.read()["cpu_psu"] == pytest.approx(0.2)
+
+
+def test_simulated_and_replay_providers():
+    simulated = SimulatedProvider(device_count=4)
+    simulated.open()
+    sample = read_sample([simulated], 4)
+    assert len(sample[1]) == 4
+    assert all(0 < power <= 400 for power in sample[1])
+
+    replay = ReplayProvider(
+        {"cpu_psu": np.array([1.0, 2.0]), "gpu_psu": np.array([[3.0], [4.0]])}
+    )
+    # Later providers override earlier ones, missing sensors are NaN
+    sample = read_sample([simulated, replay], 1)
+    assert sample[-1] == 1.0
+    assert sample[1][0] == 3.0
+    assert [replay.read()["cpu_psu"] for _ in range(3)] == [2.0, 1.0, 2.0]
+    assert np.isnan(read_sample([replay], 1)[5])
+
+
+def test_unknown_provider():
+    with pytest.raises(ValueError):
+        make_providers(["thermometer"])
+
+
+def test_sampling_loop_polls_concurrently():
+    # Two slow sensors: read one after the other they would take 0.2s and
+    # miss every other 0.15s deadline
+    providers = [
+        SimulatedProvider(device_count=2, read_latency_s=0.1),
+        SimulatedProvider(device_count=2, read_latency_s=0.1),
+    ]
+    for provider in providers:
+        provider.open()
+    samples = SampleBuffer(dtype=sample_dtype(2), chunk_size=16)
+
+    scheduler = DeadlineScheduler(0.15)
+
+    async def _sample_for(duration_s: float):
+        task = asyncio.ensure_future(psu_utlz_read(samples, scheduler, providers, 2))
+        await asyncio.sleep(duration_s)
+        task.cancel()
+
+    asyncio.run(_sample_for(0.7))
+
+    assert len(samples) >= 4
+    assert scheduler.missed_deadlines == 0
+    assert samples.columns()["gpu_psu"].shape[1] == 2
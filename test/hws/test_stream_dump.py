@@ -0,0 +1,128 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from tcn.hws.analysis import load_data
+from tcn.hws.sample_buffer import SampleBuffer, sample_dtype
+from tcn.hws.server import StreamFlusher, dump_samples, stream_dump_writer
+from tcn.hws.stream_dump import iter_stream_dump
+
+
+def _samples(count: int, chunk_size: int = 4, max_samples=None) -> SampleBuffer:
+    samples = SampleBuffer(sample_dtype(2), chunk_size, max_samples)
+    for i in range(count):
+        samples.append(float(i), [i, 2 * i], [1, 1], [2, 2], [3, 3], 50, i)
+    return samples
+
+
+def test_since():
+    samples = _samples(10, chunk_size=4, max_samples=8)
+
+    assert samples.appended == 10
+    assert samples.dropped == 2
+    np.testing.assert_array_equal(samples.since(6)["timestamp"], [6, 7, 8, 9])
+    np.testing.assert_array_equal(samples.since(3)["timestamp"], np.arange(3, 10))
+    # Dropped samples are lost
+    np.testing.assert_array_equal(samples.since(0)["timestamp"], np.arange(2, 10))
+    assert len(samples.since(10)) == 0
+
+
+def test_stream_dump_chunks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    samples = _samples(7)
+
+    writer = stream_dump_writer(samples.dtype, "hws", "node", [0, 1])
+    writer.write(samples.since(0)[:4], ticks=[(0.5, "init", 0)])
+    writer.write(samples.since(4), ticks=[(4.5, "timestep", 1)], missed_deadlines=2)
+    writer.close()
+
+    chunks = list(iter_stream_dump(writer.filename))
+    assert [len(columns["timestamp"]) for columns, _ in chunks] == [4, 3]
+    # Memory-mapped, not copied
+    assert not chunks[0][0]["cpu_psu"].flags.writeable
+
+    data = load_data(writer.filename)
+    np.testing.assert_array_equal(data["timestamp"], np.arange(7))
+    np.testing.assert_array_equal(data["gpu_psu"], samples.to_array()["gpu_psu"])
+    assert data["gpu_psu"].shape == (7, 2)
+    assert str(data["host"]) == "node"
+    assert list(data["devices"]) == [0, 1]
+    assert list(data["tick_names"]) == ["init", "timestep"]
+    assert int(data["missed_deadlines"]) == 2
+
+
+def test_stream_dump_truncated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    samples = _samples(8)
+    writer = stream_dump_writer(samples.dtype, "hws", "node", [0, 1])
+    writer.write(samples.since(0)[:4])
+    writer.write(samples.since(4))
+    # Killed while writing the second chunk
+    size = os.path.getsize(writer.filename)
+    os.truncate(writer.filename, size - 40)
+
+    data = load_data(writer.filename)
+    np.testing.assert_array_equal(data["timestamp"], np.arange(4))
+
+
+def test_stream_dump_empty(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    samples = _samples(0)
+    filename = dump_samples(samples, "hws", "node", [0, 1], "arrows")
+
+    data = load_data(filename)
+    assert data["gpu_psu"].shape == (0, 2)
+    assert len(data["cpu_psu"]) == 0
+
+
+def test_flusher(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    samples = _samples(0)
+    writer = stream_dump_writer(samples.dtype, "hws", "node", [0, 1])
+    flusher = StreamFlusher(writer, samples, flush_samples=3)
+
+    async def record():
+        for i in range(7):
+            samples.append(float(i), [i, i], [1, 1], [2, 2], [3, 3], 50, i)
+            if flusher.due():
+                await flusher.flush()
+        flusher.ticks.append((6.5, "end", 0))
+        assert writer.samples == 6
+        await flusher.close()
+
+    asyncio.run(record())
+
+    assert writer.chunks == 3
+    data = load_data(writer.filename)
+    np.testing.assert_array_equal(data["timestamp"], np.arange(7))
+    assert list(data["tick_names"]) == ["end"]
+
+
+def test_flusher_write_error(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    samples = _samples(0)
+    writer = stream_dump_writer(samples.dtype, "hws", "node", [0, 1])
+    flusher = StreamFlusher(writer, samples, flush_samples=2)
+
+    def disk_full(*args):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(writer, "write", disk_full)
+
+    async def record():
+        for i in range(6):
+            samples.append(float(i), [i, i], [1, 1], [2, 2], [3, 3], 50, i)
+            if flusher.due():
+                # As the sampling loop: the write is not awaited
+                flusher.flush()
+            await asyncio.sleep(0.01)
+        # Reported as soon as it failed, then streaming stops
+        assert isinstance(flusher.error, OSError)
+        assert not flusher.due()
+        with pytest.raises(RuntimeError, match="No space left"):
+            await flusher.close()
+
+    asyncio.run(record())
+    assert "streaming stopped" in capsys.readouterr().out
@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from tcn.hws.telemetry import (
+    RollingStats,
+    RollingWindow,
+    json_page,
+    prometheus_text,
+    serve_http,
+)
+
+
+def test_rolling_window():
+    rng = np.random.default_rng(0)
+    values = rng.uniform(0, 400, 1000)
+    window = RollingWindow(50)
+
+    for i, value in enumerate(values):
+        window.push(value)
+        start = max(0, i - 49)
+        expected = values[start:][: i + 1 - start]
+        assert window.mean == pytest.approx(expected.mean())
+        assert window.max == expected.max()
+    assert len(window) == 50
+
+    # Missing sensors are ignored
+    window.push(float("nan"))
+    assert window.max == values[-50:].max()
+
+
+def test_rolling_stats():
+    stats = RollingStats(window=3, period_s=0.1, device_count=2)
+    for i in range(5):
+        gpu_mem = [1000, 2000 - 100 * i]
+        stats.update((i * 0.1, [100, 200], [0, 0], [0, 0], gpu_mem, 10.0, 150.0))
+
+    summary = stats.summary()
+    assert summary["window_s"] == pytest.approx(0.3)
+    assert summary["window_samples"] == 3
+    assert summary["samples"] == 5
+    # GPU power is summed over the devices
+    assert summary["mean"]["gpu_psu"] == 300
+    assert summary["max"]["gpu_mem"] == 3000 - 200
+    assert summary["vram_high_water_mb"] == [1000, 2000]
+    assert summary["gpu_idle"]
+    json.dumps(summary)
+
+    stats.update((0.5, [100, 200], [0, 30], [0, 0], [0, 0], 10.0, 150.0))
+    assert not stats.summary()["gpu_idle"]
+
+
+def test_prometheus_text():
+    stats = RollingStats(window=3, period_s=0.1, device_count=1)
+    stats.update((0, [250.0], [90.0], [10.0], [4096.0], 20.0, np.nan))
+
+    text = prometheus_text(stats.summary(), "node")
+    assert 'hws_gpu_power_watts{host="node",stat="mean"} 250.0' in text
+    assert 'hws_gpu_memory_high_water_mb{host="node",device="0"} 4096.0' in text
+    assert 'hws_gpu_idle{host="node"} 0' in text
+    # No CPU power measured
+    assert "hws_cpu_power_watts{" not in text
+
+
+def test_serve_http():
+    async def get(port: int, path: str) -> bytes:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        return response
+
+    async def run():
+        server = await serve_http(0, {"/stats": json_page(lambda: {"samples": 3})})
+        port = server.sockets[0].getsockname()[1]
+        responses = [await get(port, "/stats"), await get(port, "/nope")]
+        server.close()
+        await server.wait_closed()
+        return responses
+
+    found, not_found = asyncio.run(run())
+    header, body = found.split(b"\r\n\r\n")
+    assert header.startswith(b"HTTP/1.0 200 OK")
+    assert json.loads(body) == {"samples": 3}
+    assert not_found.startswith(b"HTTP/1.0 404")
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from tcn.benchmark.benchmark import Benchmark
+from tcn.benchmark.report import REPORT_ENERGY_PER_DAY, report
+from tcn.hws.analysis import energy_per_tick, load_data, tick_phases
+from tcn.hws.client import tick
+from tcn.hws.sample_buffer import SampleBuffer, sample_dtype
+from tcn.hws.server import dump_samples
+
+
+def _hws_data():
+    # 100W GPU, 50W CPU sampled every 0.1s for 10s
+    timestamps = np.arange(0, 10.05, 0.1)
+    return {
+        "timestamp": timestamps,
+        "gpu_psu": np.full((len(timestamps), 1), 100.0),
+        "cpu_psu": np.full(len(timestamps), 50.0),
+        "tick_names": np.array(["init"] + ["timestep"] * 4 + ["finalize"]),
+        "tick_timestamps": np.array([0.0, 1.0, 3.0, 5.0, 7.0, 9.0]),
+    }
+
+
+def test_tick_phases():
+    phases = tick_phases(["init", "timestep", "timestep", "end"], [0, 1, 3, 4], 10)
+
+    assert phases == {
+        "init": (0, 1),
+        "timestep#0": (1, 3),
+        "timestep#1": (3, 4),
+        "end": (4, 10),
+    }
+
+
+def test_energy_per_tick():
+    reports = energy_per_tick(_hws_data())
+
+    assert list(reports.keys()) == ["init", "timestep", "finalize"]
+    assert len(reports["timestep"]) == 4
+    assert reports["timestep"][0].duration_s == pytest.approx(2)
+    assert reports["timestep"][0].overall_J == pytest.approx(300)
+    assert reports["finalize"][0].overall_J == pytest.approx(150)
+    assert energy_per_tick({"cpu_psu": np.zeros(3)}) == {}
+
+
+def test_energy_per_tick_edge_cases():
+    data = _hws_data()
+    data["tick_names"] = np.array(["init"] + ["step#a"] * 4 + ["step"])
+    reports = energy_per_tick(data)
+    # Names are not parsed back from the phases
+    assert [len(reports[name]) for name in ["init", "step#a", "step"]] == [1, 4, 1]
+
+    # Stopped right after ticking: no samples
+    data["timestamp"] = np.zeros(0)
+    data["cpu_psu"] = np.zeros(0)
+    data["gpu_psu"] = np.zeros((0, 1))
+    assert energy_per_tick(data) == {}
+
+
+def test_report_energy_per_simulated_day():
+    bench = Benchmark(backend="gtfv3_dacegpu", timestep_s=450, hws_data=_hws_data())
+    no_hws = Benchmark(backend="fortran", timestep_s=450)
+
+    r = report([bench, no_hws])
+
+    # 300J per 450s timestep: 192 timesteps per simulated day
+    assert r.metrics[REPORT_ENERGY_PER_DAY][0] == pytest.approx(300 * 192 / 3.6e6)
+    assert r.metrics[REPORT_ENERGY_PER_DAY][1] is None
+
+
+def test_ticks_in_dump(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    samples = SampleBuffer(dtype=sample_dtype(1), chunk_size=4)
+    samples.append(0.0, [1], [1], [1], [1], 1, 1)
+
+    dump = dump_samples(
+        samples,
+        "hws",
+        "node",
+        [0],
+        "npz",
+        ticks=[(0.5, "init", 0), (1.5, "timestep", 0)],
+    )
+
+    data = load_data(dump)
+    assert list(data["tick_names"]) == ["init", "timestep"]
+    np.testing.assert_array_equal(data["tick_timestamps"], [0.5, 1.5])
+
+
+def test_tick_without_server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert not tick("timestep")
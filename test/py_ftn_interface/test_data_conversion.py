@@ -0,0 +1,161 @@
+import cffi
+import numpy as np
+import pytest
+
+from tcn.py_ftn_interface.templates.data_conversion import (
+    FortranPythonConversion,
+    _staging_layout,
+)
+
+ffi = cffi.FFI()
+
+
+def _fortran_array(ctype: str, dim):
+    """Fortran memory holding 0, 1, 2... in column-major order"""
+    fptr = ffi.new(f"{ctype}[]", int(np.prod(dim)))
+    for i in range(int(np.prod(dim))):
+        fptr[i] = i
+    return fptr
+
+
+def test_fortran_to_python_is_a_view():
+    fptr = _fortran_array("double", [2, 3, 4])
+    f2py = FortranPythonConversion(target_numpy_module=np)
+
+    array = f2py.fortran_to_python(fptr, [2, 3, 4])
+
+    assert array.shape == (2, 3, 4)
+    assert array.flags.f_contiguous
+    assert array[1, 2, 3] == 1 + 2 * 2 + 3 * 6
+    # Written in place: nothing to copy back
+    array[1, 2, 3] = -1
+    assert fptr[23] == -1
+    assert f2py._is_fortran_view(array, fptr, 0, np.float64)
+    f2py.python_to_fortran(array, fptr)
+    assert fptr[23] == -1
+
+
+def test_python_to_fortran_copies():
+    fptr = _fortran_array("float", [2, 3])
+    f2py = FortranPythonConversion(target_numpy_module=np)
+
+    # Other dtype & C layout: converted
+    result = np.arange(6, dtype=np.float64).reshape(2, 3) * 10
+    assert not f2py._is_fortran_view(result, fptr, 0, np.float32)
+    f2py.python_to_fortran(result, fptr)
+    np.testing.assert_array_equal(f2py.fortran_to_python(fptr, [2, 3]), result)
+
+
+def test_swap_axes_roundtrip():
+    fptr = _fortran_array("double", [2, 3, 4])
+    f2py = FortranPythonConversion(target_numpy_module=np)
+    reference = f2py.fortran_to_python(fptr, [2, 3, 4]).copy()
+
+    swapped = f2py.fortran_to_python(fptr, [2, 3, 4], swap_axes=(0, 2))
+    assert swapped.shape == (4, 3, 2)
+    assert f2py._is_fortran_view(swapped, fptr, 0, np.float64, swap_axes=(0, 2))
+
+    # A new array in the swapped layout is written back in Fortran layout
+    f2py.python_to_fortran(swapped * 2, fptr, swap_axes=(0, 2))
+    np.testing.assert_array_equal(
+        f2py.fortran_to_python(fptr, [2, 3, 4]), reference * 2
+    )
+
+
+@pytest.mark.parametrize(
+    "ctype, values",
+    [
+        ("double", np.linspace(0, 1, 6) + 1e-12),
+        ("int64_t", np.arange(6, dtype=np.int64) * 2**40),
+        ("_Bool", np.array([True, False, True, True, False, False])),
+        ("double _Complex", np.arange(6) * (1 + 2j)),
+        ("float _Complex", (np.arange(6) * (1 - 1j)).astype(np.complex64)),
+    ],
+)
+def test_python_to_fortran_types(ctype, values):
+    fptr = ffi.new(f"{ctype}[]", 6)
+    f2py = FortranPythonConversion(target_numpy_module=np)
+
+    f2py.python_to_fortran(values.reshape(3, 2, order="F").copy(order="C"), fptr)
+
+    # All bytes are transferred, whatever the size of the type
+    assert [fptr[i] for i in range(6)] == values.tolist()
+
+
+def test_transfer_plan():
+    fptr = _fortran_array("float", [4, 5])
+    f2py = FortranPythonConversion(target_numpy_module=np)
+
+    plan = f2py.transfer_plan(fptr, [4, 5], swap_axes=(0, 1))
+    assert f2py.transfer_plan(fptr, [4, 5], swap_axes=(0, 1)) is plan
+    assert plan.nbytes == 4 * 5 * 4
+    assert plan.python_shape == (5, 4)
+
+    array = f2py.fortran_to_python(fptr, None, plan=plan)
+    f2py.python_to_fortran(array + 1, fptr, plan=plan)
+    assert fptr[19] == 20
+    with pytest.raises(ValueError):
+        f2py.python_to_fortran(np.zeros((4, 5)), fptr, plan=plan)
+    with pytest.raises(ValueError):
+        f2py.transfer_plan(fptr, [4, 5], swap_axes=(0, 2))
+
+
+def test_python_to_fortran_casts():
+    f2py = FortranPythonConversion(target_numpy_module=np)
+    fptr = ffi.new("int[]", 3)
+
+    f2py.python_to_fortran(np.full(3, 2.7), fptr)
+    assert fptr[2] == 2
+
+
+def test_python_to_fortran_type_safety():
+    f2py = FortranPythonConversion(target_numpy_module=np, strict=True)
+
+    with pytest.raises(TypeError):
+        f2py.python_to_fortran(np.ones(3, dtype=np.complex128), ffi.new("double[]", 3))
+    with pytest.raises(TypeError):
+        f2py.python_to_fortran(np.ones(3), ffi.new("int[]", 3))
+    with pytest.raises(TypeError):
+        f2py.python_to_fortran(np.ones(3), ffi.new("short[]", 3))
+
+
+def test_staging_layout():
+    f2py = FortranPythonConversion(target_numpy_module=np)
+    plans = [
+        f2py.transfer_plan(_fortran_array("double", [3]), [3]),
+        f2py.transfer_plan(_fortran_array("float", [100]), [100]),
+        f2py.transfer_plan(_fortran_array("int", [1]), [1]),
+    ]
+    offsets, nbytes = _staging_layout(plans)
+    assert offsets == [0, 256, 768]
+    assert nbytes == 1024
+
+
+def test_batch_roundtrip():
+    fields = [
+        (_fortran_array("double", [2, 3, 4]), [2, 3, 4], (0, 2)),
+        (_fortran_array("float", [5]), [5], None),
+        (_fortran_array("int", [3, 2]), [3, 2], None),
+    ]
+    f2py = FortranPythonConversion(target_numpy_module=np)
+
+    arrays = f2py.fortran_to_python_batch(fields)
+    assert [a.shape for a in arrays] == [(4, 3, 2), (5,), (3, 2)]
+    for array, (fptr, dim, swap_axes) in zip(arrays, fields):
+        np.testing.assert_array_equal(
+            array, f2py.fortran_to_python(fptr, dim, swap_axes=swap_axes)
+        )
+
+    f2py.python_to_fortran_batch(
+        [
+            (array * 2, fptr, swap_axes)
+            for array, (fptr, _, swap_axes) in zip(arrays, fields)
+        ]
+    )
+    assert fields[0][0][23] == 46
+    assert fields[1][0][4] == 8
+    assert fields[2][0][5] == 10
+
+    strict = FortranPythonConversion(target_numpy_module=np, strict=True)
+    with pytest.raises(TypeError):
+        strict.python_to_fortran_batch([(np.zeros(5), fields[2][0], None)])
@@ -0,0 +1,326 @@
+import types
+
+import cffi
+import numpy as np
+import pytest
+
+import tcn.py_ftn_interface.templates.data_conversion as data_conversion
+from tcn.py_ftn_interface.templates.data_conversion import (
+    DeviceBufferCache,
+    FortranPythonConversion,
+    PinnedStagingPool,
+    ResidentBuffer,
+)
+
+ffi = cffi.FFI()
+
+
+class FakeEvent:
+    """Completes when synchronized: copies stay "in flight" until then"""
+
+    def __init__(self, log, disable_timing=False):
+        self._log = log
+        self.done = False
+        self.stream = None
+
+    def record(self, stream=None):
+        self.stream = stream
+        self._log.append(("record", stream.name if stream else None))
+
+    def synchronize(self):
+        self.done = True
+
+
+class FakeStream:
+    def __init__(self, log, name):
+        self._log = log
+        self.name = name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def wait_event(self, event):
+        self._log.append(("wait", self.name, event.stream.name))
+
+    def synchronize(self):
+        pass
+
+
+class FakeDeviceArray(np.ndarray):
+    """Device array in host memory, logging its transfers"""
+
+    log: list = []
+
+    def set(self, array, stream=None):
+        self.log.append(("upload", stream.name))
+        self[...] = array
+
+    def get(self, stream=None, out=None, blocking=True):
+        self.log.append(("download", stream.name))
+        out[...] = self
+        return out
+
+
+def fake_device_module():
+    """Stand-in for cupy: runs on the host, records the stream scheduling"""
+    log = []
+    FakeDeviceArray.log = log
+    streams = iter("ABC")
+    cuda = types.SimpleNamespace(
+        Stream=lambda non_blocking=False: FakeStream(log, next(streams)),
+        Event=lambda disable_timing=False: FakeEvent(log),
+        alloc_pinned_memory=bytearray,
+        get_current_stream=lambda: FakeStream(log, "caller"),
+    )
+    module = types.SimpleNamespace(
+        cuda=cuda,
+        uint8=np.uint8,
+        empty=lambda shape, dtype: np.empty(shape, dtype).view(FakeDeviceArray),
+        swapaxes=np.swapaxes,
+        asfortranarray=lambda a: np.asfortranarray(a).view(FakeDeviceArray),
+    )
+    return module, log
+
+
+def _fortran_array(ctype: str, dim):
+    fptr = ffi.new(f"{ctype}[]", int(np.prod(dim)))
+    for i in range(int(np.prod(dim))):
+        fptr[i] = i
+    return fptr
+
+
+def test_pool_buckets_and_reuse():
+    cuda, _ = fake_device_module()
+    pool = PinnedStagingPool(cuda.cuda, min_bucket_bytes=1024)
+    assert pool.bucket(0) == 1024
+    assert pool.bucket(1025) == 2048
+    assert pool.bucket(4096) == 4096
+
+    buffer = pool.acquire(1500)
+    assert buffer.nbytes == 2048
+    pool.release(buffer)
+    assert pool.acquire(2000) is buffer
+    # Other size class
+    assert pool.acquire(500) is not buffer
+    assert pool.allocated_bytes == 3072
+
+
+def test_pool_in_flight_buffers_are_not_reused():
+    cuda, log = fake_device_module()
+    pool = PinnedStagingPool(cuda.cuda)
+    buffer = pool.acquire(100)
+    copied = FakeEvent(log)
+    pool.release(buffer, copied)
+    assert pool.acquire(100) is not buffer
+    copied.synchronize()
+    assert pool.acquire(100) is buffer
+
+
+def test_pool_eviction():
+    cuda, log = fake_device_module()
+    pool = PinnedStagingPool(cuda.cuda, max_cached_bytes=8192, min_bucket_bytes=4096)
+    buffers = [pool.acquire(4096) for _ in range(3)]
+    pending = FakeEvent(log)
+    pool.release(buffers[0], pending)
+    pool.release(buffers[1])
+    pool.release(buffers[2])
+    # Least recently released is freed, once its copy completed
+    assert pending.done
+    assert pool.cached_bytes == 8192
+    assert pool.acquire(4096) is buffers[1]
+    pool.clear()
+    assert pool.cached_bytes == 0
+    assert pool.allocated_bytes == 4096
+
+
+@pytest.mark.parametrize("double_buffering", [False, True])
+def test_device_batch_roundtrip(double_buffering):
+    device, log = fake_device_module()
+    f2py = FortranPythonConversion(device, double_buffering=double_buffering)
+    fields = [
+        (_fortran_array("double", [2, 3, 4]), [2, 3, 4], (0, 2)),
+        (_fortran_array("float", [5]), [5], None),
+        (_fortran_array("int", [3, 2]), [3, 2], None),
+    ]
+    reference = FortranPythonConversion(np).fortran_to_python_batch(fields)
+    reference = [array.copy() for array in reference]
+
+    arrays = f2py.fortran_to_python_batch(fields)
+    for array, expected in zip(arrays, reference):
+        assert isinstance(array, FakeDeviceArray)
+        np.testing.assert_array_equal(array, expected)
+    uploads = [entry for entry in log if entry[0] == "upload"]
+    assert len(uploads) == (3 if double_buffering else 1)
+    # The caller's stream waits for each upload
+    assert ("wait", "caller", "A") in log
+
+    log.clear()
+    f2py.python_to_fortran_batch(
+        [(a * 2, fptr, swap) for a, (fptr, _, swap) in zip(arrays, fields)]
+    )
+    for (fptr, dim, swap), expected in zip(fields, reference):
+        np.testing.assert_array_equal(
+            FortranPythonConversion(np).fortran_to_python(fptr, dim, swap),
+            expected * 2,
+        )
+    downloads = [entry for entry in log if entry[0] == "download"]
+    assert len(downloads) == (3 if double_buffering else 1)
+    # Downloads wait for the caller's work on the arrays
+    assert log[0] == ("record", "caller")
+
+
+class SyncOnlyDeviceArray(FakeDeviceArray):
+    """Device array of cupy < 13: no `blocking` argument to `get`"""
+
+    def get(self, stream=None, out=None):
+        return super().get(stream=stream, out=out)
+
+
+@pytest.mark.parametrize("double_buffering", [False, True])
+def test_download_without_async_get(monkeypatch, double_buffering):
+    device, log = fake_device_module()
+    device.empty = lambda shape, dtype: np.empty(shape, dtype).view(SyncOnlyDeviceArray)
+    device.asfortranarray = lambda a: np.asfortranarray(a).view(SyncOnlyDeviceArray)
+    monkeypatch.setattr(data_conversion, "_ASYNC_GET", False)
+    f2py = FortranPythonConversion(device, double_buffering=double_buffering)
+    fptrs = [_fortran_array("double", [4]) for _ in range(2)]
+
+    f2py.python_to_fortran_batch([(np.full(4, 3.0), fptr, None) for fptr in fptrs])
+    assert all(fptr[3] == 3 for fptr in fptrs)
+    assert _transfers(log, "download") == (2 if double_buffering else 1)
+
+
+def test_double_buffering_alternates_streams():
+    device, log = fake_device_module()
+    f2py = FortranPythonConversion(device, double_buffering=True)
+    fields = [(_fortran_array("double", [64]), [64], None) for _ in range(5)]
+
+    f2py.fortran_to_python_batch(fields)
+
+    uploads = [entry[1] for entry in log if entry[0] == "upload"]
+    assert uploads == ["A", "B", "A", "B", "A"]
+    # At most two staging buffers in flight
+    assert f2py._staging_pool.allocated_bytes == 2 * 4096
+
+
+def test_single_field_on_device():
+    device, log = fake_device_module()
+    f2py = FortranPythonConversion(device)
+    fptr = _fortran_array("double", [2, 3])
+
+    array = f2py.fortran_to_python(fptr, [2, 3])
+    assert array[1, 2] == 5
+    f2py.python_to_fortran(array + 1, fptr)
+    assert fptr[5] == 6
+    # Two transfers, on alternating streams
+    assert [e for e in log if e[0] in ["upload", "download"]] == [
+        ("upload", "A"),
+        ("download", "B"),
+    ]
+
+
+def _transfers(log, kind):
+    return len([entry for entry in log if entry[0] == kind])
+
+
+def test_device_buffer_cache_lru():
+    f2py = FortranPythonConversion(np)
+    plan = f2py.transfer_plan(_fortran_array("double", [16]), [16])
+    cache = DeviceBufferCache(max_bytes=2 * plan.nbytes)
+
+    assert cache.put(1, ResidentBuffer(None, plan, "a")) == []
+    assert cache.put(2, ResidentBuffer(None, plan, "b", dirty=True)) == []
+    assert cache.get(1, plan).array == "a"
+    # 2 is the least recently used
+    evicted = cache.put(3, ResidentBuffer(None, plan, "c"))
+    assert [buffer.array for buffer in evicted] == ["b"]
+    assert cache.nbytes == 2 * plan.nbytes
+    assert cache.get(2, plan) is None
+    # Same key: replaced
+    assert [b.array for b in cache.put(3, ResidentBuffer(None, plan, "d"))] == ["c"]
+    assert len(cache.pop(1)) == 1
+    assert len(cache) == 1
+
+
+def test_resident_inputs_are_uploaded_once():
+    device, log = fake_device_module()
+    f2py = FortranPythonConversion(device)
+    fields = [(_fortran_array("double", [4, 3]), [4, 3], None) for _ in range(3)]
+
+    first = f2py.fortran_to_python_batch(fields, resident=True)
+    assert _transfers(log, "upload") == 3
+    second = f2py.fortran_to_python_batch(fields, resident=True)
+    assert _transfers(log, "upload") == 3
+    assert all(a is b for a, b in zip(first, second))
+
+    # Fortran changed a field: uploaded again
+    fields[0][0][0] = 42
+    f2py.invalidate(fields[0][0])
+    assert f2py.fortran_to_python(fields[0][0], [4, 3], resident=True)[0, 0] == 42
+    assert _transfers(log, "upload") == 4
+
+
+def test_resident_outputs_are_downloaded_on_flush():
+    device, log = fake_device_module()
+    f2py = FortranPythonConversion(device)
+    fptr = _fortran_array("float", [5])
+
+    output = f2py.fortran_to_python(fptr, [5]) * 2.0
+    f2py.python_to_fortran(output, fptr, resident=True)
+    assert _transfers(log, "download") == 0
+    assert fptr[4] == 4
+    # Python reads the resident output without any transfer
+    again = f2py.fortran_to_python(fptr, [5], resident=True)
+    assert again.dtype == np.float32 and again[4] == 8
+    assert _transfers(log, "upload") == 1
+
+    f2py.flush()
+    assert fptr[4] == 8
+    assert _transfers(log, "download") == 1
+    f2py.flush()
+    assert _transfers(log, "download") == 1
+
+
+def test_resident_outputs_coherence():
+    device, log = fake_device_module()
+    f2py = FortranPythonConversion(device, device_cache_bytes=64)
+    fptrs = [_fortran_array("double", [8]) for _ in range(2)]
+
+    f2py.python_to_fortran(np.full(8, 3.0), fptrs[0], resident=True)
+    # A transfer bypassing the cache sees the resident output
+    assert f2py.fortran_to_python(fptrs[0], [8])[0] == 3
+    assert fptrs[0][0] == 3
+
+    # Evicted to make room: copied back to Fortran
+    f2py.python_to_fortran(np.full(8, 5.0), fptrs[0], resident=True)
+    f2py.python_to_fortran(np.full(8, 7.0), fptrs[1], resident=True)
+    assert fptrs[0][0] == 5
+    assert fptrs[1][0] == 0
+    f2py.flush(fptrs[1])
+    assert fptrs[1][0] == 7
+
+
+def test_resident_output_read_under_another_plan():
+    device, _ = fake_device_module()
+    f2py = FortranPythonConversion(device)
+    fptr = _fortran_array("double", [2, 3])
+
+    # Output resident with swapped axes, read back in Fortran layout
+    f2py.python_to_fortran(np.full((3, 2), 9.0), fptr, swap_axes=(0, 1), resident=True)
+    assert f2py.fortran_to_python(fptr, [2, 3], resident=True)[0, 0] == 9
+    assert fptr[0] == 9
+
+
+def test_resident_output_written_under_another_plan():
+    device, _ = fake_device_module()
+    f2py = FortranPythonConversion(device)
+    fptr = ffi.new("double[]", 6)
+
+    assert f2py.fortran_to_python(fptr, [2, 3], resident=True)[0, 0] == 0
+    f2py.python_to_fortran(np.full((3, 2), 4.0), fptr, swap_axes=(0, 1), resident=True)
+    # The first copy is stale: dropped
+    assert len(f2py._resident) == 1
+    assert f2py.fortran_to_python(fptr, [2, 3], resident=True)[0, 0] == 4